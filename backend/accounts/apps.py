@@ -5,3 +5,6 @@ class AccountsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'backend.accounts'
     verbose_name = 'Contas de usuários'
+
+    def ready(self):
+        from backend.accounts import signals  # noqa: F401
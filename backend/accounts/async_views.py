@@ -0,0 +1,12 @@
+from asgiref.sync import sync_to_async
+from backend.accounts.authentication import get_cached_account
+from backend.accounts.serializers import AccountProfileSerializer
+from backend.projects.async_views import AsyncReadView, render
+
+
+class AccountProfileReadView(AsyncReadView):
+    """GET /api/profile/ em ASGI (ver AccountProfileView e projects/async_views.py)."""
+
+    async def read(self, request, user):
+        account = await sync_to_async(get_cached_account)(user.pk)
+        return render(AccountProfileSerializer(account, context={'request': request}).data)
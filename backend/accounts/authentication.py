@@ -0,0 +1,140 @@
+"""
+Autenticação JWT sem uma leitura da Account por pedido.
+
+A JWTAuthentication do simplejwt lê a conta da base de dados em todos os
+pedidos. A CachedJWTAuthentication guarda as contas já lidas numa cache em
+memória, por processo, limitada a AUTH_USER_CACHE_SIZE contas (saem
+primeiro as usadas há mais tempo) durante AUTH_USER_CACHE_TIMEOUT segundos.
+
+Cada entrada guarda a versão da conta (ver cache_versions.py), incrementada
+sempre que a Account é gravada ou apagada (ver signals.py): desativar a
+conta, mudar a palavra-passe ou editar o perfil invalida as entradas em
+todos os processos que partilhem a cache do Django; com uma cache local,
+nos outros processos valem até expirarem. Alterações feitas com
+QuerySet.update() não passam pelos signals.
+
+Com AUTH_USER_TOKEN_CLAIMS, os tokens emitidos no login levam também os
+dados básicos da conta (ver AccountTokenObtainPairSerializer), usados
+enquanto a versão da conta for a do token, sem ler a base de dados nem
+mesmo na primeira vez. O utilizador assim obtido é uma Account com apenas
+esses campos carregados; os restantes são lidos se forem usados.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+from backend.accounts.models import Account
+from backend.projects.cache_versions import bump_version, get_version
+
+# Campos da conta incluídos no token com AUTH_USER_TOKEN_CLAIMS
+TOKEN_CLAIM = 'account'
+CLAIM_FIELDS = ('email', 'first_name', 'last_name', 'is_active', 'is_staff', 'is_superuser')
+
+
+def account_version(user_id):
+    return get_version(f'account-version:{user_id}')
+
+
+class UserCache:
+    """Cache LRU com validade, segura entre threads, das contas autenticadas."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, user_id, version):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            expires, entry_version, user = entry
+            if entry_version != version or expires < time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+        # Cada pedido recebe a sua cópia, que pode alterar à vontade
+        return copy.copy(user)
+
+    def set(self, user_id, version, user):
+        timeout = settings.AUTH_USER_CACHE_TIMEOUT
+        if not timeout:
+            return
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + timeout, version, copy.copy(user))
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > settings.AUTH_USER_CACHE_SIZE:
+                self._entries.popitem(last=False)
+
+    def discard(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+user_cache = UserCache()
+
+
+def invalidate_account(user_id):
+    """Chamado quando a conta é gravada ou apagada (ver signals.py)."""
+    user_cache.discard(user_id)
+    bump_version(f'account-version:{user_id}')
+
+
+def get_cached_account(user_id, version=None):
+    """Conta completa, da cache ou da base de dados (None se não existir)."""
+    if version is None:
+        version = account_version(user_id)
+    user = user_cache.get(user_id, version)
+    if user is None:
+        user = Account.objects.filter(pk=user_id).first()
+        if user is not None:
+            user_cache.set(user_id, version, user)
+    return user
+
+
+def token_claims(user):
+    """Claims da conta acrescentadas ao token no login (ver AUTH_USER_TOKEN_CLAIMS)."""
+    return {'version': account_version(user.pk), **{field: getattr(user, field) for field in CLAIM_FIELDS}}
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication com as contas resolvidas a partir de `user_cache`."""
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            return super().get_user(validated_token)
+
+        version = account_version(user_id)
+        user = self.user_from_claims(validated_token, user_id, version) or get_cached_account(user_id, version)
+        if user is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        if api_settings.CHECK_REVOKE_TOKEN:
+            # Compara o hash da palavra-passe: precisa da conta completa
+            return super().get_user(validated_token)
+        return user
+
+    def user_from_claims(self, validated_token, user_id, version):
+        if not settings.AUTH_USER_TOKEN_CLAIMS:
+            return None
+        claims = validated_token.get(TOKEN_CLAIM)
+        if not claims or claims.get('version') != version:
+            return None
+        values = {'id': user_id, **{field: claims[field] for field in CLAIM_FIELDS}}
+        # from_db espera os valores pela ordem dos campos do modelo
+        fields = [field.attname for field in Account._meta.concrete_fields if field.attname in values]
+        return Account.from_db('default', fields, [values[field] for field in fields])
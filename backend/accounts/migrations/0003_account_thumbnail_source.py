@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-18 13:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_alter_account_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='account',
+            name='thumbnail_source',
+            field=models.CharField(blank=True, editable=False, max_length=100, verbose_name='Miniaturas de'),
+        ),
+    ]
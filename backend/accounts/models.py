@@ -55,6 +55,13 @@ class Account(AbstractUser):
         null=True,
         blank=True
     )
+    # Foto cujas miniaturas já foram geradas (ver projects/thumbnails.py)
+    thumbnail_source = models.CharField(
+        _("Miniaturas de"),
+        max_length=100,
+        blank=True,
+        editable=False
+    )
     timezone = models.CharField(
         max_length=50,
         default='America/Porto_Velho'
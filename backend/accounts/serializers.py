@@ -1,4 +1,7 @@
+from django.conf import settings
 from rest_framework import serializers
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from backend.accounts.authentication import TOKEN_CLAIM, token_claims
 from backend.accounts.models import Account
 
 class AccountProfileSerializer(serializers.ModelSerializer):
@@ -9,3 +12,18 @@ class AccountProfileSerializer(serializers.ModelSerializer):
             'bio', 'profile_picture', 'timezone'
         )
         read_only_fields = ('email', 'id')
+
+
+class AccountTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """
+    Tokens emitidos no login. Com AUTH_USER_TOKEN_CLAIMS, levam os dados
+    básicos da conta (ver authentication.py), que passam para os tokens de
+    acesso obtidos com o refresh.
+    """
+
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        if settings.AUTH_USER_TOKEN_CLAIMS:
+            token[TOKEN_CLAIM] = token_claims(user)
+        return token
@@ -0,0 +1,18 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from backend.accounts.authentication import invalidate_account
+from backend.accounts.models import Account
+
+
+@receiver(post_save, sender=Account)
+@receiver(post_delete, sender=Account)
+def invalidate_cached_account(sender, instance, raw=False, **kwargs):
+    """
+    Remove a conta da cache da autenticação. Repete depois do commit, para
+    que um pedido concorrente não volte a guardar os dados anteriores.
+    """
+    if raw:
+        return
+    invalidate_account(instance.pk)
+    transaction.on_commit(lambda: invalidate_account(instance.pk))
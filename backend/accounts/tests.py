@@ -1,3 +1,62 @@
-from django.test import TestCase
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from backend.accounts.authentication import CachedJWTAuthentication, UserCache, user_cache
+from backend.accounts.models import Account
+from backend.accounts.serializers import AccountTokenObtainPairSerializer
 
-# Create your tests here.
+
+class CachedJWTAuthenticationTests(TestCase):
+    """A conta do token é lida uma vez e invalidada quando muda."""
+
+    def setUp(self):
+        cache.clear()
+        user_cache.clear()
+        self.user = Account.objects.create_user(email='ana@example.com', password='x', first_name='Ana')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+        self.url = reverse('profile')
+
+    def test_repeat_requests_skip_the_database(self):
+        self.assertEqual(self.client.get(self.url).data['first_name'], 'Ana')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(self.url).data['first_name'], 'Ana')
+
+    def test_account_changes_invalidate_the_cache(self):
+        self.client.get(self.url)
+        self.user.first_name = 'Beatriz'
+        self.user.save()
+        self.assertEqual(self.client.get(self.url).data['first_name'], 'Beatriz')
+
+        self.client.patch(self.url, {'job_title': 'Gestora'})
+        self.assertEqual(self.client.get(self.url).data['job_title'], 'Gestora')
+
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+    @override_settings(AUTH_USER_CACHE_SIZE=2)
+    def test_cache_is_bounded(self):
+        users = UserCache()
+        for user_id in (1, 2, 3):
+            users.set(user_id, 1, Account(pk=user_id))
+        self.assertEqual(len(users), 2)
+        self.assertIsNone(users.get(1, 1))
+        self.assertIsNone(users.get(2, version=2))
+        self.assertEqual(users.get(3, 1).pk, 3)
+
+    @override_settings(AUTH_USER_TOKEN_CLAIMS=True)
+    def test_token_claims(self):
+        token = AccountTokenObtainPairSerializer.get_token(self.user).access_token
+        authentication = CachedJWTAuthentication()
+        with self.assertNumQueries(0):
+            user = authentication.get_user(authentication.get_validated_token(str(token)))
+        self.assertEqual((user.pk, user.email, user.is_superuser), (self.user.pk, 'ana@example.com', False))
+
+        # Depois de a conta mudar, as claims do token deixam de valer
+        self.user.is_superuser = True
+        self.user.save()
+        user = authentication.get_user(authentication.get_validated_token(str(token)))
+        self.assertTrue(user.is_superuser)
@@ -2,6 +2,7 @@ from rest_framework import generics
 from rest_framework.permissions import IsAuthenticated
 from backend.accounts.serializers import (AccountProfileSerializer)
 from backend.accounts.models import Account
+from backend.accounts.authentication import get_cached_account
 
 
 class AccountProfileView(generics.RetrieveUpdateAPIView):
@@ -10,4 +11,6 @@ class AccountProfileView(generics.RetrieveUpdateAPIView):
     permission_classes = [IsAuthenticated]
 
     def get_object(self):
-        return self.request.user
\ No newline at end of file
+        # A conta completa, da mesma cache da autenticação (o utilizador do
+        # pedido pode ter só os campos do token)
+        return get_cached_account(self.request.user.pk)
\ No newline at end of file
@@ -3,6 +3,11 @@ ASGI config for backend project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Além do Django, serve /api/events/ (Server-Sent Events, ver
+backend/projects/sse.py), que só está disponível com um servidor ASGI
+(ex: uvicorn backend.asgi:application). Com ASYNC_READ_VIEWS, as leituras
+mais frequentes usam views assíncronas (backend/projects/async_views.py).
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -13,4 +18,9 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Importado depois de configurar o Django (usa os modelos)
+from backend.projects.sse import EventsApplication  # noqa: E402
+
+application = EventsApplication(django_application)
@@ -0,0 +1,212 @@
+"""
+Instrumentação por pedido: queries, tempo na base de dados e nos serializers.
+
+Uma fração REQUEST_PROFILING_SAMPLE_RATE dos pedidos (0 desativa; 1 mede
+todos) é medida pelo RequestProfilingMiddleware:
+- cada query, em todas as ligações, passa por um `execute_wrapper` que
+  conta o tempo e a "impressão digital" do SQL (sem parâmetros e com as
+  listas de IN reduzidas), para encontrar as queries repetidas (N+1);
+- o `.data` dos serializers do DRF conta o tempo de serialização, por
+  classe (só o serializer de fora, não os aninhados).
+
+Os pedidos medidos levam o cabeçalho `Server-Timing` (visível nas
+ferramentas de programador do browser) e, acima de REQUEST_PROFILING_SLOW_MS,
+uma linha JSON no logger `backend.instrumentation` com a view, as queries
+repetidas e os serializers.
+
+Sem amostragem, o custo é uma comparação por pedido: nada é instalado nas
+ligações nem nos serializers. O `.data` dos serializers só é substituído no
+primeiro pedido medido; daí em diante, os pedidos não medidos consultam
+apenas uma ContextVar vazia.
+"""
+import contextlib
+import json
+import logging
+import random
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.utils.decorators import sync_and_async_middleware
+from rest_framework import serializers
+
+logger = logging.getLogger(__name__)
+
+# Queries repetidas incluídas no log de um pedido lento
+LOGGED_DUPLICATES = 10
+
+# Medição do pedido em curso (None se o pedido não foi escolhido)
+_current = ContextVar('request_profile', default=None)
+_install_lock = threading.Lock()
+
+_WHITESPACE = re.compile(r'\s+')
+_IN_LIST = re.compile(r'\((?:\s*%s\s*,)+\s*%s\s*\)')
+_LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+
+
+def fingerprint(sql):
+    """SQL normalizado: o mesmo para queries que só diferem nos valores."""
+    sql = _LITERAL.sub('?', _IN_LIST.sub('(...)', sql))
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+class RequestProfile:
+    """Contadores de um pedido. Cada pedido corre numa só thread de cada vez."""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.fingerprints = Counter()
+        self.serializers = defaultdict(float)
+        self.serializer_depth = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        # Assinatura de connection.execute_wrapper()
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.queries += 1
+            self.fingerprints[fingerprint(sql)] += 1
+
+    def attach(self):
+        """Instala o wrapper nas ligações da thread atual; fechar o ExitStack remove-o."""
+        stack = contextlib.ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(self))
+        return stack
+
+    @property
+    def serializer_time(self):
+        return sum(self.serializers.values())
+
+    def duplicates(self):
+        return {sql: count for sql, count in self.fingerprints.most_common() if count > 1}
+
+    def server_timing(self, total):
+        repeated = sum(count - 1 for count in self.duplicates().values())
+        return ', '.join((
+            f'db;dur={self.db_time * 1000:.1f};desc="{self.queries} queries, {repeated} repetidas"',
+            f'serializer;dur={self.serializer_time * 1000:.1f}',
+            f'app;dur={total * 1000:.1f}',
+        ))
+
+    def as_log(self, request, response, total):
+        match = request.resolver_match
+        return {
+            'method': request.method,
+            'path': request.path,
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            'duration_ms': round(total * 1000, 1),
+            'db_ms': round(self.db_time * 1000, 1),
+            'queries': self.queries,
+            'serializer_ms': round(self.serializer_time * 1000, 1),
+            'serializers': {name: round(duration * 1000, 1) for name, duration in self.serializers.items()},
+            'duplicates': dict(list(self.duplicates().items())[:LOGGED_DUPLICATES]),
+        }
+
+    def finish(self, request, response, total):
+        timing = self.server_timing(total)
+        if response.has_header('Server-Timing'):
+            timing = f"{response['Server-Timing']}, {timing}"
+        response['Server-Timing'] = timing
+        if total * 1000 >= settings.REQUEST_PROFILING_SLOW_MS:
+            logger.warning(json.dumps(self.as_log(request, response, total), ensure_ascii=False))
+        return response
+
+
+def _timed_data(data_property, name):
+    """Versão de `Serializer.data` que soma o tempo ao pedido medido."""
+    get_data = data_property.fget
+
+    def data(self):
+        profile = _current.get()
+        if profile is None:
+            return get_data(self)
+        profile.serializer_depth += 1
+        started = time.perf_counter()
+        try:
+            return get_data(self)
+        finally:
+            profile.serializer_depth -= 1
+            # Um serializer usado dentro de outro conta só no de fora
+            if not profile.serializer_depth:
+                profile.serializers[name(self)] += time.perf_counter() - started
+
+    data.__timed__ = True
+    data.__original__ = data_property
+    return property(data)
+
+
+def serializer_timing_installed():
+    return getattr(serializers.Serializer.data.fget, '__timed__', False)
+
+
+def install_serializer_timing():
+    """Substitui `.data` dos serializers do DRF (uma vez por processo)."""
+    with _install_lock:
+        if serializer_timing_installed():
+            return
+        serializers.Serializer.data = _timed_data(
+            serializers.Serializer.data, lambda serializer: type(serializer).__name__
+        )
+        serializers.ListSerializer.data = _timed_data(
+            serializers.ListSerializer.data, lambda serializer: f'{type(serializer.child).__name__}(many)'
+        )
+
+
+def uninstall_serializer_timing():
+    """Repõe o `.data` original dos serializers."""
+    with _install_lock:
+        if not serializer_timing_installed():
+            return
+        for cls in (serializers.Serializer, serializers.ListSerializer):
+            cls.data = cls.data.fget.__original__
+
+
+def sampled():
+    rate = settings.REQUEST_PROFILING_SAMPLE_RATE
+    return rate > 0 and (rate >= 1 or random.random() < rate)
+
+
+@sync_and_async_middleware
+def RequestProfilingMiddleware(get_response):
+    """Mede os pedidos escolhidos (ver o início do módulo)."""
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            if not sampled():
+                return await get_response(request)
+            install_serializer_timing()
+            profile = RequestProfile()
+            token = _current.set(profile)
+            started = time.perf_counter()
+            # As queries correm na thread partilhada do pedido (sync_to_async
+            # thread-sensitive): é nas ligações dessa thread que o wrapper entra
+            stack = await sync_to_async(profile.attach)()
+            try:
+                response = await get_response(request)
+            finally:
+                await sync_to_async(stack.close)()
+                _current.reset(token)
+            return profile.finish(request, response, time.perf_counter() - started)
+    else:
+        def middleware(request):
+            if not sampled():
+                return get_response(request)
+            install_serializer_timing()
+            profile = RequestProfile()
+            token = _current.set(profile)
+            started = time.perf_counter()
+            try:
+                with profile.attach():
+                    response = get_response(request)
+            finally:
+                _current.reset(token)
+            return profile.finish(request, response, time.perf_counter() - started)
+    return middleware
@@ -6,3 +6,6 @@ class ProjectsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'backend.projects'
     verbose_name = _("Gerenciamento de Projetos")
+
+    def ready(self):
+        from backend.projects import signals  # noqa: F401
@@ -0,0 +1,237 @@
+"""
+Versões assíncronas dos endpoints de leitura mais usados, com o ORM
+assíncrono do Django, para quando a API é servida em ASGI (backend/asgi.py).
+
+Com ASYNC_READ_VIEWS, o AsyncReadViewsMiddleware faz com que os pedidos
+ASGI usem backend/urls_async.py: os GET da lista e do detalhe de projetos,
+das listas de tarefas, das tags e do perfil são servidos aqui, sem ocupar
+uma thread durante as queries; os restantes métodos (e os pedidos da API
+navegável) seguem para as viewsets de sempre.
+
+As respostas são as mesmas, byte a byte, das viewsets (mesmo JSON,
+paginação por cursor, ETag/304 e erros de autenticação), reutilizando as
+mesmas peças: fast_lists, KeysetPagination, conditional.py e a cache dos
+papéis e do catálogo de tags. Apenas a autenticação corre na pool de
+threads, como nas viewsets, para manter o comportamento dos
+autenticadores configurados.
+
+Em WSGI nada muda: não compensa pagar um event loop por pedido. O comando
+benchmark_async_views compara os dois modos.
+"""
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError
+from django.http import Http404, HttpResponse, HttpResponseNotModified
+from django.shortcuts import aget_object_or_404
+from django.urls import resolve
+from django.utils.cache import get_conditional_response
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.exceptions import APIException, AuthenticationFailed, NotAuthenticated, NotFound, PermissionDenied
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from backend.projects import fast_lists
+from backend.projects.catalogue import (
+    aget_cached_tag_response, aset_cached_tag_response, atag_catalogue_version, tag_catalogue_etag
+)
+from backend.projects.conditional import validators_etag, validators_last_modified, with_validators
+from backend.projects.membership import aget_user_project_roles
+from backend.projects.models import Project, Tag, Task
+from backend.projects.pagination import KeysetPagination
+from backend.projects.serializers import ProjectDetailSerializer, TagSerializer
+from backend.projects.views import (
+    plan_projects, project_detail_validators, project_list_validators, task_list_validators,
+    tasks_list_scope, with_project_detail_validators
+)
+
+SYNC_URLCONF = 'backend.urls'
+
+
+def render(data, status=200):
+    return HttpResponse(JSONRenderer().render(data), status=status, content_type='application/json')
+
+
+def with_fallback(view):
+    """
+    Serve os GET com a view assíncrona e os restantes pedidos com a view
+    síncrona da mesma rota em backend/urls.py (numa thread, como faria o Django).
+    """
+    async def dispatch(request, *args, **kwargs):
+        if request.method == 'GET' and 'text/html' not in request.headers.get('Accept', ''):
+            return await view(request, *args, **kwargs)
+        match = resolve(request.path_info, urlconf=SYNC_URLCONF)
+        return await sync_to_async(match.func)(request, *match.args, **match.kwargs)
+    # A proteção CSRF fica a cargo das views (como no DRF)
+    return csrf_exempt(dispatch)
+
+
+class AsyncReadView(View):
+    """
+    Base das views assíncronas: autentica como o DRF, converte as
+    exceções da API nas mesmas respostas e trata do GET condicional.
+    """
+    authentication_classes = api_settings.DEFAULT_AUTHENTICATION_CLASSES
+    authentication_required = True
+    cache_control = 'private, no-cache'
+    http_method_names = ['get']
+
+    async def get(self, request, *args, **kwargs):
+        request = Request(request, authenticators=[auth() for auth in self.authentication_classes])
+        try:
+            # Os autenticadores são síncronos (e podem ler o utilizador)
+            user = await sync_to_async(lambda: request.user)()
+            if self.authentication_required and not user.is_authenticated:
+                raise NotAuthenticated()
+            return await self.read(request, user, *args, **kwargs)
+        except Http404 as exc:
+            return self.error_response(request, NotFound(*exc.args))
+        except APIException as exc:
+            return self.error_response(request, exc)
+
+    async def read(self, request, user, *args, **kwargs):
+        raise NotImplementedError
+
+    def error_response(self, request, exc):
+        # Igual ao exception_handler do DRF
+        data = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+        response = render(data, exc.status_code)
+        if isinstance(exc, (NotAuthenticated, AuthenticationFailed)):
+            authenticators = request.authenticators
+            header = authenticators[0].authenticate_header(request) if authenticators else None
+            if header:
+                response['WWW-Authenticate'] = header
+            else:
+                response.status_code = 403
+        return response
+
+    def not_modified(self, request, validators):
+        """
+        Guarda a ETag e o Last-Modified de `validators` (ver conditional.py)
+        e devolve 304 se o cliente já tiver esta versão.
+        """
+        self.etag = self.last_modified = None
+        if validators is None:
+            return None
+        self.etag = validators_etag(request.get_full_path(), validators)
+        self.last_modified = validators_last_modified(validators)
+        if get_conditional_response(request, etag=self.etag, last_modified=self.last_modified) is not None:
+            return self.with_validators(HttpResponseNotModified())
+        return None
+
+    def with_validators(self, response):
+        if self.etag:
+            with_validators(response, self.etag, self.last_modified, self.cache_control)
+        return response
+
+
+async def aget_object(queryset, **lookup):
+    """Como o get_object_or_404 do DRF: 404 também para valores inválidos."""
+    try:
+        return await aget_object_or_404(queryset, **lookup)
+    except (TypeError, ValueError, ValidationError):
+        raise Http404
+
+
+async def visible_projects(user):
+    if user.is_superuser:
+        return Project.objects.all()
+    return Project.objects.filter(pk__in=list(await aget_user_project_roles(user)))
+
+
+class ProjectListView(AsyncReadView):
+    """GET /api/projects/ (ver ProjectViewSet.list)."""
+
+    async def read(self, request, user):
+        projects = await visible_projects(user)
+        not_modified = self.not_modified(request, await projects.order_by().aaggregate(**project_list_validators()))
+        if not_modified is not None:
+            return not_modified
+
+        paginator = KeysetPagination()
+        # with_activity_counts() pode ler o ContentType da base de dados
+        rows = await sync_to_async(fast_lists.project_rows)(projects.order_by('-created_at'))
+        rows = await paginator.apaginate_queryset(rows, request)
+        members = [member async for member in fast_lists.project_members(rows)]
+        data = fast_lists.build_projects(rows, members, request)
+        return self.with_validators(render(paginator.get_paginated_response(data).data))
+
+
+class ProjectDetailView(AsyncReadView):
+    """GET /api/projects/<id>/ (ver ProjectViewSet.retrieve)."""
+
+    async def read(self, request, user, pk):
+        projects = await visible_projects(user)
+        try:
+            validators = await project_detail_validators(projects.order_by(), pk).afirst()
+        except (ValueError, TypeError):
+            validators = None
+        if validators is not None:
+            validators = with_project_detail_validators(validators, await atag_catalogue_version())
+        not_modified = self.not_modified(request, validators)
+        if not_modified is not None:
+            return not_modified
+
+        project = await aget_object(plan_projects(projects, 'retrieve'), pk=pk)
+        # Como o IsMemberOrOwner da viewset: o superutilizador encontra qualquer
+        # projeto, mas o detalhe só é mostrado aos membros e ao dono
+        if user.is_superuser and project.pk not in await aget_user_project_roles(user):
+            raise PermissionDenied()
+        data = ProjectDetailSerializer(project, context={'request': request}).data
+        return self.with_validators(render(data))
+
+
+class TaskListView(AsyncReadView):
+    """
+    GET /api/tasks/ e /api/projects/<id>/tasks/ (ver TaskViewSet.list).
+    Sem autenticação devolve a lista vazia, como IsMemberOrOwner.
+    """
+    authentication_required = False
+
+    async def read(self, request, user, project_pk=None):
+        tasks = Task.objects.filter(project_id__in=list(await aget_user_project_roles(user)))
+        try:
+            validators = await tasks_list_scope(tasks.order_by(), project_pk).aaggregate(**task_list_validators())
+        except (ValueError, TypeError):
+            validators = None
+        if validators is not None:
+            validators['tags_version'] = await atag_catalogue_version()
+        not_modified = self.not_modified(request, validators)
+        if not_modified is not None:
+            return not_modified
+
+        if project_pk is not None:
+            tasks = tasks.filter(project_id=project_pk, parent_task__isnull=True)
+        paginator = KeysetPagination()
+        rows = await paginator.apaginate_queryset(await sync_to_async(fast_lists.task_rows)(tasks), request)
+        descendants = [row async for row in fast_lists.task_descendants(rows)]
+        nodes = fast_lists.task_nodes(rows, descendants)
+        tag_rows = [row async for row in fast_lists.task_tags([row.id for row in nodes])]
+        data = fast_lists.build_tasks(rows, nodes, tag_rows, request)
+        return self.with_validators(render(paginator.get_paginated_response(data).data))
+
+
+class TagView(AsyncReadView):
+    """GET /api/tags/ e /api/tags/<id>/ (ver TagViewSet.cached_response)."""
+
+    async def read(self, request, user, pk=None):
+        version = await atag_catalogue_version()
+        self.etag, self.last_modified = tag_catalogue_etag(version), None
+        if get_conditional_response(request, etag=self.etag) is not None:
+            not_modified = HttpResponseNotModified()
+            not_modified['Cache-Control'] = self.cache_control
+            return not_modified
+
+        url = request.build_absolute_uri()
+        data = await aget_cached_tag_response(version, url)
+        if data is None:
+            data = await (self.list(request) if pk is None else self.retrieve(pk))
+            await aset_cached_tag_response(version, url, data)
+        return self.with_validators(render(data))
+
+    async def list(self, request):
+        paginator = KeysetPagination()
+        tags = await paginator.apaginate_queryset(Tag.objects.order_by('name'), request)
+        return paginator.get_paginated_response(TagSerializer(tags, many=True).data).data
+
+    async def retrieve(self, pk):
+        return TagSerializer(await aget_object(Tag.objects.all(), pk=pk)).data
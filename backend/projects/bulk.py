@@ -0,0 +1,182 @@
+"""
+Operações em massa sobre tarefas e as suas tags.
+
+Todas as operações de um pedido são validadas numa única passagem (com as
+tarefas, pais e responsáveis referenciados carregados de uma só vez) e
+escritas com bulk_create/bulk_update numa única transação. As tarefas
+são lidas já dentro dela, com SELECT ... FOR UPDATE: o estado e a
+prioridade de onde partem as variações dos contadores não podem mudar
+noutra transação antes da escrita. Como estas escritas não disparam os
+signals de Task, os contadores dos projetos e o registo de alterações
+são atualizados aqui explicitamente.
+"""
+from django.db import transaction
+from django.utils import timezone
+from backend.accounts.models import Account
+from backend.projects.changes import CREATED, UPDATED, record_task_changes, record_task_updates
+from backend.projects.counters import apply_task_counter_deltas, counter_state, task_counter_deltas
+from backend.projects.models import Task
+from backend.projects.serializers import TaskBulkOperationSerializer
+from backend.projects.tree import child_path
+
+NO_PERMISSION = "Tarefa ou projeto inexistente, ou sem permissão."
+
+
+class TaskBulkError(Exception):
+    """Levantada quando alguma operação é inválida; nada é escrito."""
+
+    def __init__(self, results):
+        super().__init__("Operações inválidas.")
+        self.results = results
+
+
+def run_task_operations(operations, roles, batch_size=500):
+    """
+    Valida e aplica uma lista de operações (ver TaskBulkOperationSerializer)
+    sobre tarefas dos projetos em `roles` ({project_id: papel}).
+    Devolve um resultado por operação, pela mesma ordem, ou levanta
+    TaskBulkError com os erros de cada operação.
+    """
+    items, errors = [], []
+    for operation in operations:
+        # Validação estrutural, sem acesso à base de dados
+        serializer = TaskBulkOperationSerializer(data=operation)
+        valid = serializer.is_valid()
+        items.append(serializer.validated_data if valid else None)
+        errors.append({} if valid else serializer.errors)
+
+    # Carrega de uma só vez tudo o que as operações referenciam
+    task_ids, assignee_ids = set(), set()
+    for item in filter(None, items):
+        data = item.get('data', {})
+        task_ids.update(filter(None, (item.get('id'), data.get('parent_task'))))
+        if data.get('assignee'):
+            assignee_ids.add(data['assignee'])
+    assignees = set(Account.objects.filter(pk__in=assignee_ids).values_list('pk', flat=True))
+
+    with transaction.atomic():
+        # Bloqueadas por ordem de id, para duas operações em massa não se bloquearem mutuamente
+        tasks = {
+            task.pk: task
+            for task in Task.objects.filter(pk__in=task_ids, project_id__in=list(roles))
+            .select_for_update().order_by('pk')
+        }
+
+        for index, item in enumerate(items):
+            if item is None:
+                continue
+            item_errors = _validate_operation(item, tasks, assignees, roles)
+            if item_errors:
+                errors[index] = item_errors
+        if any(errors):
+            raise TaskBulkError([
+                {'index': index, 'errors': item_errors}
+                for index, item_errors in enumerate(errors) if item_errors
+            ])
+
+        return _apply(items, tasks, batch_size)
+
+
+def _validate_operation(item, tasks, assignees, roles):
+    data = item.get('data', {})
+    errors = {}
+
+    if item['op'] == 'create':
+        if data['project'] not in roles:
+            errors['project'] = NO_PERMISSION
+        parent_id = data.get('parent_task')
+        if parent_id is not None:
+            parent = tasks.get(parent_id)
+            if parent is None:
+                errors['parent_task'] = NO_PERMISSION
+            elif parent.project_id != data['project']:
+                errors['parent_task'] = "A tarefa pai tem de pertencer ao mesmo projeto."
+    elif item['id'] not in tasks:
+        errors['id'] = NO_PERMISSION
+
+    if data.get('assignee') and data['assignee'] not in assignees:
+        errors['assignee'] = "Utilizador inexistente."
+    return errors
+
+
+def _apply(items, tasks, batch_size):
+    now = timezone.now()
+    deltas = None
+    to_create, updated, changed_fields = [], {}, set()
+    original_states = {}
+    results = []
+
+    for item in items:
+        data = dict(item.get('data', {}))
+        if item['op'] == 'create':
+            parent_id = data.pop('parent_task', None)
+            task = Task(
+                project_id=data.pop('project'),
+                parent_task_id=parent_id,
+                path=child_path(tasks[parent_id]) if parent_id else '',
+                assignee_id=data.pop('assignee', None),
+                **data
+            )
+            to_create.append(task)
+            results.append({'op': 'create', 'task': task})
+            continue
+
+        task = tasks[item['id']]
+        original_states.setdefault(task.pk, counter_state(task.__dict__))
+        if item['op'] == 'transition':
+            data = {'status': item['status']}
+        for field, value in data.items():
+            setattr(task, 'assignee_id' if field == 'assignee' else field, value)
+        changed_fields.update(data)
+        updated[task.pk] = task
+        results.append({'op': item['op'], 'task': task})
+
+    # Corre na transação de run_task_operations, com as tarefas bloqueadas
+    if to_create:
+        Task.objects.bulk_create(to_create, batch_size=batch_size)
+    if updated:
+        for task in updated.values():
+            task.updated_at = now
+        Task.objects.bulk_update(updated.values(), [*changed_fields, 'updated_at'], batch_size=batch_size)
+
+    for task in to_create:
+        deltas = task_counter_deltas(None, counter_state(task.__dict__), deltas)
+    for task_id, task in updated.items():
+        deltas = task_counter_deltas(original_states[task_id], counter_state(task.__dict__), deltas)
+    if deltas:
+        apply_task_counter_deltas(deltas)
+    record_task_changes(to_create, CREATED)
+    record_task_changes(updated.values(), UPDATED)
+
+    return [
+        {'index': index, 'op': result['op'], 'id': result['task'].pk}
+        for index, result in enumerate(results)
+    ]
+
+
+def apply_tag_changes(task_ids, add, remove, batch_size=1000):
+    """
+    Adiciona e remove tags de várias tarefas escrevendo diretamente na
+    tabela intermédia de Task.tags: um bulk_create (ignorando pares já
+    existentes) e um único DELETE. Devolve um resumo das alterações.
+    """
+    through = Task.tags.through
+    added = removed = 0
+
+    with transaction.atomic():
+        if add:
+            existing = through.objects.filter(task_id__in=task_ids, tag_id__in=add).count()
+            through.objects.bulk_create(
+                [through(task_id=task_id, tag_id=tag_id) for task_id in task_ids for tag_id in add],
+                batch_size=batch_size,
+                ignore_conflicts=True,
+            )
+            added = len(task_ids) * len(add) - existing
+        if remove:
+            removed, _ = through.objects.filter(task_id__in=task_ids, tag_id__in=remove).delete()
+        if added or removed:
+            # As tags fazem parte da representação da tarefa
+            Task.objects.filter(pk__in=task_ids).update(updated_at=timezone.now())
+            record_task_updates(task_ids)
+
+    return {'tasks': len(task_ids), 'added': added, 'removed': removed}
@@ -0,0 +1,55 @@
+"""
+Números de versão guardados na cache do Django, usados para invalidar
+entradas de cache sem ter de as apagar uma a uma: as chaves das entradas
+incluem a versão e basta incrementá-la para que todas deixem de ser lidas.
+
+Uma versão só invalida as entradas de todos os processos se a cache for
+partilhada entre eles: com uma cache local (LocMem, a por omissão sem
+REDIS_URL), cada worker tem as suas versões. As caches entre pedidos que
+dependem disso consultam `cache_is_shared()` e ficam desativadas.
+"""
+import time
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache
+
+# Backends com uma cópia por processo
+PROCESS_LOCAL_BACKENDS = frozenset({
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+})
+
+
+def cache_is_shared(alias=DEFAULT_CACHE_ALIAS):
+    """A cache `alias` é vista por todos os processos (ex: Redis, Memcached)?"""
+    return settings.CACHES[alias]['BACKEND'] not in PROCESS_LOCAL_BACKENDS
+
+
+def get_version(key):
+    """
+    Devolve a versão atual de `key`. Se ainda não existir (ou tiver sido
+    expulsa da cache), inicializa-a com o instante atual, para que nunca
+    volte a coincidir com uma versão antiga.
+    """
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+async def aget_version(key):
+    """Versão assíncrona de get_version."""
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, time.time_ns(), timeout=None)
+        version = await cache.aget(key)
+    return version
+
+
+def bump_version(key):
+    """Invalida todas as entradas associadas a `key`."""
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # A chave não existe: uma versão nova já basta para invalidar
+        return get_version(key)
@@ -0,0 +1,75 @@
+"""
+Cache das respostas do catálogo de tags.
+
+As respostas de TagViewSet são guardadas na cache do Django com a chave
+versionada pela versão do catálogo, incrementada em qualquer save ou
+delete de Tag (ver signals.py). A mesma versão serve de ETag, pelo que um
+pedido com If-None-Match é respondido com 304 sem consultar a base de dados.
+
+Sem uma cache partilhada entre processos (ver cache_versions.py), a versão
+incrementada num worker não chegaria aos outros: as respostas não são
+guardadas e a versão é lida da tabela de tags (número e último
+`updated_at`), com uma query por pedido.
+"""
+import hashlib
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max
+from backend.projects.cache_versions import aget_version, bump_version, cache_is_shared, get_version
+from backend.projects.models import Tag
+
+TAG_CATALOGUE_VERSION_KEY = 'tag-catalogue-version'
+
+
+def _database_version(state):
+    updated = state['updated'].timestamp() if state['updated'] else 0
+    return f"{state['count']}-{round(updated * 1_000_000)}"
+
+
+def tag_catalogue_version():
+    if not cache_is_shared():
+        state = Tag.objects.order_by().aggregate(count=Count('pk'), updated=Max('updated_at'))
+        return _database_version(state)
+    return get_version(TAG_CATALOGUE_VERSION_KEY)
+
+
+async def atag_catalogue_version():
+    if not cache_is_shared():
+        state = await Tag.objects.order_by().aaggregate(count=Count('pk'), updated=Max('updated_at'))
+        return _database_version(state)
+    return await aget_version(TAG_CATALOGUE_VERSION_KEY)
+
+
+def tag_catalogue_etag(version):
+    return f'"tags-{version}"'
+
+
+def tag_response_key(version, url):
+    digest = hashlib.md5(url.encode('utf-8')).hexdigest()
+    return f'tag-catalogue:{version}:{digest}'
+
+
+def get_cached_tag_response(version, url):
+    if not cache_is_shared():
+        return None
+    return cache.get(tag_response_key(version, url))
+
+
+def set_cached_tag_response(version, url, data):
+    if cache_is_shared():
+        cache.set(tag_response_key(version, url), data, settings.TAG_CATALOGUE_CACHE_TIMEOUT)
+
+
+async def aget_cached_tag_response(version, url):
+    if not cache_is_shared():
+        return None
+    return await cache.aget(tag_response_key(version, url))
+
+
+async def aset_cached_tag_response(version, url, data):
+    if cache_is_shared():
+        await cache.aset(tag_response_key(version, url), data, settings.TAG_CATALOGUE_CACHE_TIMEOUT)
+
+
+def invalidate_tag_catalogue():
+    bump_version(TAG_CATALOGUE_VERSION_KEY)
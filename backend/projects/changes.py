@@ -0,0 +1,198 @@
+"""
+Registo de alterações para sincronização incremental ("o que mudou desde X").
+
+Cada criação, alteração ou remoção de Project, Task, ProjectMember, Comment
+e Attachment acrescenta uma linha a ChangeLog: pelos signals (ver
+signals.py) e, nas escritas em massa que os contornam, explicitamente
+(ver bulk.py). As escritas da API correm em transação (AtomicWritesMixin),
+pelo que o registo é confirmado, ou desfeito, juntamente com a alteração.
+
+Depois do commit, as entradas são também publicadas para os clientes
+ligados a /api/events/ (ver events.py).
+
+Os clientes guardam o último cursor recebido e pedem
+/api/changes/?since=<cursor>; recebem apenas uma entrada por objeto, com a
+ação que resume as alterações desse intervalo, e voltam a ler só esses.
+As entradas mais antigas que CHANGE_LOG_RETENTION_DAYS são apagadas pelo
+comando prune_change_log; um cursor anterior a essas obriga a uma
+sincronização completa (410).
+
+Os ids do registo são atribuídos no INSERT e não no commit: uma transação
+ainda aberta pode confirmar mais tarde uma entrada com um id menor do que
+outras já visíveis. Por isso o cursor devolvido só passa das entradas
+assentes (ver settled_cursor): no PostgreSQL, as escritas depois de
+terminarem todas as transações que estavam abertas no INSERT, por longas
+que sejam; e, em qualquer base de dados, com mais de
+CHANGE_LOG_SETTLE_SECONDS. As mais recentes são devolvidas, mas voltam a
+ser lidas no pedido seguinte.
+"""
+from datetime import timedelta
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from backend.projects.events import publish_changes
+from backend.projects.models import ChangeLog, Feedback, Project, ProjectMember, Task
+
+CREATED = ChangeLog.Action.CREATED
+UPDATED = ChangeLog.Action.UPDATED
+DELETED = ChangeLog.Action.DELETED
+
+
+class ChangesExpired(APIException):
+    status_code = status.HTTP_410_GONE
+    default_detail = "O cursor é anterior às alterações guardadas. Faça uma sincronização completa."
+    default_code = 'changes_expired'
+
+
+class AtomicWritesMixin:
+    """Corre as escritas das viewsets (e os seus signals) numa transação."""
+
+    def perform_create(self, serializer):
+        with transaction.atomic():
+            super().perform_create(serializer)
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            super().perform_update(serializer)
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            super().perform_destroy(instance)
+
+
+def change_project_id(instance):
+    """Projeto a que a alteração pertence, para filtrar por visibilidade."""
+    if isinstance(instance, Project):
+        return instance.pk
+    if isinstance(instance, (Task, ProjectMember)):
+        return instance.project_id
+
+    # Comentários e anexos: pelo objeto a que estão ligados
+    model = instance.content_type.model_class()
+    if model is Project:
+        return instance.object_id
+    if model in (Task, Feedback):
+        return model.objects.filter(pk=instance.object_id).values_list('project_id', flat=True).first()
+    return None
+
+
+def change_entry(cursor, model, object_id, action, project_id):
+    """Representação de uma entrada do registo para os clientes."""
+    return {'cursor': cursor, 'type': model, 'id': object_id, 'action': action, 'project': project_id}
+
+
+def _publish(rows):
+    publish_changes([
+        change_entry(row.pk, row.model, row.object_id, str(row.action), row.project_id) for row in rows
+    ])
+
+
+def record_change(instance, action):
+    row = ChangeLog.objects.create(
+        model=instance._meta.model_name,
+        object_id=instance.pk,
+        action=action,
+        project_id=change_project_id(instance),
+        user_id=instance.user_id if isinstance(instance, ProjectMember) else None,
+    )
+    _publish([row])
+
+
+def record_task_changes(tasks, action):
+    """Versão em massa para tarefas já carregadas (ex: bulk_create/bulk_update)."""
+    rows = ChangeLog.objects.bulk_create([
+        ChangeLog(model='task', object_id=task.pk, action=action, project_id=task.project_id)
+        for task in tasks
+    ])
+    _publish(rows)
+
+
+def record_task_updates(task_ids):
+    """Regista alterações de tarefas conhecidas apenas pelo id."""
+    record_task_changes(Task.objects.filter(pk__in=task_ids).order_by().only('pk', 'project_id'), UPDATED)
+
+
+def visible_changes(user, project_ids):
+    if user.is_superuser:
+        return ChangeLog.objects.all()
+    return ChangeLog.objects.filter(Q(project_id__in=project_ids) | Q(user_id=user.pk))
+
+
+def settled_cursor():
+    """
+    Maior id do registo que já não pode ganhar entradas anteriores: o das
+    entradas com mais de CHANGE_LOG_SETTLE_SECONDS e, no PostgreSQL, cujo
+    `settle_xid` já não é maior que o xmin do snapshot atual, isto é, sem
+    nenhuma transação aberta desde o seu INSERT (que pudesse ter recebido
+    um id menor).
+
+    Assume que a transação que regista uma alteração já tem um xid, por
+    ter escrito o objeto alterado antes do registo (signals, bulk.py).
+    """
+    settled_before = timezone.now() - timedelta(seconds=settings.CHANGE_LOG_SETTLE_SECONDS)
+    entries = ChangeLog.objects.filter(created_at__lt=settled_before)
+    if connections[entries.db].vendor == 'postgresql':
+        snapshot_xmin = RawSQL('pg_snapshot_xmin(pg_current_snapshot())::text::bigint', [])
+        entries = entries.filter(Q(settle_xid__isnull=True) | Q(settle_xid__lte=snapshot_xmin))
+    settled = entries.order_by('-id').values_list('id', flat=True).first()
+    if settled is None:
+        # Registo vazio ou só com entradas recentes: o cursor fica antes da
+        # mais antiga, para não ser dado como expirado (410)
+        oldest = ChangeLog.objects.order_by('id').values_list('id', flat=True).first()
+        return oldest - 1 if oldest else 0
+    return settled
+
+
+def changes_since(user, project_ids, since=None, limit=500):
+    """
+    Alterações visíveis com cursor maior que `since`, até `limit` entradas
+    do registo, resumidas a uma por objeto. Sem `since` devolve apenas o
+    cursor atual, a partir do qual o cliente começa a sincronizar.
+    O cursor devolvido não passa de settled_cursor(): as entradas mais
+    recentes podem voltar a aparecer no pedido seguinte.
+    """
+    settled = settled_cursor()
+    if since is None:
+        return {'cursor': settled, 'has_more': False, 'changes': []}
+
+    oldest = ChangeLog.objects.order_by('id').values_list('id', flat=True).first()
+    if oldest is not None and since < oldest - 1:
+        raise ChangesExpired()
+
+    rows = list(
+        visible_changes(user, project_ids)
+        .filter(id__gt=since)
+        .order_by('id')
+        .values_list('id', 'model', 'object_id', 'action', 'project_id')[:limit + 1]
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    # Uma entrada por objeto, na posição da sua última alteração
+    first_action, latest = {}, {}
+    for cursor, model, object_id, action, project_id in rows:
+        key = (model, object_id)
+        first_action.setdefault(key, action)
+        latest.pop(key, None)
+        latest[key] = (cursor, action, project_id)
+
+    changes = []
+    for (model, object_id), (cursor, action, project_id) in latest.items():
+        # Criado e removido no intervalo continua a ser enviado como removido:
+        # a criação pode já ter sido vista num pedido anterior (ver o início do módulo)
+        if first_action[model, object_id] == CREATED and action != DELETED:
+            action = CREATED
+        changes.append(change_entry(cursor, model, object_id, str(action), project_id))
+
+    # Sem mais páginas, todas as entradas visíveis até `settled` foram lidas
+    cursor = min(rows[-1][0], settled) if has_more else settled
+    return {
+        'cursor': max(since, cursor),
+        # Com a página seguinte ainda por assentar, o cliente espera pela próxima leitura
+        'has_more': has_more and rows[-1][0] <= settled,
+        'changes': changes,
+    }
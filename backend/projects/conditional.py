@@ -0,0 +1,104 @@
+"""
+GET condicionais (ETag / Last-Modified) para projetos e tarefas.
+
+Cada viewset define `get_validators()`, que devolve os valores de que a
+representação depende, obtidos numa única query de agregação (máximos de
+`updated_at`, contagens, contadores, ...). A ETag é um hash desses valores
+e do URL do pedido. O Last-Modified (o maior dos instantes) só é enviado
+quando todos os validadores são instantes: uma remoção ou uma contagem não
+fazem avançar o `updated_at`, e o If-Modified-Since daria um 304 errado.
+Sem ele, o If-Modified-Since é ignorado e vale só a ETag.
+
+Para que os validadores reflitam também as relações, as alterações de
+membros, tags, comentários e anexos atualizam o `updated_at` do projeto
+ou da tarefa a que pertencem (ver signals.py).
+"""
+import datetime
+import hashlib
+from django.db.models import Max, OuterRef, Subquery
+from django.http import HttpResponseNotModified
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework.exceptions import APIException
+
+
+class NotModified(APIException):
+    status_code = 304
+
+
+def latest(queryset, field, group_by):
+    """Subquery correlacionada com o maior valor de `field` em `queryset`."""
+    return Subquery(
+        queryset.order_by().values(group_by).annotate(latest=Max(field)).values('latest')[:1]
+    )
+
+
+def latest_for(model, field, **correlation):
+    """Atalho para `latest` correlacionado com o modelo exterior via OuterRef."""
+    (lookup, outer), = correlation.items()
+    return latest(model.objects.filter(**{lookup: OuterRef(outer)}), field, lookup)
+
+
+def validators_etag(full_path, validators):
+    values = sorted(validators.items())
+    digest = hashlib.md5(repr((full_path, values)).encode('utf-8')).hexdigest()
+    return f'"{digest}"'
+
+
+def validators_last_modified(validators):
+    """Maior dos instantes, ou None se algum validador não for um instante."""
+    timestamps = list(validators.values())
+    if not timestamps or not all(isinstance(value, datetime.datetime) for value in timestamps):
+        return None
+    return int(max(timestamps).timestamp())
+
+
+def with_validators(response, etag, last_modified, cache_control='private, no-cache'):
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    response['Cache-Control'] = cache_control
+    return response
+
+
+class ConditionalGetMixin:
+    """
+    Responde 304 a pedidos GET de list/retrieve cujos validadores ainda
+    correspondem aos do cliente. As verificações de autenticação e de
+    permissão (da view) correm antes; `get_validators()` deve filtrar pelos
+    objetos visíveis e devolver None quando não se aplica (ex: 404).
+    """
+    conditional_actions = ('list', 'retrieve')
+    cache_control = 'private, no-cache'
+
+    def get_validators(self):
+        raise NotImplementedError
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.etag = self.last_modified = None
+        if request.method not in ('GET', 'HEAD') or self.action not in self.conditional_actions:
+            return
+
+        validators = self.get_validators()
+        if validators is None:
+            return
+        self.etag = validators_etag(request.get_full_path(), validators)
+        self.last_modified = validators_last_modified(validators)
+
+        if get_conditional_response(request, etag=self.etag, last_modified=self.last_modified) is not None:
+            raise NotModified()
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NotModified):
+            return self._with_validators(HttpResponseNotModified())
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if getattr(self, 'etag', None) and response.status_code == 200:
+            self._with_validators(response)
+        return response
+
+    def _with_validators(self, response):
+        return with_validators(response, self.etag, self.last_modified, self.cache_control)
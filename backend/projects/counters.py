@@ -0,0 +1,118 @@
+"""
+Contadores de tarefas por projeto (Project.tasks_*).
+
+Os contadores são atualizados de forma atómica com expressões F() sempre
+que uma tarefa é criada, apagada, ou muda de estado, prioridade ou projeto
+(ver signals.py). Operações em massa que contornam os signals devem
+chamar `apply_task_counter_deltas` diretamente. `reconcile_task_counters`
+recalcula tudo a partir da tabela de tarefas e corrige desvios.
+"""
+from collections import Counter, defaultdict
+from django.db.models import Count, F
+from django.db.models.functions import Greatest
+
+TOTAL_COUNTER = 'tasks_total'
+
+
+def status_counter(status):
+    return f'tasks_{status.lower()}'
+
+
+def priority_counter(priority):
+    return f'tasks_{priority.lower()}_priority'
+
+
+def counter_fields(task_model):
+    """Nomes de todos os campos de contador, derivados das choices de Task."""
+    statuses = [value for value, _ in task_model._meta.get_field('status').choices]
+    priorities = [value for value, _ in task_model._meta.get_field('priority').choices]
+    return (
+        [TOTAL_COUNTER]
+        + [status_counter(status) for status in statuses]
+        + [priority_counter(priority) for priority in priorities]
+    )
+
+
+def counter_state(values):
+    """
+    Extrai (project_id, status, priority) de um dicionário de valores,
+    ou None se algum deles não estiver disponível (ex: campo diferido).
+    """
+    try:
+        return values['project_id'], values['status'], values['priority']
+    except KeyError:
+        return None
+
+
+def task_counter_deltas(old_state, new_state, deltas=None):
+    """
+    Acumula em `deltas` ({project_id: Counter}) as variações causadas pela
+    passagem de uma tarefa de `old_state` para `new_state`. Um estado None
+    representa a ausência da tarefa (criação ou remoção).
+    """
+    if deltas is None:
+        deltas = defaultdict(Counter)
+    if old_state == new_state:
+        return deltas
+
+    for state, sign in ((old_state, -1), (new_state, 1)):
+        if state is None:
+            continue
+        project_id, status, priority = state
+        deltas[project_id][TOTAL_COUNTER] += sign
+        deltas[project_id][status_counter(status)] += sign
+        deltas[project_id][priority_counter(priority)] += sign
+    return deltas
+
+
+def apply_task_counter_deltas(deltas, project_model=None):
+    """Aplica as variações com um único UPDATE por projeto."""
+    if project_model is None:
+        from backend.projects.models import Project as project_model
+
+    for project_id, changes in deltas.items():
+        updates = {}
+        for field, delta in changes.items():
+            if delta > 0:
+                updates[field] = F(field) + delta
+            elif delta < 0:
+                # Nunca desce abaixo de zero, mesmo com contadores desviados
+                updates[field] = Greatest(F(field) + delta, 0)
+        if updates:
+            project_model.objects.filter(pk=project_id).update(**updates)
+
+
+def reconcile_task_counters(project_model, task_model, project_ids=None, dry_run=False):
+    """
+    Recalcula os contadores a partir das tarefas e corrige os projetos com
+    desvios. Aceita os modelos históricos das migrações. Devolve os IDs dos
+    projetos que estavam desviados.
+    """
+    fields = counter_fields(task_model)
+
+    tasks = task_model.objects.all()
+    projects = project_model.objects.all()
+    if project_ids is not None:
+        tasks = tasks.filter(project_id__in=project_ids)
+        projects = projects.filter(pk__in=project_ids)
+
+    expected = defaultdict(Counter)
+    grouped = (
+        tasks.order_by()
+        .values_list('project_id', 'status', 'priority')
+        .annotate(total=Count('id'))
+    )
+    for project_id, status, priority, total in grouped:
+        expected[project_id][TOTAL_COUNTER] += total
+        expected[project_id][status_counter(status)] += total
+        expected[project_id][priority_counter(priority)] += total
+
+    drifted = []
+    for row in projects.values('id', *fields).iterator():
+        counts = expected.get(row['id'], Counter())
+        if any(row[field] != counts[field] for field in fields):
+            drifted.append(project_model(id=row['id'], **{field: counts[field] for field in fields}))
+
+    if drifted and not dry_run:
+        project_model.objects.bulk_update(drifted, fields, batch_size=500)
+    return [project.id for project in drifted]
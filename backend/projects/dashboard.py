@@ -0,0 +1,95 @@
+"""
+Resumo do dashboard: para cada projeto visível, as contagens de tarefas
+por estado e por prioridade, as tarefas em atraso e a próxima data de
+entrega, calculados numa única query agrupada por projeto com agregação
+condicional (COUNT(...) FILTER (WHERE ...)).
+
+O resultado fica na cache do Django durante DASHBOARD_CACHE_TIMEOUT
+segundos, por utilizador e por dia, com a chave versionada pelos papéis
+do utilizador: ganhar ou perder acesso a um projeto invalida-o logo; as
+restantes alterações aparecem quando a entrada expira.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Min, Q
+from django.utils import timezone
+from backend.projects.membership import project_roles_version
+from backend.projects.models import Project, Task
+
+PROJECT_FIELDS = ('id', 'name', 'status', 'is_archived', 'due_date')
+
+STATUSES = Task.Status.values
+PRIORITIES = Task.Priority.values
+
+
+def _status_alias(status):
+    return f'status_{status.lower()}'
+
+
+def _priority_alias(priority):
+    return f'priority_{priority.lower()}'
+
+
+def dashboard_aggregates(today):
+    """Agregações condicionais sobre as tarefas de cada projeto."""
+    pending = ~Q(tasks__status=Task.Status.DONE)
+    aggregates = {'total': Count('tasks')}
+    for status in STATUSES:
+        aggregates[_status_alias(status)] = Count('tasks', filter=Q(tasks__status=status))
+    for priority in PRIORITIES:
+        aggregates[_priority_alias(priority)] = Count('tasks', filter=Q(tasks__priority=priority))
+    aggregates['overdue'] = Count('tasks', filter=pending & Q(tasks__due_date__lt=today))
+    aggregates['next_due_date'] = Min('tasks__due_date', filter=pending & Q(tasks__due_date__gte=today))
+    return aggregates
+
+
+def build_dashboard(projects, today):
+    """Lê o resumo dos `projects` (queryset) numa única query."""
+    rows = (
+        projects.order_by('name', 'id')
+        .values(*PROJECT_FIELDS)
+        .annotate(**dashboard_aggregates(today))
+    )
+
+    data = []
+    totals = {
+        'total': 0,
+        'by_status': dict.fromkeys(STATUSES, 0),
+        'by_priority': dict.fromkeys(PRIORITIES, 0),
+        'overdue': 0,
+    }
+    for row in rows:
+        by_status = {status: row[_status_alias(status)] for status in STATUSES}
+        by_priority = {priority: row[_priority_alias(priority)] for priority in PRIORITIES}
+        data.append({
+            **{field: row[field] for field in PROJECT_FIELDS},
+            'tasks': {
+                'total': row['total'],
+                'by_status': by_status,
+                'by_priority': by_priority,
+                'overdue': row['overdue'],
+                'next_due_date': row['next_due_date'],
+            },
+        })
+        totals['total'] += row['total']
+        totals['overdue'] += row['overdue']
+        for status, count in by_status.items():
+            totals['by_status'][status] += count
+        for priority, count in by_priority.items():
+            totals['by_priority'][priority] += count
+    return {'date': today, 'projects': data, 'totals': totals}
+
+
+def get_dashboard(user, projects):
+    """Resumo do dashboard de `user`, passando pela cache se ativa."""
+    today = timezone.localdate()
+    timeout = settings.DASHBOARD_CACHE_TIMEOUT
+    if not timeout:
+        return build_dashboard(projects, today)
+
+    key = f'dashboard:{user.pk}:{project_roles_version(user.pk)}:{today.isoformat()}'
+    data = cache.get(key)
+    if data is None:
+        data = build_dashboard(projects, today)
+        cache.set(key, data, timeout)
+    return data
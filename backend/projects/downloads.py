@@ -0,0 +1,148 @@
+"""
+Respostas de download de anexos.
+
+O acesso é validado pela view; a transferência dos bytes pode ser delegada
+ao servidor web da frente (ATTACHMENT_SENDFILE_BACKEND):
+
+- 'nginx': cabeçalho X-Accel-Redirect para ATTACHMENT_SENDFILE_PREFIX +
+  caminho do ficheiro, que deve ser uma `location` marcada como
+  `internal` a apontar para MEDIA_ROOT;
+- 'sendfile': cabeçalho X-Sendfile com o caminho absoluto (Apache
+  mod_xsendfile, lighttpd);
+- '' (por omissão): o Django serve o ficheiro com FileResponse, que usa o
+  `wsgi.file_wrapper` do servidor (sendfile, sem cópias em Python).
+
+Em todos os modos são suportados ETag/If-None-Match e pedidos Range (no
+modo nginx/sendfile, o Range é tratado pelo próprio servidor web).
+"""
+import hashlib
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header, http_date, parse_etags, parse_http_date_safe
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def attachment_etag(attachment):
+    """ETag forte: o SHA-256 do conteúdo, ou tamanho + data para anexos antigos."""
+    if attachment.blob_id:
+        return f'"{attachment.blob.sha256}"'
+    stat = os.stat(attachment.file.path)
+    digest = hashlib.sha256(f'{attachment.file.name}:{stat.st_size}:{stat.st_mtime_ns}'.encode()).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def attachment_content_type(attachment):
+    """Tipo do conteúdo pelo nome original (os blobs não têm extensão)."""
+    return mimetypes.guess_type(attachment.original_name)[0] or 'application/octet-stream'
+
+
+def if_range_matches(if_range, etag, last_modified):
+    """
+    Se o If-Range (uma ETag ou uma data HTTP) corresponde à versão atual;
+    uma data tem de ser igual ao Last-Modified.
+    """
+    if if_range.startswith(('"', 'W/')):
+        return etag in parse_etags(if_range)
+    return parse_http_date_safe(if_range) == last_modified
+
+
+def parse_range(header, size):
+    """
+    Interpreta um cabeçalho Range com um único intervalo.
+    Devolve (início, fim) inclusivos, None se o cabeçalho não for
+    utilizável (resposta completa) ou False se não for satisfazível.
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+    if match is None:
+        return None
+    start, end = match.groups()
+    if not start and not end:
+        return None
+    if not start:
+        # Sufixo: os últimos N bytes
+        length = int(end)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def _iter_range(path, start, length):
+    with open(path, 'rb') as source:
+        source.seek(start)
+        while length > 0:
+            chunk = source.read(min(STREAM_CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def serve_attachment(request, attachment):
+    etag = attachment_etag(attachment)
+    last_modified = int(attachment.uploaded_at.timestamp())
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        return not_modified
+
+    filename = attachment.original_name or os.path.basename(attachment.file.name)
+    content_type = attachment_content_type(attachment)
+    backend = getattr(settings, 'ATTACHMENT_SENDFILE_BACKEND', '')
+
+    if backend == 'nginx':
+        # O nginx mantém o Content-Type da resposta
+        response = HttpResponse(content_type=content_type)
+        prefix = settings.ATTACHMENT_SENDFILE_PREFIX.rstrip('/')
+        response['X-Accel-Redirect'] = quote(f'{prefix}/{attachment.file.name}')
+    elif backend == 'sendfile':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = attachment.file.path
+    else:
+        response = _local_response(request, attachment, etag, last_modified, content_type)
+
+    response['Content-Disposition'] = content_disposition_header(True, filename)
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Accept-Ranges'] = 'bytes'
+    # Conteúdo privado: pode ser guardado pelo browser, mas não por proxies
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def _local_response(request, attachment, etag, last_modified, content_type):
+    path = attachment.file.path
+    size = os.path.getsize(path)
+
+    byte_range = parse_range(request.META.get('HTTP_RANGE'), size)
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if byte_range is not None and if_range and not if_range_matches(if_range, etag, last_modified):
+        # O cliente tem uma versão diferente: envia o ficheiro completo
+        byte_range = None
+
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    if byte_range is None:
+        return FileResponse(open(path, 'rb'), content_type=content_type)
+
+    start, end = byte_range
+    length = end - start + 1
+    response = StreamingHttpResponse(_iter_range(path, start, length), status=206)
+    response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Content-Length'] = str(length)
+    response['Content-Type'] = content_type
+    return response
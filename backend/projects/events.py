@@ -0,0 +1,197 @@
+"""
+Eventos em tempo real para o frontend (Server-Sent Events sobre ASGI).
+
+Os clientes abrem /api/events/ (ver sse.py) e recebem as
+alterações de tarefas, comentários e anexos dos projetos de que são
+membros, no mesmo formato das entradas de /api/changes/, com o cursor
+como `id` do evento. Ao religar, o EventSource envia o Last-Event-ID e as
+alterações perdidas entretanto são lidas do registo (changes.py).
+
+A distribuição é feita dentro do processo: cada ligação é uma Subscription
+(uma fila asyncio) registada no broker pelos projetos que acompanha. O
+broker é configurável em EVENTS_BROKER:
+
+- LocalBroker: as alterações são publicadas depois do commit, no processo
+  onde acontecem. Suficiente com um único processo.
+- ChangeLogBroker: cada processo lê periodicamente o registo de
+  alterações, partilhado por todos, e distribui pelas suas ligações.
+  Para vários workers ou servidores, sem serviços adicionais.
+
+Uma ligação inativa custa apenas a fila e o gerador suspenso (ver o
+comando load_test_events).
+"""
+import asyncio
+import logging
+import threading
+import time
+from collections import defaultdict
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import close_old_connections, transaction
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+# Tipos de alteração enviados aos clientes
+EVENT_TYPES = frozenset({'task', 'comment', 'attachment'})
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+class Subscription:
+    """Uma ligação de eventos: a fila e os projetos que acompanha."""
+
+    def __init__(self, broker, project_ids, maxsize):
+        self.broker = broker
+        self.project_ids = frozenset(project_ids)
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize)
+        self.overflowed = False
+
+    def deliver(self, event):
+        # Pode ser chamado de qualquer thread (commit, poller do registo)
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            # O event loop da ligação já terminou
+            pass
+
+    def _put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Cliente lento: a ligação é fechada e, ao religar com o
+            # Last-Event-ID, recupera as alterações a partir do registo
+            self.overflowed = True
+
+    async def get(self, timeout):
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class LocalBroker:
+    """Distribui os eventos publicados neste processo pelas suas ligações."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+
+    def subscribe(self, project_ids):
+        subscription = Subscription(self, project_ids, settings.EVENTS_QUEUE_SIZE)
+        with self._lock:
+            for project_id in subscription.project_ids:
+                self._subscribers[project_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for project_id in subscription.project_ids:
+                subscribers = self._subscribers.get(project_id)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscribers[project_id]
+
+    @property
+    def subscriber_count(self):
+        with self._lock:
+            return len(set().union(*self._subscribers.values()))
+
+    def publish(self, events):
+        """Chamado depois do commit das alterações (ver publish_changes)."""
+        for event in events:
+            self.dispatch(event)
+
+    def dispatch(self, event):
+        with self._lock:
+            subscribers = list(self._subscribers.get(event['project'], ()))
+        for subscription in subscribers:
+            subscription.deliver(event)
+
+
+class ChangeLogBroker(LocalBroker):
+    """
+    Lê o registo de alterações a cada EVENTS_POLL_INTERVAL segundos, numa
+    thread por processo iniciada na primeira ligação, e distribui as
+    novas entradas. As publicações locais são ignoradas: chegam pelo registo.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._poller = None
+        self._cursor = None
+        self._sent = set()
+
+    def subscribe(self, project_ids):
+        with self._lock:
+            if self._poller is None:
+                self._poller = threading.Thread(target=self._poll, name='change-log-events', daemon=True)
+                self._poller.start()
+        return super().subscribe(project_ids)
+
+    def publish(self, events):
+        pass
+
+    def read_changes(self):
+        """
+        Distribui as entradas novas do registo. Os ids são atribuídos no
+        INSERT e não no commit: o cursor só avança até settled_cursor() e as
+        entradas depois dele voltam a ser lidas, guardando-se as já
+        distribuídas em `_sent`.
+        """
+        from backend.projects.changes import change_entry, settled_cursor
+        from backend.projects.models import ChangeLog
+
+        if self._cursor is None:
+            # O que já existe ao arrancar não é distribuído
+            self._cursor = settled_cursor()
+            self._sent = set(ChangeLog.objects.filter(id__gt=self._cursor).values_list('id', flat=True))
+        settled = settled_cursor()
+        rows = list(
+            ChangeLog.objects.filter(id__gt=self._cursor, model__in=EVENT_TYPES)
+            .order_by('id')
+            .values_list('id', 'model', 'object_id', 'action', 'project_id')[:1000]
+        )
+        for row in rows:
+            if row[0] not in self._sent:
+                self._sent.add(row[0])
+                self.dispatch(change_entry(*row))
+        # Com a página cheia, o resto fica para a leitura seguinte
+        self._cursor = max(self._cursor, min(rows[-1][0], settled) if len(rows) == 1000 else settled)
+        self._sent = {row_id for row_id in self._sent if row_id > self._cursor}
+
+    def _poll(self):
+        while True:
+            try:
+                close_old_connections()
+                self.read_changes()
+            except Exception:
+                logger.exception("Falha ao ler o registo de alterações para os eventos.")
+            time.sleep(settings.EVENTS_POLL_INTERVAL)
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = import_string(settings.EVENTS_BROKER)()
+    return _broker
+
+
+@receiver(setting_changed)
+def _reset_broker(setting, **kwargs):
+    global _broker
+    if setting == 'EVENTS_BROKER':
+        _broker = None
+
+
+def publish_changes(entries):
+    """Publica as entradas do registo relevantes quando a transação é confirmada."""
+    events = [entry for entry in entries if entry['type'] in EVENT_TYPES]
+    if events:
+        transaction.on_commit(lambda: get_broker().publish(events))
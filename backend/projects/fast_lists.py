@@ -0,0 +1,211 @@
+"""
+Caminho rápido de leitura para as listas de projetos e tarefas.
+
+Em vez de instanciar modelos e percorrer os campos de TaskListSerializer e
+ProjectListSerializer um a um, as linhas são lidas com `values_list` (tuplos
+com nome) e convertidas por "mappers" compilados uma única vez, à
+importação do módulo. O JSON produzido tem de ser idêntico, byte a byte, ao
+dos serializers (ver os testes e o comando benchmark_list_serializers);
+qualquer campo novo nesses serializers tem de ser replicado aqui.
+
+Ativado com FAST_LIST_SERIALIZATION.
+"""
+from collections import defaultdict
+from operator import attrgetter
+from rest_framework import serializers
+from backend.accounts.models import Account
+from backend.projects.counters import counter_fields
+from backend.projects.models import ProjectMember, Task
+from backend.projects.serializers import build_tasks_summary
+from backend.projects.thumbnails import thumbnail_url
+from backend.projects.tree import PATH_SEPARATOR
+
+# Conversões partilhadas com os campos DRF, para garantir o mesmo formato
+to_date = serializers.DateField().to_representation
+to_datetime = serializers.DateTimeField().to_representation
+_picture_field = Account._meta.get_field('profile_picture')
+
+
+def row_mapper(*fields):
+    """
+    Compila uma função linha -> dict a partir de pares (chave, extrator).
+    A ordem das chaves é a dos `fields` dos serializers.
+    """
+    keys = tuple(key for key, _ in fields)
+    getters = tuple(getter for _, getter in fields)
+
+    def mapper(row):
+        return dict(zip(keys, [get(row) for get in getters]))
+    return mapper
+
+
+def column(name, convert=None):
+    get = attrgetter(name)
+    if convert is None:
+        return get
+    return lambda row: convert(get(row))
+
+
+def optional(convert):
+    return lambda value: None if value is None else convert(value)
+
+
+def full_name(first_name, last_name):
+    # Igual a AbstractUser.get_full_name
+    return f'{first_name} {last_name}'.strip()
+
+
+def avatar_url(name, thumbnail_source, request, size='sm'):
+    """Equivalente a ThumbnailField(size) para as colunas da foto e de `thumbnail_source`."""
+    if not name:
+        return None
+    url = thumbnail_url(_picture_field.attr_class(None, _picture_field, name), size, ready=thumbnail_source == name)
+    return request.build_absolute_uri(url) if request is not None else url
+
+
+# -- tarefas ------------------------------------------------------------
+
+TASK_COLUMNS = (
+    'id', 'title', 'status', 'priority', 'due_date', 'updated_at',
+    'assignee_id', 'assignee__first_name', 'assignee__last_name', 'assignee__profile_picture',
+    'assignee__thumbnail_source',
+    'comment_count', 'attachment_count',
+    # Usados pela árvore e pela paginação
+    'parent_task_id', 'path', 'priority_rank', 'created_at',
+)
+
+_task_mapper = row_mapper(
+    ('id', column('id')),
+    ('title', column('title')),
+    ('status', column('status')),
+    ('priority', column('priority')),
+    ('due_date', column('due_date', optional(to_date))),
+    ('updated_at', column('updated_at', optional(to_datetime))),
+)
+
+
+def task_rows(queryset):
+    """Linhas (tuplos com nome) de TASK_COLUMNS, com os contadores de atividade."""
+    return queryset.with_activity_counts().values_list(*TASK_COLUMNS, named=True)
+
+
+def task_descendants(rows):
+    """Subtarefas (a qualquer nível) das tarefas de topo em `rows`, numa query."""
+    listed = {row.id for row in rows}
+    prefixes = [f'{row.path}{row.id}{PATH_SEPARATOR}' for row in rows if row.parent_task_id not in listed]
+    if not prefixes:
+        return task_rows(Task.objects.none())
+    return task_rows(Task.objects.under_paths(*prefixes))
+
+
+def task_tags(task_ids):
+    through = Task.tags.through.objects.filter(task_id__in=task_ids)
+    return through.order_by('tag__name').values_list('task_id', 'tag_id', 'tag__name', 'tag__color')
+
+
+def serialize_tasks(rows, request=None):
+    """
+    Representação de `rows` igual à de TaskListSerializer(many=True),
+    incluindo as subtarefas, lidas numa única query pelo `path`.
+    """
+    nodes = task_nodes(rows, list(task_descendants(rows)))
+    return build_tasks(rows, nodes, task_tags([row.id for row in nodes]), request)
+
+
+def task_nodes(rows, descendants):
+    listed = {row.id for row in rows}
+    return list(rows) + [row for row in descendants if row.id not in listed]
+
+
+def build_tasks(rows, nodes, tag_rows, request=None):
+    """Monta a árvore a partir das linhas já lidas (`nodes` inclui `rows`)."""
+    tags = defaultdict(list)
+    for task_id, tag_id, name, color in tag_rows:
+        tags[task_id].append({'id': tag_id, 'name': name, 'color': color})
+
+    items = {}
+    for row in nodes:
+        item = _task_mapper(row)
+        item['assignee'] = None if row.assignee_id is None else {
+            'id': row.assignee_id,
+            'first_name': row.assignee__first_name,
+            'last_name': row.assignee__last_name,
+            'profile_picture': avatar_url(row.assignee__profile_picture, row.assignee__thumbnail_source, request),
+        }
+        item['tags'] = tags.get(row.id, [])
+        item['comment_count'] = row.comment_count
+        item['attachment_count'] = row.attachment_count
+        item['subtasks'] = []
+        items[row.id] = item
+
+    # Mesma ligação que build_task_tree: filhos pela ordem em `nodes`
+    for row in nodes:
+        parent = items.get(row.parent_task_id)
+        if parent is not None:
+            parent['subtasks'].append(items[row.id])
+    return [items[row.id] for row in rows]
+
+
+# -- projetos -----------------------------------------------------------
+
+PROJECT_COLUMNS = (
+    'id', 'name', 'description', 'status', 'is_archived', 'due_date',
+    'owner__first_name', 'owner__last_name',
+    'comment_count', 'attachment_count', 'created_at',
+    *counter_fields(Task),
+)
+
+_project_mapper = row_mapper(
+    ('id', column('id')),
+    ('name', column('name')),
+    ('description', column('description')),
+    ('status', column('status')),
+    ('is_archived', column('is_archived')),
+    ('due_date', column('due_date', optional(to_date))),
+    ('owner_name', lambda row: full_name(row.owner__first_name, row.owner__last_name)),
+)
+
+
+def project_rows(queryset):
+    return queryset.with_activity_counts().values_list(*PROJECT_COLUMNS, named=True)
+
+
+def progress_percentage(row):
+    # Igual a Project.progress_percentage
+    if not row.tasks_total:
+        return 0
+    return round((row.tasks_done / row.tasks_total) * 100)
+
+
+def project_members(rows):
+    memberships = ProjectMember.objects.filter(project_id__in=[row.id for row in rows])
+    return memberships.order_by('user_id').values_list(
+        'project_id', 'user_id', 'user__first_name', 'user__last_name', 'user__profile_picture',
+        'user__thumbnail_source',
+    )
+
+
+def serialize_projects(rows, request=None):
+    """Representação de `rows` igual à de ProjectListSerializer(many=True)."""
+    return build_projects(rows, project_members(rows), request)
+
+
+def build_projects(rows, member_rows, request=None):
+    members = defaultdict(list)
+    for project_id, user_id, first_name, last_name, picture, thumbnail_source in member_rows:
+        members[project_id].append({
+            'id': user_id,
+            'full_name': full_name(first_name, last_name),
+            'profile_picture': avatar_url(picture, thumbnail_source, request),
+        })
+
+    data = []
+    for row in rows:
+        item = _project_mapper(row)
+        item['members'] = members.get(row.id, [])
+        item['progress_percentage'] = progress_percentage(row)
+        item['tasks_summary'] = build_tasks_summary(row)
+        item['comment_count'] = row.comment_count
+        item['attachment_count'] = row.attachment_count
+        data.append(item)
+    return data
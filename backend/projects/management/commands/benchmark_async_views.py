@@ -0,0 +1,196 @@
+import asyncio
+import io
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import AccessToken
+from backend.accounts.models import Account
+from backend.projects.membership import load_project_roles
+from backend.projects.models import Tag
+
+MODES = ('wsgi', 'asgi', 'asgi-async')
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede o débito e as latências (p50/p99) dos endpoints de leitura sob "
+        "concorrência, em processo: WSGI com uma thread por pedido em curso, "
+        "ASGI com as viewsets síncronas e ASGI com as views assíncronas "
+        "(ASYNC_READ_VIEWS). Confirma também que as respostas são iguais."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('email', help="Utilizador em nome de quem os pedidos são feitos.")
+        parser.add_argument('--requests', type=int, default=200, help="Pedidos por endpoint e modo.")
+        parser.add_argument('--concurrency', type=int, default=20, help="Pedidos em simultâneo.")
+        parser.add_argument('--mode', choices=MODES, action='append', help="Modos a medir (por omissão, todos).")
+        parser.add_argument('--page-size', type=int, default=50)
+
+    def handle(self, *args, **options):
+        try:
+            user = Account.objects.get(email=options['email'])
+        except Account.DoesNotExist:
+            raise CommandError(f"Utilizador inexistente: {options['email']}")
+
+        urls = [reverse('project-list'), reverse('task-list'), reverse('tag-list'), reverse('profile')]
+        project_id = min(load_project_roles(user), default=None)
+        if project_id is not None:
+            urls += [
+                reverse('project-detail', kwargs={'pk': project_id}),
+                reverse('project-tasks-list', kwargs={'project_pk': project_id}),
+            ]
+        tag_id = Tag.objects.order_by('pk').values_list('pk', flat=True).first()
+        if tag_id is not None:
+            urls.append(reverse('tag-detail', kwargs={'pk': tag_id}))
+
+        headers = {'authorization': f'Bearer {AccessToken.for_user(user)}'}
+        query = f"page_size={options['page_size']}"
+        requests, concurrency = options['requests'], options['concurrency']
+        self.stdout.write(f"{requests} pedidos por endpoint, {concurrency} em simultâneo")
+
+        # Os pedidos são feitos em processo, com o host do cliente de testes
+        allowed_hosts = [*settings.ALLOWED_HOSTS, 'testserver']
+        with override_settings(ALLOWED_HOSTS=allowed_hosts):
+            for url in urls:
+                bodies = {}
+                for mode in options['mode'] or MODES:
+                    body, latencies, errors, elapsed = self.measure(mode, url, query, headers, requests, concurrency)
+                    bodies[mode] = body
+                    self.stdout.write(
+                        f"{url} [{mode}]: {requests / elapsed:,.0f} pedidos/s"
+                        f" | p50 {self.percentile(latencies, 50):.1f} ms"
+                        f" | p99 {self.percentile(latencies, 99):.1f} ms"
+                        + (f" | {errors} erro(s)" if errors else "")
+                    )
+                if len(set(bodies.values())) > 1:
+                    raise CommandError(f"{url}: as respostas dos modos diferem.")
+
+    def measure(self, mode, path, query, headers, requests, concurrency):
+        if mode == 'wsgi':
+            run = WSGIRunner(path, query, headers).run
+        else:
+            run = ASGIRunner(path, query, headers).run
+        with override_settings(ASYNC_READ_VIEWS=mode == 'asgi-async'):
+            # Um pedido de aquecimento (ligações, caches) fora da medição
+            (status, body, _), = run(1, 1)
+            if status != 200:
+                raise CommandError(f"{path} [{mode}]: HTTP {status}")
+            started = time.perf_counter()
+            results = run(requests, concurrency)
+            elapsed = time.perf_counter() - started
+        latencies = [latency for _, _, latency in results]
+        errors = sum(status != 200 for status, _, _ in results)
+        return body, latencies, errors, elapsed
+
+    @staticmethod
+    def percentile(latencies, percent):
+        if len(latencies) < 2:
+            return latencies[0] * 1000 if latencies else 0
+        return statistics.quantiles(latencies, n=100, method='inclusive')[percent - 1] * 1000
+
+
+class WSGIRunner:
+    """Pedidos à aplicação WSGI a partir de um pool de threads (como um servidor com threads)."""
+
+    def __init__(self, path, query, headers):
+        self.application = WSGIHandler()
+        self.environ = {
+            'REQUEST_METHOD': 'GET',
+            'SCRIPT_NAME': '',
+            'PATH_INFO': path,
+            'QUERY_STRING': query,
+            'SERVER_NAME': 'testserver',
+            'SERVER_PORT': '80',
+            'SERVER_PROTOCOL': 'HTTP/1.1',
+            'REMOTE_ADDR': '127.0.0.1',
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': 'http',
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': False,
+            'wsgi.run_once': False,
+            **{f"HTTP_{name.upper().replace('-', '_')}": value for name, value in headers.items()},
+        }
+
+    def request(self):
+        started = time.perf_counter()
+        status = []
+        environ = {**self.environ, 'wsgi.input': io.BytesIO()}
+        response = self.application(environ, lambda line, headers, exc_info=None: status.append(line))
+        try:
+            body = b''.join(response)
+        finally:
+            response.close()
+        return int(status[0].split()[0]), body, time.perf_counter() - started
+
+    def run(self, requests, concurrency):
+        with ThreadPoolExecutor(concurrency) as executor:
+            return list(executor.map(lambda _: self.request(), range(requests)))
+
+
+class ASGIRunner:
+    """Pedidos à aplicação ASGI (backend/asgi.py) como tarefas num único event loop."""
+
+    def __init__(self, path, query, headers):
+        from backend.asgi import application
+        self.application = application
+        self.scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': 'GET',
+            'scheme': 'http',
+            'path': path,
+            'raw_path': path.encode(),
+            'query_string': query.encode(),
+            'root_path': '',
+            'headers': [
+                (b'host', b'testserver'),
+                *((name.encode(), value.encode()) for name, value in headers.items()),
+            ],
+            'client': ('127.0.0.1', 0),
+            'server': ('testserver', 80),
+        }
+
+    async def request(self):
+        started = time.perf_counter()
+        messages = []
+        received = False
+        finished = asyncio.Event()
+
+        async def receive():
+            nonlocal received
+            if not received:
+                received = True
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+            # O cliente não desliga; o Django cancela esta espera no fim
+            await finished.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            messages.append(message)
+
+        await self.application(dict(self.scope), receive, send)
+        finished.set()
+        status = messages[0]['status']
+        body = b''.join(message.get('body', b'') for message in messages[1:])
+        return status, body, time.perf_counter() - started
+
+    def run(self, requests, concurrency):
+        async def worker(remaining, results):
+            while remaining:
+                remaining.pop()
+                results.append(await self.request())
+
+        async def main():
+            remaining, results = list(range(requests)), []
+            await asyncio.gather(*(worker(remaining, results) for _ in range(concurrency)))
+            return results
+
+        return asyncio.run(main())
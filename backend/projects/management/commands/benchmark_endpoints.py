@@ -0,0 +1,221 @@
+import contextlib
+import json
+import statistics
+import time
+import tracemalloc
+from django.conf import settings
+from django.db import connections
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework_simplejwt.tokens import AccessToken
+from backend.accounts.models import Account
+from backend.projects.membership import load_project_roles
+from backend.projects.models import Task
+from backend.projects.urls import router, tasks_router
+
+# Endpoints fora dos routers, com a query string usada
+EXTRA_ENDPOINTS = {
+    'search': ('search', ''),
+    'dashboard': ('dashboard', ''),
+    'changes': ('changes', ''),
+    'profile': ('profile', ''),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede, com o cliente de testes, todos os endpoints GET dos routers "
+        "(listas, detalhes e ações) e os de pesquisa, dashboard, alterações e "
+        "perfil: latências (p50/p95/p99), queries e pico de memória por pedido. "
+        "Grava um relatório JSON e compara-o com um relatório anterior "
+        "(--baseline), assinalando as regressões."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('email', help="Utilizador em nome de quem os pedidos são feitos.")
+        parser.add_argument('--repeat', type=int, default=50, help="Pedidos medidos por endpoint.")
+        parser.add_argument('--output', help="Ficheiro onde gravar o relatório JSON.")
+        parser.add_argument('--baseline', help="Relatório JSON com que comparar.")
+        parser.add_argument(
+            '--tolerance', type=float, default=0.2,
+            help="Aumento relativo do p95 e da memória tolerado face à baseline (0.2 = 20%%).",
+        )
+        parser.add_argument(
+            '--fail-on-regression', action='store_true',
+            help="Termina com erro se houver regressões face à baseline.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            user = Account.objects.get(email=options['email'])
+        except Account.DoesNotExist:
+            raise CommandError(f"Utilizador inexistente: {options['email']}")
+        if options['repeat'] < 1:
+            raise CommandError("--repeat tem de ser pelo menos 1.")
+        baseline = self.load_baseline(options['baseline']) if options['baseline'] else None
+
+        # Um endpoint que falhe fica no relatório com o estado HTTP, sem interromper os outros
+        client = Client(
+            raise_request_exception=False,
+            headers={'authorization': f'Bearer {AccessToken.for_user(user)}'},
+        )
+        results = {}
+        # Os pedidos são feitos em processo, com o host do cliente de testes
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            for name, url in self.endpoints(user).items():
+                results[name] = result = self.measure(client, url, options['repeat'])
+                self.stdout.write(
+                    f"{name} {url}: HTTP {result['status']}"
+                    f" | p50 {result['p50_ms']:.1f} ms | p95 {result['p95_ms']:.1f} ms"
+                    f" | p99 {result['p99_ms']:.1f} ms | {result['queries']} queries"
+                    f" | {result['peak_memory_kb']:,.0f} KB"
+                )
+
+        report = {
+            'created_at': timezone.now().isoformat(),
+            'user': user.email,
+            'repeat': options['repeat'],
+            'endpoints': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, indent=2)
+            self.stdout.write(f"Relatório gravado em {options['output']}")
+
+        if baseline is not None:
+            regressions = self.compare(baseline, report, options['tolerance'])
+            for regression in regressions:
+                self.stdout.write(self.style.WARNING(regression))
+            if not regressions:
+                self.stdout.write(self.style.SUCCESS("Sem regressões face à baseline."))
+            elif options['fail_on_regression']:
+                raise CommandError(f"{len(regressions)} regressão(ões) face à baseline.")
+
+    @staticmethod
+    def load_baseline(path):
+        try:
+            with open(path) as baseline:
+                return json.load(baseline)
+        except (OSError, ValueError) as error:
+            raise CommandError(f"Baseline ilegível ({path}): {error}")
+
+    # -- endpoints --------------------------------------------------------
+
+    def endpoints(self, user):
+        """URLs a medir, pelo nome da rota, com objetos de exemplo visíveis para o utilizador."""
+        project_ids = list(load_project_roles(user))
+        project_id = min(project_ids, default=None)
+        endpoints = {}
+        for registry_router, kwargs in ((router, {}), (tasks_router, {'project_pk': project_id})):
+            if None in kwargs.values():
+                continue
+            for prefix, viewset, basename in registry_router.registry:
+                sample = None
+                for route in registry_router.get_routes(viewset):
+                    if 'get' not in registry_router.get_method_map(viewset, route.mapping):
+                        continue
+                    name = route.name.format(basename=basename)
+                    if not route.detail:
+                        endpoints[name] = reverse(name, kwargs=kwargs)
+                        continue
+                    if sample is None:
+                        sample = self.sample_pk(viewset, user, kwargs)
+                    if sample is not None:
+                        endpoints[name] = reverse(name, kwargs={**kwargs, 'pk': sample})
+
+        word = Task.objects.filter(project_id__in=project_ids).values_list('title', flat=True).first()
+        for name, (url_name, query) in EXTRA_ENDPOINTS.items():
+            if name == 'search':
+                if not word:
+                    continue
+                query = f'q={word.split()[0]}'
+            endpoints[name] = reverse(url_name) + (f'?{query}' if query else '')
+        return endpoints
+
+    @staticmethod
+    def sample_pk(viewset, user, kwargs):
+        """Primeiro objeto do queryset da viewset para o utilizador (None se não houver)."""
+        if not hasattr(viewset, 'get_queryset'):
+            return None
+        request = Request(RequestFactory().get('/'))
+        request.user = user
+        view = viewset(action='retrieve', kwargs=kwargs, format_kwarg=None, request=request)
+        return view.get_queryset().order_by('pk').values_list('pk', flat=True).first()
+
+    # -- medição ----------------------------------------------------------
+
+    def measure(self, client, url, repeat):
+        # Um pedido de aquecimento (ligações, caches) fora da medição
+        status = self.request(client, url)
+        latencies = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            self.request(client, url)
+            latencies.append((time.perf_counter() - started) * 1000)
+
+        # Queries e memória em passagens à parte, para não pesarem nas latências
+        with contextlib.ExitStack() as stack:
+            contexts = [stack.enter_context(CaptureQueriesContext(connection)) for connection in connections.all()]
+            self.request(client, url)
+        queries = sum(len(context) for context in contexts)
+
+        tracemalloc.start()
+        try:
+            self.request(client, url)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        return {
+            'url': url,
+            'status': status,
+            'p50_ms': round(self.percentile(latencies, 50), 3),
+            'p95_ms': round(self.percentile(latencies, 95), 3),
+            'p99_ms': round(self.percentile(latencies, 99), 3),
+            'mean_ms': round(statistics.fmean(latencies), 3),
+            'queries': queries,
+            'peak_memory_kb': round(peak / 1024, 1),
+        }
+
+    @staticmethod
+    def request(client, url):
+        response = client.get(url)
+        try:
+            # Lê também as respostas em streaming (downloads)
+            response.getvalue()
+        finally:
+            response.close()
+        return response.status_code
+
+    @staticmethod
+    def percentile(latencies, percent):
+        if len(latencies) < 2:
+            return latencies[0]
+        return statistics.quantiles(latencies, n=100, method='inclusive')[percent - 1]
+
+    # -- comparação -------------------------------------------------------
+
+    @staticmethod
+    def compare(baseline, report, tolerance):
+        """Regressões do relatório face à baseline, em texto."""
+        regressions = []
+        for name, before in baseline.get('endpoints', {}).items():
+            after = report['endpoints'].get(name)
+            if after is None:
+                continue
+            if after['status'] != before['status']:
+                regressions.append(f"{name}: HTTP {before['status']} -> {after['status']}")
+            # Abaixo de 1 ms, as diferenças são sobretudo ruído
+            if after['p95_ms'] > before['p95_ms'] * (1 + tolerance) and after['p95_ms'] - before['p95_ms'] > 1:
+                regressions.append(f"{name}: p95 {before['p95_ms']:.1f} ms -> {after['p95_ms']:.1f} ms")
+            if after['queries'] > before['queries']:
+                regressions.append(f"{name}: {before['queries']} -> {after['queries']} queries")
+            if after['peak_memory_kb'] > before['peak_memory_kb'] * (1 + tolerance):
+                regressions.append(
+                    f"{name}: memória {before['peak_memory_kb']:,.0f} KB -> {after['peak_memory_kb']:,.0f} KB"
+                )
+        return regressions
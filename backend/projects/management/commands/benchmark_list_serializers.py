@@ -0,0 +1,77 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+from django.urls import resolve, reverse
+from rest_framework.test import APIRequestFactory, force_authenticate
+from backend.accounts.models import Account
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara o débito das listas de projetos e tarefas com os serializers "
+        "e com o caminho rápido (FAST_LIST_SERIALIZATION), e confirma que as "
+        "respostas são idênticas."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('email', help="Utilizador em nome de quem os pedidos são feitos.")
+        parser.add_argument(
+            '--project',
+            type=int,
+            action='append',
+            default=[],
+            help="Inclui a lista de tarefas deste projeto (pode repetir-se)."
+        )
+        parser.add_argument('--repeat', type=int, default=20, help="Pedidos por medição.")
+        parser.add_argument('--page-size', type=int, default=200)
+
+    def handle(self, *args, **options):
+        try:
+            user = Account.objects.get(email=options['email'])
+        except Account.DoesNotExist:
+            raise CommandError(f"Utilizador inexistente: {options['email']}")
+
+        urls = [reverse('project-list'), reverse('task-list')]
+        urls += [
+            reverse('project-tasks-list', kwargs={'project_pk': project_id})
+            for project_id in options['project']
+        ]
+
+        for url in urls:
+            url = f"{url}?page_size={options['page_size']}"
+            slow_body, slow_time, rows = self.measure(url, user, options['repeat'], fast=False)
+            fast_body, fast_time, _ = self.measure(url, user, options['repeat'], fast=True)
+
+            if slow_body != fast_body:
+                raise CommandError(f"{url}: as respostas dos dois caminhos diferem.")
+            self.stdout.write(
+                f"{url}: {rows} linhas | serializers {self.rate(rows, slow_time)} linhas/s"
+                f" | rápido {self.rate(rows, fast_time)} linhas/s"
+                f" | {slow_time / fast_time:.1f}x"
+            )
+
+    def measure(self, url, user, repeat, fast):
+        factory = APIRequestFactory()
+        match = resolve(url.split('?')[0])
+        # Os pedidos são feitos em processo, com o host do APIRequestFactory
+        allowed_hosts = [*settings.ALLOWED_HOSTS, 'testserver']
+        with override_settings(FAST_LIST_SERIALIZATION=fast, ALLOWED_HOSTS=allowed_hosts):
+            # Um pedido de aquecimento (caches, miniaturas) fora da medição
+            body, rows = self.request(factory, match, url, user)
+            started = time.perf_counter()
+            for _ in range(repeat):
+                self.request(factory, match, url, user)
+            elapsed = (time.perf_counter() - started) / repeat
+        return body, elapsed, rows
+
+    def request(self, factory, match, url, user):
+        request = factory.get(url)
+        force_authenticate(request, user=user)
+        response = match.func(request, *match.args, **match.kwargs)
+        response.render()
+        return response.content, len(response.data['results'])
+
+    @staticmethod
+    def rate(rows, elapsed):
+        return f"{rows / elapsed:,.0f}" if elapsed else "-"
@@ -0,0 +1,240 @@
+import hashlib
+import random
+from django.contrib.auth.hashers import make_password
+from django.contrib.contenttypes.models import ContentType
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from backend.accounts.models import Account
+from backend.projects.catalogue import invalidate_tag_catalogue
+from backend.projects.counters import reconcile_task_counters
+from backend.projects.membership import invalidate_project_roles
+from backend.projects.models import Attachment, Blob, Comment, Project, ProjectMember, Tag, Task, get_blob_path
+from backend.projects.tree import child_path
+
+FIRST_NAMES = (
+    'Ana', 'Bruno', 'Carla', 'Diego', 'Eduarda', 'Fábio', 'Gabriela', 'Hugo', 'Inês', 'João',
+    'Larissa', 'Marcos', 'Natália', 'Otávio', 'Paula', 'Rafael', 'Sofia', 'Tiago', 'Vera', 'Yuri',
+)
+LAST_NAMES = (
+    'Almeida', 'Barbosa', 'Costa', 'Dias', 'Ferreira', 'Gomes', 'Lima', 'Martins', 'Nunes',
+    'Oliveira', 'Pereira', 'Ribeiro', 'Santos', 'Silva', 'Souza', 'Teixeira',
+)
+JOB_TITLES = ('Desenvolvedor', 'Designer', 'Gestor de Projeto', 'Analista', 'QA', 'DevOps', '')
+WORDS = (
+    'api', 'autenticação', 'base', 'cliente', 'componente', 'configurar', 'corrigir', 'dados',
+    'deploy', 'documentação', 'ecrã', 'erro', 'exportar', 'filtro', 'formulário', 'integração',
+    'interface', 'lista', 'login', 'migração', 'módulo', 'notificação', 'pagamento', 'painel',
+    'perfil', 'pesquisa', 'relatório', 'rever', 'serviço', 'sincronizar', 'teste', 'utilizador',
+    'validação', 'versão',
+)
+TAG_NAMES = (
+    'backend', 'frontend', 'bug', 'melhoria', 'ux', 'infra', 'segurança', 'desempenho',
+    'documentação', 'urgente', 'mobile', 'api', 'testes', 'dados', 'design',
+)
+
+STATUS_WEIGHTS = {
+    Task.Status.TODO: 4, Task.Status.IN_PROGRESS: 2, Task.Status.IN_REVIEW: 1,
+    Task.Status.DONE: 4, Task.Status.BLOCKED: 1,
+}
+PRIORITY_WEIGHTS = {
+    Task.Priority.LOW: 3, Task.Priority.MEDIUM: 4, Task.Priority.HIGH: 2, Task.Priority.URGENT: 1,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Gera dados sintéticos em massa para testes de carga: contas, projetos com "
+        "membros, árvores de tarefas, tags, comentários e anexos (metadados, todos "
+        "com o mesmo conteúdo). As escritas são feitas com bulk_create, sem passar "
+        "pelos signals: o registo de alterações não é preenchido, mas os caminhos "
+        "das tarefas, os contadores e as caches são atualizados no fim."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--accounts', type=int, default=1000)
+        parser.add_argument('--projects', type=int, default=100)
+        parser.add_argument('--members', type=int, default=8, help="Membros por projeto, além do dono.")
+        parser.add_argument('--tasks', type=int, default=200, help="Tarefas por projeto.")
+        parser.add_argument('--depth', type=int, default=4, help="Níveis máximos da árvore de tarefas.")
+        parser.add_argument('--tags', type=int, default=30)
+        parser.add_argument('--comments', type=float, default=2, help="Comentários por tarefa (média).")
+        parser.add_argument('--attachments', type=float, default=0.2, help="Anexos por tarefa (média).")
+        parser.add_argument('--email-prefix', default='fake', help="As contas são <prefixo>-<n>@example.com.")
+        parser.add_argument('--password', default='devminder', help="Palavra-passe de todas as contas.")
+        parser.add_argument('--seed', type=int, help="Semente, para gerar sempre os mesmos dados.")
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if options['accounts'] < 1 or options['depth'] < 1:
+            raise CommandError("São precisos pelo menos uma conta e um nível de tarefas.")
+        self.random = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+
+        accounts = self.create_accounts(options['accounts'], options['email_prefix'], options['password'])
+        tags = self.create_tags(options['tags'])
+        blob = self.attachment_blob() if options['attachments'] else None
+
+        project_ids, totals = [], {'tasks': 0, 'comments': 0, 'attachments': 0}
+        for _ in range(options['projects']):
+            with transaction.atomic():
+                project = self.create_project(accounts, options['members'])
+                tasks = self.create_tasks(project, [project.owner_id, *self.member_ids], options['tasks'], options['depth'])
+                self.tag_tasks(tasks, tags)
+                totals['comments'] += self.create_comments(tasks, self.member_ids, options['comments'])
+                if blob is not None:
+                    totals['attachments'] += self.create_attachments(tasks, self.member_ids, options['attachments'], blob)
+            project_ids.append(project.pk)
+            totals['tasks'] += len(tasks)
+
+        if blob is not None:
+            Blob.objects.filter(pk=blob.pk).update(ref_count=blob.attachments.count())
+        # bulk_create não passa pelos signals: contadores e caches
+        reconcile_task_counters(Project, Task, project_ids=project_ids)
+        invalidate_project_roles(*(account.pk for account in accounts))
+        invalidate_tag_catalogue()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(accounts)} conta(s), {len(project_ids)} projeto(s), {totals['tasks']} tarefa(s), "
+            f"{len(tags)} tag(s), {totals['comments']} comentário(s) e {totals['attachments']} anexo(s) criados."
+        ))
+        self.stdout.write(f"Exemplo de conta: {accounts[0].email} / {options['password']}")
+
+    # -- geração --------------------------------------------------------
+
+    def sentence(self, words=6):
+        text = ' '.join(self.random.choice(WORDS) for _ in range(self.random.randint(max(1, words - 3), words + 3)))
+        return text.capitalize()
+
+    def amount(self, average):
+        """Quantidade aleatória com a média indicada."""
+        whole = int(average)
+        return self.random.randint(0, 2 * whole) + (self.random.random() < average - whole)
+
+    def weighted(self, weights):
+        return self.random.choices(list(weights), weights=list(weights.values()))[0]
+
+    def create_accounts(self, count, prefix, password):
+        start = Account.objects.filter(email__startswith=f'{prefix}-').count() + 1
+        password = make_password(password)
+        accounts = [
+            Account(
+                email=f'{prefix}-{number}@example.com',
+                password=password,
+                first_name=self.random.choice(FIRST_NAMES),
+                last_name=self.random.choice(LAST_NAMES),
+                job_title=self.random.choice(JOB_TITLES),
+            )
+            for number in range(start, start + count)
+        ]
+        return Account.objects.bulk_create(accounts, batch_size=self.batch_size)
+
+    def create_tags(self, count):
+        # Depois de esgotados os nomes: backend-2, frontend-2, ...
+        names = [
+            TAG_NAMES[index % len(TAG_NAMES)] + (f'-{index // len(TAG_NAMES) + 1}' if index >= len(TAG_NAMES) else '')
+            for index in range(count)
+        ]
+        Tag.objects.bulk_create(
+            [Tag(name=name, color=f'#{self.random.randrange(0x1000000):06X}') for name in names],
+            batch_size=self.batch_size,
+            ignore_conflicts=True,
+        )
+        return list(Tag.objects.filter(name__in=names).values_list('pk', flat=True))
+
+    def attachment_blob(self):
+        content = b'Anexo gerado por generate_fake_data.\n'
+        sha256 = hashlib.sha256(content).hexdigest()
+        blob = Blob.objects.filter(sha256=sha256).first()
+        if blob is None:
+            name = default_storage.save(get_blob_path(sha256), ContentFile(content))
+            blob = Blob.objects.create(sha256=sha256, file=name, size=len(content))
+        return blob
+
+    def create_project(self, accounts, members):
+        owner = self.random.choice(accounts)
+        project = Project.objects.create(
+            owner=owner,
+            name=self.sentence(3),
+            description=self.sentence(20),
+            status=self.random.choice(Project.Status.values),
+        )
+        others = [account.pk for account in accounts if account.pk != owner.pk]
+        self.member_ids = self.random.sample(others, min(members, len(others)))
+        ProjectMember.objects.bulk_create(
+            [ProjectMember(project=project, user_id=owner.pk, role=ProjectMember.Role.ADMIN)]
+            + [ProjectMember(project=project, user_id=user_id) for user_id in self.member_ids]
+        )
+        self.member_ids.append(owner.pk)
+        return project
+
+    def create_tasks(self, project, assignees, count, depth):
+        """Cria a árvore nível a nível: cada nível precisa dos IDs (e caminhos) do anterior."""
+        levels = [[] for _ in range(depth)]
+        for index in range(count):
+            level = 0 if index == 0 else self.random.choices(range(depth), weights=[2 ** -level for level in range(depth)])[0]
+            # Só há filhos se o nível de cima já tiver tarefas
+            while level and not levels[level - 1]:
+                level -= 1
+            levels[level].append(index)
+
+        created = []
+        parents = []
+        for level in levels:
+            tasks = [
+                Task(
+                    project=project,
+                    title=self.sentence(5),
+                    description=self.sentence(12)[:255],
+                    status=self.weighted(STATUS_WEIGHTS),
+                    priority=self.weighted(PRIORITY_WEIGHTS),
+                    assignee_id=self.random.choice(assignees + [None]),
+                    parent_task=parent,
+                    path=child_path(parent) if parent is not None else '',
+                )
+                for parent in (self.random.choice(parents) if parents else None for _ in level)
+            ]
+            parents = Task.objects.bulk_create(tasks, batch_size=self.batch_size)
+            created += parents
+        return created
+
+    def tag_tasks(self, tasks, tags):
+        if not tags:
+            return
+        through = Task.tags.through
+        through.objects.bulk_create(
+            [
+                through(task_id=task.pk, tag_id=tag_id)
+                for task in tasks
+                for tag_id in self.random.sample(tags, min(len(tags), self.random.randint(0, 3)))
+            ],
+            batch_size=self.batch_size,
+        )
+
+    def create_comments(self, tasks, authors, average):
+        content_type = ContentType.objects.get_for_model(Task)
+        comments = [
+            Comment(author_id=self.random.choice(authors), text=self.sentence(15), content_type=content_type, object_id=task.pk)
+            for task in tasks
+            for _ in range(self.amount(average))
+        ]
+        Comment.objects.bulk_create(comments, batch_size=self.batch_size)
+        return len(comments)
+
+    def create_attachments(self, tasks, authors, average, blob):
+        content_type = ContentType.objects.get_for_model(Task)
+        attachments = [
+            Attachment(
+                uploaded_by_id=self.random.choice(authors),
+                file=blob.file.name,
+                blob=blob,
+                original_name=f'{self.random.choice(WORDS)}.txt',
+                content_type=content_type,
+                object_id=task.pk,
+            )
+            for task in tasks
+            for _ in range(self.amount(average))
+        ]
+        Attachment.objects.bulk_create(attachments, batch_size=self.batch_size)
+        return len(attachments)
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from django.db.models import F
+from backend.accounts.models import Account
+from backend.projects.models import Attachment, Blob
+from backend.projects.thumbnails import generate_thumbnails, is_image
+
+
+class Command(BaseCommand):
+    help = (
+        "Gera as miniaturas que ainda não estão registadas: fotos de perfil e "
+        "anexos de imagem gravados antes de existirem, ou cuja geração falhou "
+        "(ver projects/thumbnails.py)."
+    )
+
+    def handle(self, *args, **options):
+        names = set(
+            Account.objects.exclude(profile_picture='')
+            .exclude(thumbnail_source=F('profile_picture'))
+            .values_list('profile_picture', flat=True)
+        )
+        # Os blobs não têm extensão: o tipo vem do nome original dos anexos
+        pending = Blob.objects.filter(thumbnails_ready=False).values('pk')
+        names.update(
+            file for file, original_name in Attachment.objects.filter(blob__in=pending)
+            .values_list('blob__file', 'original_name').distinct()
+            if is_image(original_name or file)
+        )
+
+        failed = [name for name in sorted(names) if not generate_thumbnails(name)]
+        for name in failed:
+            self.stdout.write(self.style.WARNING(f"Sem miniaturas: {name}"))
+        self.stdout.write(self.style.SUCCESS(
+            f"Miniaturas geradas para {len(names) - len(failed)} imagem(ns)."
+        ))
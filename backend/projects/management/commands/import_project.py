@@ -0,0 +1,54 @@
+import sys
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from backend.accounts.models import Account
+from backend.projects.transfer import ProjectImportError, ProjectImporter
+
+
+class Command(BaseCommand):
+    help = (
+        "Importa um projeto exportado em NDJSON (GET /api/projects/<id>/export/) "
+        "como um projeto novo, numa única transação (ver projects/transfer.py)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Ficheiro NDJSON ('-' para ler da entrada padrão).")
+        parser.add_argument(
+            '--owner',
+            help="Email do dono do projeto importado (por omissão, o da exportação); fica também como Admin."
+        )
+        parser.add_argument('--batch-size', type=int, default=1000, help="Registos por bulk_create.")
+
+    def handle(self, *args, **options):
+        owner = None
+        if options['owner']:
+            try:
+                owner = Account.objects.get(email=options['owner'])
+            except Account.DoesNotExist:
+                raise CommandError(f"Utilizador inexistente: {options['owner']}")
+
+        importer = ProjectImporter(owner=owner, batch_size=options['batch_size'])
+        try:
+            with transaction.atomic():
+                if options['path'] == '-':
+                    project = importer.load(sys.stdin)
+                else:
+                    with open(options['path'], encoding='utf-8') as lines:
+                        project = importer.load(lines)
+        except OSError as error:
+            raise CommandError(f"Não foi possível ler {options['path']}: {error}")
+        except ProjectImportError as error:
+            raise CommandError(f"Importação cancelada: {error}")
+
+        stats = importer.stats
+        self.stdout.write(self.style.SUCCESS(
+            f"Projeto {project.pk} criado: {stats['task']} tarefa(s), {stats['member']} membro(s), "
+            f"{stats['feedback']} feedback(s), {stats['comment']} comentário(s), "
+            f"{stats['attachments_imported']} anexo(s)."
+        ))
+        if stats['accounts_created']:
+            self.stdout.write(f"{stats['accounts_created']} conta(s) criada(s) sem palavra-passe.")
+        if stats['attachments_skipped']:
+            self.stdout.write(self.style.WARNING(
+                f"{stats['attachments_skipped']} anexo(s) ignorado(s): o conteúdo não existe neste ambiente."
+            ))
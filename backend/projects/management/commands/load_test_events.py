@@ -0,0 +1,115 @@
+import asyncio
+import gc
+import threading
+import time
+import tracemalloc
+from urllib.parse import urlencode
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework_simplejwt.tokens import AccessToken
+from backend.accounts.models import Account
+from backend.projects.events import get_broker
+from backend.projects.membership import load_project_roles
+from backend.projects.sse import EVENTS_PATH
+
+
+class IdleClient:
+    """Cliente ASGI simulado: abre /api/events/ e fica à espera até desligar."""
+
+    def __init__(self, query_string):
+        self.scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': 'GET',
+            'scheme': 'http',
+            'path': EVENTS_PATH,
+            'raw_path': EVENTS_PATH.encode(),
+            'query_string': query_string.encode(),
+            'headers': [(b'host', b'testserver')],
+            'client': ('127.0.0.1', 0),
+            'server': ('testserver', 80),
+        }
+        self.status = None
+        self.opened = asyncio.Event()
+        self.received = asyncio.Event()
+        self.disconnected = asyncio.Event()
+        self._requested = False
+
+    async def receive(self):
+        if not self._requested:
+            self._requested = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        await self.disconnected.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(self, message):
+        if message['type'] == 'http.response.start':
+            self.status = message['status']
+            if self.status != 200:
+                self.opened.set()
+        elif b'retry:' in message.get('body', b''):
+            self.opened.set()
+        elif b'event: change' in message.get('body', b''):
+            self.received.set()
+
+
+class Command(BaseCommand):
+    help = (
+        "Abre muitas ligações inativas a /api/events/, em processo e através da "
+        "aplicação ASGI, e mede a memória (tracemalloc), as threads e o tempo de "
+        "entrega de um evento a todas."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('email', help="Utilizador em nome de quem as ligações são abertas.")
+        parser.add_argument('--connections', type=int, default=2000)
+        parser.add_argument('--project', type=int, help="Projeto a acompanhar (por omissão, o primeiro do utilizador).")
+
+    def handle(self, *args, **options):
+        try:
+            user = Account.objects.get(email=options['email'])
+        except Account.DoesNotExist:
+            raise CommandError(f"Utilizador inexistente: {options['email']}")
+        project_id = options['project'] or min(load_project_roles(user), default=None)
+        if project_id is None:
+            raise CommandError("O utilizador não pertence a nenhum projeto.")
+
+        from backend.asgi import application
+        query = urlencode({'access_token': str(AccessToken.for_user(user)), 'projects': project_id})
+        asyncio.run(self.run(application, query, options['connections'], project_id))
+
+    async def run(self, application, query, connections, project_id):
+        gc.collect()
+        tracemalloc.start()
+        baseline = tracemalloc.get_traced_memory()[0]
+        threads = threading.active_count()
+
+        clients = [IdleClient(query) for _ in range(connections)]
+        started = time.perf_counter()
+        tasks = [asyncio.ensure_future(application(client.scope, client.receive, client.send)) for client in clients]
+        await asyncio.gather(*(client.opened.wait() for client in clients))
+        opened_in = time.perf_counter() - started
+
+        failed = sum(client.status != 200 for client in clients)
+        if failed:
+            raise CommandError(f"{failed} ligação(ões) recusada(s) (HTTP {clients[0].status}).")
+
+        gc.collect()
+        used = tracemalloc.get_traced_memory()[0] - baseline
+        tracemalloc.stop()
+        self.stdout.write(f"{connections} ligações abertas em {opened_in:.2f}s")
+        self.stdout.write(
+            f"Memória (Python): {used / 1024 / 1024:.1f} MiB no total, "
+            f"{used / connections / 1024:.1f} KiB por ligação"
+        )
+        self.stdout.write(f"Threads: {threads} antes, {threading.active_count()} com as ligações abertas")
+
+        started = time.perf_counter()
+        get_broker().dispatch({'cursor': 0, 'type': 'task', 'id': 0, 'action': 'updated', 'project': project_id})
+        await asyncio.gather(*(client.received.wait() for client in clients))
+        self.stdout.write(f"Evento entregue a todas as ligações em {(time.perf_counter() - started) * 1000:.1f} ms")
+
+        for client in clients:
+            client.disconnected.set()
+        await asyncio.gather(*tasks)
+        self.stdout.write(f"Subscrições por fechar: {get_broker().subscriber_count}")
@@ -0,0 +1,22 @@
+import datetime
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from backend.projects.models import ChangeLog
+
+
+class Command(BaseCommand):
+    help = "Apaga as entradas do registo de alterações mais antigas que o período de retenção."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=settings.CHANGE_LOG_RETENTION_DAYS,
+            help="Dias a manter (por omissão, CHANGE_LOG_RETENTION_DAYS)."
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - datetime.timedelta(days=options['days'])
+        deleted, _ = ChangeLog.objects.filter(created_at__lt=cutoff).delete()
+        self.stdout.write(self.style.SUCCESS(f"{deleted} entrada(s) apagada(s)."))
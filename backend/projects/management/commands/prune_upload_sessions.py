@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from backend.projects.uploads import prune_uploads
+
+
+class Command(BaseCommand):
+    help = (
+        "Apaga os uploads em partes sem atividade há mais do que o prazo de "
+        "expiração, e os ficheiros parciais que já não têm sessão."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hours',
+            type=int,
+            default=settings.CHUNKED_UPLOAD_EXPIRY_HOURS,
+            help="Horas sem atividade (por omissão, CHUNKED_UPLOAD_EXPIRY_HOURS)."
+        )
+
+    def handle(self, *args, **options):
+        sessions, files = prune_uploads(options['hours'])
+        self.stdout.write(self.style.SUCCESS(
+            f"{sessions} upload(s) expirado(s) e {files} ficheiro(s) parcial(is) apagado(s)."
+        ))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from backend.projects.models import Task
+from backend.projects.tree import rebuild_task_paths
+
+
+class Command(BaseCommand):
+    help = "Reconstrói o índice da hierarquia de tarefas (Task.path) a partir de parent_task."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help="Número de tarefas atualizadas por query."
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            fixed = rebuild_task_paths(Task, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"{fixed} tarefa(s) com o caminho corrigido."))
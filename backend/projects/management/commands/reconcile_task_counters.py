@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from backend.projects.counters import reconcile_task_counters
+from backend.projects.models import Project, Task
+
+
+class Command(BaseCommand):
+    help = "Recalcula os contadores de tarefas dos projetos e corrige desvios."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'project_ids',
+            nargs='*',
+            type=int,
+            help="IDs dos projetos a verificar (por omissão, todos)."
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help="Apenas reporta os projetos desviados, sem os corrigir."
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            drifted = reconcile_task_counters(
+                Project,
+                Task,
+                project_ids=options['project_ids'] or None,
+                dry_run=options['dry_run'],
+            )
+
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS("Nenhum desvio encontrado."))
+            return
+        action = "encontrados" if options['dry_run'] else "corrigidos"
+        self.stdout.write(self.style.WARNING(
+            f"{len(drifted)} projeto(s) com contadores {action}: {', '.join(map(str, drifted))}"
+        ))
@@ -0,0 +1,123 @@
+"""
+Mapa {project_id: papel} do utilizador autenticado.
+
+É carregado uma única vez por pedido e partilhado pelas classes de
+permissão e pelos `get_queryset` das viewsets. Opcionalmente, é também
+guardado na cache do Django entre pedidos (PROJECT_ROLES_CACHE_TIMEOUT),
+com a chave versionada por utilizador; a versão é incrementada sempre que
+um ProjectMember ou o dono de um Project muda (ver signals.py).
+
+A cache entre pedidos só é usada se a cache do Django for partilhada entre
+processos (ver cache_versions.py): com uma cache local, um membro removido
+manteria o acesso nos outros workers até a entrada expirar.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import CharField, Value
+from backend.projects.cache_versions import aget_version, bump_version, cache_is_shared, get_version
+from backend.projects.models import Project, ProjectMember
+
+# Papel atribuído ao dono do projeto, que pode não ter um ProjectMember
+OWNER_ROLE = 'OWNER'
+ADMIN_ROLES = frozenset({OWNER_ROLE, ProjectMember.Role.ADMIN})
+
+REQUEST_ATTRIBUTE = '_project_roles'
+
+
+def _version_key(user_id):
+    return f'project-roles-version:{user_id}'
+
+
+def project_roles_version(user_id):
+    """Versão atual dos papéis do utilizador, para versionar outras caches."""
+    return get_version(_version_key(user_id))
+
+
+def _roles_queryset(user):
+    memberships = ProjectMember.objects.filter(user=user).order_by().values_list('project_id', 'role')
+    owned = Project.objects.filter(owner=user).order_by().annotate(
+        role=Value(OWNER_ROLE, output_field=CharField())
+    ).values_list('id', 'role')
+    return memberships.union(owned, all=True)
+
+
+def _merge_roles(rows):
+    roles = {}
+    for project_id, role in rows:
+        # O papel de dono prevalece sobre o de membro
+        if roles.get(project_id) != OWNER_ROLE:
+            roles[project_id] = role
+    return roles
+
+
+def load_project_roles(user):
+    """Lê da base de dados os papéis do utilizador, numa única query."""
+    return _merge_roles(_roles_queryset(user))
+
+
+async def aload_project_roles(user):
+    return _merge_roles([row async for row in _roles_queryset(user)])
+
+
+def _roles_cache_key(user_id, version):
+    return f'project-roles:{user_id}:{version}'
+
+
+def roles_cache_timeout():
+    """Validade da cache entre pedidos; 0 se desativada ou se a cache não for partilhada."""
+    timeout = getattr(settings, 'PROJECT_ROLES_CACHE_TIMEOUT', 0)
+    return timeout if cache_is_shared() else 0
+
+
+def get_user_project_roles(user):
+    """Papéis do utilizador, passando pela cache entre pedidos se ativa."""
+    if not user.is_authenticated:
+        return {}
+
+    timeout = roles_cache_timeout()
+    if not timeout:
+        return load_project_roles(user)
+
+    key = _roles_cache_key(user.pk, project_roles_version(user.pk))
+    roles = cache.get(key)
+    if roles is None:
+        roles = load_project_roles(user)
+        cache.set(key, roles, timeout)
+    return roles
+
+
+async def aget_user_project_roles(user):
+    """Versão assíncrona de get_user_project_roles (mesma cache)."""
+    if not user.is_authenticated:
+        return {}
+
+    timeout = roles_cache_timeout()
+    if not timeout:
+        return await aload_project_roles(user)
+
+    key = _roles_cache_key(user.pk, await aget_version(_version_key(user.pk)))
+    roles = await cache.aget(key)
+    if roles is None:
+        roles = await aload_project_roles(user)
+        await cache.aset(key, roles, timeout)
+    return roles
+
+
+def get_project_roles(request):
+    """
+    Papéis do utilizador do pedido, memorizados no HttpRequest para que
+    todas as permissões e querysets do mesmo pedido os partilhem.
+    """
+    http_request = getattr(request, '_request', request)
+    roles = getattr(http_request, REQUEST_ATTRIBUTE, None)
+    if roles is None:
+        roles = get_user_project_roles(request.user)
+        setattr(http_request, REQUEST_ATTRIBUTE, roles)
+    return roles
+
+
+def invalidate_project_roles(*user_ids):
+    """Invalida os papéis em cache dos utilizadores indicados."""
+    for user_id in set(user_ids):
+        if user_id is not None:
+            bump_version(_version_key(user_id))
@@ -0,0 +1,21 @@
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.utils.decorators import sync_and_async_middleware
+
+ASYNC_URLCONF = 'backend.urls_async'
+
+
+@sync_and_async_middleware
+def AsyncReadViewsMiddleware(get_response):
+    """
+    Em ASGI, com ASYNC_READ_VIEWS, resolve os pedidos com
+    backend/urls_async.py (ver projects/async_views.py). Em WSGI não faz nada.
+    """
+    if not iscoroutinefunction(get_response):
+        return get_response
+
+    async def middleware(request):
+        if settings.ASYNC_READ_VIEWS:
+            request.urlconf = ASYNC_URLCONF
+        return await get_response(request)
+    return middleware
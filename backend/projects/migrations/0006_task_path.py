@@ -0,0 +1,31 @@
+# Generated by Django 5.2.3 on 2026-10-18 11:31
+
+from django.conf import settings
+from django.db import migrations, models
+
+from backend.projects.tree import rebuild_task_paths
+
+
+def populate_task_paths(apps, schema_editor):
+    rebuild_task_paths(apps.get_model('projects', 'Task'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0005_alter_attachment_file'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='path',
+            field=models.CharField(blank=True, default='', editable=False, help_text="IDs dos antecessores, da raiz até ao pai (ex: '1/5/'). Mantido automaticamente.", max_length=255, verbose_name='Caminho na Hierarquia'),
+        ),
+        migrations.RunPython(populate_task_paths, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['path'], name='task_path_idx', opclasses=['varchar_pattern_ops']),
+        ),
+    ]
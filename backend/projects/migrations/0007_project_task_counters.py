@@ -0,0 +1,73 @@
+# Generated by Django 5.2.3 on 2026-10-18 11:32
+
+from django.db import migrations, models
+
+from backend.projects.counters import reconcile_task_counters
+
+
+def populate_task_counters(apps, schema_editor):
+    reconcile_task_counters(
+        apps.get_model('projects', 'Project'),
+        apps.get_model('projects', 'Task'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0006_task_path'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='tasks_blocked',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Tarefas Bloqueadas'),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='tasks_done',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Tarefas Concluídas'),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='tasks_high_priority',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Tarefas de Prioridade Alta'),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='tasks_in_progress',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Tarefas em Andamento'),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='tasks_in_review',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Tarefas em Revisão'),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='tasks_low_priority',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Tarefas de Prioridade Baixa'),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='tasks_medium_priority',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Tarefas de Prioridade Média'),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='tasks_todo',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Tarefas a Fazer'),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='tasks_total',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Total de Tarefas'),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='tasks_urgent_priority',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Tarefas de Prioridade Urgente'),
+        ),
+        migrations.RunPython(populate_task_counters, migrations.RunPython.noop),
+    ]
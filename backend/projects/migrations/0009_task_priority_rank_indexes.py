@@ -0,0 +1,56 @@
+# Generated by Django 5.2.3 on 2026-10-18 11:35
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0008_keyset_pagination_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='task',
+            options={'ordering': ['-priority_rank', '-created_at'], 'verbose_name': 'Tarefa', 'verbose_name_plural': 'Tarefas'},
+        ),
+        migrations.RemoveIndex(
+            model_name='task',
+            name='task_keyset_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='task',
+            name='task_project_keyset_idx',
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='priority_rank',
+            field=models.GeneratedField(db_persist=True, expression=models.Case(models.When(priority='LOW', then=models.Value(1)), models.When(priority='MEDIUM', then=models.Value(2)), models.When(priority='HIGH', then=models.Value(3)), models.When(priority='URGENT', then=models.Value(4)), default=models.Value(0)), output_field=models.PositiveSmallIntegerField(), verbose_name='Ordem da Prioridade'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['-priority_rank', '-created_at', '-id'], name='task_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['project', '-priority_rank', '-created_at', '-id'], name='task_project_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('parent_task__isnull', True)), fields=['project', '-priority_rank', '-created_at', '-id'], name='task_project_roots_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['project', 'status'], name='task_project_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['assignee', 'status'], name='task_assignee_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('due_date__isnull', False), models.Q(('status', 'DONE'), _negated=True)), fields=['project', 'due_date'], name='task_open_due_date_idx'),
+        ),
+    ]
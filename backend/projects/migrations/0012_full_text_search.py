@@ -0,0 +1,135 @@
+# Generated by Django 5.2.3 on 2026-10-18 12:05
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0011_chunked_uploads_blobs'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='feedback',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='idea',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='feedback',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='feedback_search_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='idea',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='idea_search_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='project_search_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='task_search_idx'),
+        ),
+        # Triggers que mantêm search_vector (peso A para o título, B para o
+        # texto) e preenchem as linhas existentes
+        migrations.RunSQL(
+            """
+            CREATE FUNCTION projects_project_search_vector_update() RETURNS trigger AS $$
+            BEGIN
+                NEW.search_vector := setweight(to_tsvector('portuguese', coalesce(NEW.name, '')), 'A') || setweight(to_tsvector('portuguese', coalesce(NEW.description, '')), 'B');
+                RETURN NEW;
+            END
+            $$ LANGUAGE plpgsql;
+
+            CREATE TRIGGER projects_project_search_vector_trigger
+            BEFORE INSERT OR UPDATE OF name, description ON projects_project
+            FOR EACH ROW EXECUTE FUNCTION projects_project_search_vector_update();
+
+            UPDATE projects_project SET search_vector = setweight(to_tsvector('portuguese', coalesce(name, '')), 'A') || setweight(to_tsvector('portuguese', coalesce(description, '')), 'B');
+            """,
+            """
+            DROP TRIGGER IF EXISTS projects_project_search_vector_trigger ON projects_project;
+            DROP FUNCTION IF EXISTS projects_project_search_vector_update();
+            """,
+        ),
+        migrations.RunSQL(
+            """
+            CREATE FUNCTION projects_task_search_vector_update() RETURNS trigger AS $$
+            BEGIN
+                NEW.search_vector := setweight(to_tsvector('portuguese', coalesce(NEW.title, '')), 'A') || setweight(to_tsvector('portuguese', coalesce(NEW.description, '')), 'B');
+                RETURN NEW;
+            END
+            $$ LANGUAGE plpgsql;
+
+            CREATE TRIGGER projects_task_search_vector_trigger
+            BEFORE INSERT OR UPDATE OF title, description ON projects_task
+            FOR EACH ROW EXECUTE FUNCTION projects_task_search_vector_update();
+
+            UPDATE projects_task SET search_vector = setweight(to_tsvector('portuguese', coalesce(title, '')), 'A') || setweight(to_tsvector('portuguese', coalesce(description, '')), 'B');
+            """,
+            """
+            DROP TRIGGER IF EXISTS projects_task_search_vector_trigger ON projects_task;
+            DROP FUNCTION IF EXISTS projects_task_search_vector_update();
+            """,
+        ),
+        migrations.RunSQL(
+            """
+            CREATE FUNCTION projects_feedback_search_vector_update() RETURNS trigger AS $$
+            BEGIN
+                NEW.search_vector := setweight(to_tsvector('portuguese', coalesce(NEW.summary, '')), 'A') || setweight(to_tsvector('portuguese', coalesce(NEW.description, '')), 'B');
+                RETURN NEW;
+            END
+            $$ LANGUAGE plpgsql;
+
+            CREATE TRIGGER projects_feedback_search_vector_trigger
+            BEFORE INSERT OR UPDATE OF summary, description ON projects_feedback
+            FOR EACH ROW EXECUTE FUNCTION projects_feedback_search_vector_update();
+
+            UPDATE projects_feedback SET search_vector = setweight(to_tsvector('portuguese', coalesce(summary, '')), 'A') || setweight(to_tsvector('portuguese', coalesce(description, '')), 'B');
+            """,
+            """
+            DROP TRIGGER IF EXISTS projects_feedback_search_vector_trigger ON projects_feedback;
+            DROP FUNCTION IF EXISTS projects_feedback_search_vector_update();
+            """,
+        ),
+        migrations.RunSQL(
+            """
+            CREATE FUNCTION projects_idea_search_vector_update() RETURNS trigger AS $$
+            BEGIN
+                NEW.search_vector := setweight(to_tsvector('portuguese', coalesce(NEW.title, '')), 'A') || setweight(to_tsvector('portuguese', coalesce(NEW.description, '')), 'B');
+                RETURN NEW;
+            END
+            $$ LANGUAGE plpgsql;
+
+            CREATE TRIGGER projects_idea_search_vector_trigger
+            BEFORE INSERT OR UPDATE OF title, description ON projects_idea
+            FOR EACH ROW EXECUTE FUNCTION projects_idea_search_vector_update();
+
+            UPDATE projects_idea SET search_vector = setweight(to_tsvector('portuguese', coalesce(title, '')), 'A') || setweight(to_tsvector('portuguese', coalesce(description, '')), 'B');
+            """,
+            """
+            DROP TRIGGER IF EXISTS projects_idea_search_vector_trigger ON projects_idea;
+            DROP FUNCTION IF EXISTS projects_idea_search_vector_update();
+            """,
+        ),
+    ]
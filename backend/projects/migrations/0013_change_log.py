@@ -0,0 +1,31 @@
+# Generated by Django 5.2.3 on 2026-10-18 12:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0012_full_text_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeLog',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('model', models.CharField(max_length=20, verbose_name='Tipo')),
+                ('object_id', models.PositiveBigIntegerField(verbose_name='ID do Objeto')),
+                ('action', models.CharField(choices=[('created', 'Criado'), ('updated', 'Alterado'), ('deleted', 'Removido')], max_length=10, verbose_name='Ação')),
+                ('project_id', models.IntegerField(blank=True, null=True, verbose_name='Projeto')),
+                ('user_id', models.IntegerField(blank=True, null=True, verbose_name='Utilizador')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Registado em')),
+            ],
+            options={
+                'verbose_name': 'Alteração',
+                'verbose_name_plural': 'Alterações',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['project_id', 'id'], name='changelog_project_cursor_idx'), models.Index(fields=['user_id', 'id'], name='changelog_user_cursor_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-18 13:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0013_change_log'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uploadsession',
+            name='claim',
+            field=models.UUIDField(blank=True, null=True, verbose_name='Parte em Curso'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-18 13:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0014_upload_session_claim'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blob',
+            name='thumbnails_ready',
+            field=models.BooleanField(default=False, editable=False, verbose_name='Miniaturas Prontas'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.3 on 2026-10-18 13:17
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0015_blob_thumbnails_ready'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='feedback',
+            options={'base_manager_name': 'objects', 'ordering': ['-created_at'], 'verbose_name': 'Feedback', 'verbose_name_plural': 'Feedbacks'},
+        ),
+        migrations.AlterModelOptions(
+            name='idea',
+            options={'base_manager_name': 'objects', 'ordering': ['-created_at'], 'verbose_name': 'Ideia', 'verbose_name_plural': 'Ideias'},
+        ),
+        migrations.AlterModelOptions(
+            name='project',
+            options={'base_manager_name': 'objects', 'ordering': ['-created_at'], 'verbose_name': 'Projeto', 'verbose_name_plural': 'Projetos'},
+        ),
+        migrations.AlterModelOptions(
+            name='task',
+            options={'base_manager_name': 'objects', 'ordering': ['-priority_rank', '-created_at'], 'verbose_name': 'Tarefa', 'verbose_name_plural': 'Tarefas'},
+        ),
+    ]
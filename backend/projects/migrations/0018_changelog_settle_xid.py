@@ -0,0 +1,48 @@
+# Generated by Django 5.2.3 on 2026-10-18 16:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0017_tag_updated_at'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='changelog',
+            name='project_id',
+            field=models.BigIntegerField(blank=True, null=True, verbose_name='Projeto'),
+        ),
+        migrations.AlterField(
+            model_name='changelog',
+            name='user_id',
+            field=models.BigIntegerField(blank=True, null=True, verbose_name='Utilizador'),
+        ),
+        migrations.AddField(
+            model_name='changelog',
+            name='settle_xid',
+            field=models.BigIntegerField(editable=False, null=True),
+        ),
+        # Trigger que regista o xmax do snapshot no INSERT (as entradas
+        # existentes ficam a NULL e são dadas como assentes)
+        migrations.RunSQL(
+            """
+            CREATE FUNCTION projects_changelog_settle_xid_insert() RETURNS trigger AS $$
+            BEGIN
+                NEW.settle_xid := pg_snapshot_xmax(pg_current_snapshot())::text::bigint;
+                RETURN NEW;
+            END
+            $$ LANGUAGE plpgsql;
+
+            CREATE TRIGGER projects_changelog_settle_xid_trigger
+            BEFORE INSERT ON projects_changelog
+            FOR EACH ROW EXECUTE FUNCTION projects_changelog_settle_xid_insert();
+            """,
+            """
+            DROP TRIGGER IF EXISTS projects_changelog_settle_xid_trigger ON projects_changelog;
+            DROP FUNCTION IF EXISTS projects_changelog_settle_xid_insert();
+            """,
+        ),
+    ]
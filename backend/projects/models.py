@@ -1,11 +1,18 @@
+import datetime
 import os
 import uuid
 from django.db import models
+from django.db.models import Case, Count, IntegerField, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce, Concat, Substr
 from django.conf import settings
-from django.contrib.contenttypes.fields import GenericForeignKey
+from django.contrib.contenttypes.fields import GenericForeignKey, GenericRelation
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.contrib.contenttypes.models import ContentType
 from django.utils.translation import gettext_lazy as _
 from django.utils import timezone
+from backend.projects.counters import counter_fields
+from backend.projects.tree import child_path
 
 
 class Tag(models.Model):
@@ -21,6 +28,7 @@ class Tag(models.Model):
         help_text=_('Cor em formato hexadecimal, ex: #FF5733')
     )
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         verbose_name = _('Tag')
@@ -69,6 +77,47 @@ class ProjectMember(models.Model):
         return f'{self.user} como {self.get_role_display()} em {self.project}'
 
 
+def generic_count(related_model, model):
+    """
+    Subquery que conta as linhas de `related_model` (Comment/Attachment)
+    ligadas a cada linha de `model` pela relação genérica, servida pelo
+    índice (content_type, object_id). Evita os JOINs que multiplicariam
+    as linhas quando se contam comentários e anexos em simultâneo.
+    """
+    content_type = ContentType.objects.get_for_model(model)
+    counts = (
+        related_model.objects
+        .filter(content_type=content_type, object_id=OuterRef('pk'))
+        .order_by()
+        .values('object_id')
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+class SearchableManager(models.Manager):
+    """
+    Gestor dos modelos com `search_vector`: a coluna fica diferida, porque só
+    é usada dentro da base de dados (filtros e ranking, ver search.py).
+    Estes modelos usam-no também como `base_manager_name`, para os acessos
+    por relação (ex: `tarefa.project`). Não filtra linhas, só colunas.
+    """
+
+    def get_queryset(self):
+        return super().get_queryset().defer('search_vector')
+
+
+class ActivityCountsQuerySet(models.QuerySet):
+
+    def with_activity_counts(self):
+        """Anota `comment_count` e `attachment_count`."""
+        return self.annotate(
+            comment_count=generic_count(Comment, self.model),
+            attachment_count=generic_count(Attachment, self.model),
+        )
+
+
 class Project(models.Model):
 
 
@@ -145,16 +194,70 @@ class Project(models.Model):
         _('Atualizado em'),
         auto_now=True
     )
+    # Contadores de tarefas, mantidos incrementalmente (ver counters.py)
+    tasks_total = models.PositiveIntegerField(_('Total de Tarefas'), default=0, editable=False)
+    tasks_todo = models.PositiveIntegerField(_('Tarefas a Fazer'), default=0, editable=False)
+    tasks_in_progress = models.PositiveIntegerField(_('Tarefas em Andamento'), default=0, editable=False)
+    tasks_in_review = models.PositiveIntegerField(_('Tarefas em Revisão'), default=0, editable=False)
+    tasks_done = models.PositiveIntegerField(_('Tarefas Concluídas'), default=0, editable=False)
+    tasks_blocked = models.PositiveIntegerField(_('Tarefas Bloqueadas'), default=0, editable=False)
+    tasks_low_priority = models.PositiveIntegerField(_('Tarefas de Prioridade Baixa'), default=0, editable=False)
+    tasks_medium_priority = models.PositiveIntegerField(_('Tarefas de Prioridade Média'), default=0, editable=False)
+    tasks_high_priority = models.PositiveIntegerField(_('Tarefas de Prioridade Alta'), default=0, editable=False)
+    tasks_urgent_priority = models.PositiveIntegerField(_('Tarefas de Prioridade Urgente'), default=0, editable=False)
+    # Mantido por um trigger da base de dados (ver search.py)
+    search_vector = SearchVectorField(null=True, editable=False)
+    comments = GenericRelation('Comment')
+    attachments = GenericRelation('Attachment')
+
+    objects = SearchableManager.from_queryset(ActivityCountsQuerySet)()
 
 
     class Meta:
         verbose_name = _('Projeto')
         verbose_name_plural = _('Projetos')
+        base_manager_name = 'objects'
         ordering = ['-created_at']
+        indexes = [
+            # Paginação por cursor: (ordering, id)
+            models.Index(fields=['-created_at', '-id'], name='project_created_keyset_idx'),
+            GinIndex(fields=['search_vector'], name='project_search_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Guarda o dono carregado para invalidar a cache de papéis se mudar
+        instance._loaded_owner_id = instance.__dict__.get('owner_id')
+        return instance
+
+    def save(self, *args, **kwargs):
+        """
+        Os contadores de tarefas ficam fora dos saves: só mudam com UPDATEs
+        de F() (ver counters.py), e gravar os valores carregados desfaria as
+        variações confirmadas entretanto. Na criação ficam a zero.
+        """
+        if not self._state.adding and not kwargs.get('force_insert'):
+            update_fields = kwargs.get('update_fields')
+            if update_fields is None:
+                deferred = self.get_deferred_fields()
+                update_fields = [
+                    field.name for field in self._meta.concrete_fields
+                    if not field.primary_key and field.attname not in deferred
+                ]
+            counters = counter_fields(Task)
+            kwargs['update_fields'] = [field for field in update_fields if field not in counters]
+        super().save(*args, **kwargs)
+
+    @property
+    def progress_percentage(self):
+        if not self.tasks_total:
+            return 0
+        return round((self.tasks_done / self.tasks_total) * 100)
+
 
 class Feedback(models.Model):
 
@@ -209,16 +312,45 @@ class Feedback(models.Model):
         auto_now_add=True,
         verbose_name=_("Criado em")
     )
+    # Mantido por um trigger da base de dados (ver search.py)
+    search_vector = SearchVectorField(null=True, editable=False)
+    comments = GenericRelation('Comment')
+    attachments = GenericRelation('Attachment')
+
+    objects = SearchableManager()
 
     class Meta:
         verbose_name = _("Feedback")
         verbose_name_plural = _("Feedbacks")
+        base_manager_name = 'objects'
         ordering = ['-created_at']
+        indexes = [
+            GinIndex(fields=['search_vector'], name='feedback_search_idx'),
+        ]
 
     def __str__(self):
         return self.summary
 
 
+class TaskQuerySet(ActivityCountsQuerySet):
+
+    def descendants_of(self, *tasks):
+        """
+        Filtra os descendentes (em qualquer nível) das tarefas indicadas,
+        usando o índice sobre `path`.
+        """
+        return self.under_paths(*(child_path(task) for task in tasks))
+
+    def under_paths(self, *prefixes):
+        """Filtra as tarefas cujo `path` começa por algum dos prefixos."""
+        condition = Q()
+        for prefix in prefixes:
+            condition |= Q(path__startswith=prefix)
+        if not condition:
+            return self.none()
+        return self.filter(condition)
+
+
 class Task(models.Model):
     
 
@@ -256,12 +388,31 @@ class Task(models.Model):
         choices=Status.choices,
         default=Status.TODO
     )
+    # Posição de cada prioridade na ordenação (maior = mais importante)
+    PRIORITY_RANKS = {
+        Priority.LOW: 1,
+        Priority.MEDIUM: 2,
+        Priority.HIGH: 3,
+        Priority.URGENT: 4,
+    }
+
     priority = models.CharField(
         _("Prioridade"),
         max_length=20,
         choices=Priority.choices,
         default=Priority.MEDIUM
     )
+    # Coluna gerada pela base de dados a partir de `priority`, para ordenar
+    # por importância (o texto ordenaria alfabeticamente) e indexar.
+    priority_rank = models.GeneratedField(
+        expression=Case(
+            *[When(priority=priority, then=Value(rank)) for priority, rank in PRIORITY_RANKS.items()],
+            default=Value(0),
+        ),
+        output_field=models.PositiveSmallIntegerField(),
+        db_persist=True,
+        verbose_name=_("Ordem da Prioridade")
+    )
     assignee = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.SET_NULL,
@@ -276,6 +427,14 @@ class Task(models.Model):
         related_name='subtasks',
         verbose_name=_("Tarefa Pai")
     )
+    path = models.CharField(
+        _("Caminho na Hierarquia"),
+        max_length=255,
+        blank=True,
+        default='',
+        editable=False,
+        help_text=_("IDs dos antecessores, da raiz até ao pai (ex: '1/5/'). Mantido automaticamente.")
+    )
     tags = models.ManyToManyField(
         Tag,
         blank=True,
@@ -310,14 +469,99 @@ class Task(models.Model):
     )
 
 
+    # Mantido por um trigger da base de dados (ver search.py)
+    search_vector = SearchVectorField(null=True, editable=False)
+    comments = GenericRelation('Comment')
+    attachments = GenericRelation('Attachment')
+
+    objects = SearchableManager.from_queryset(TaskQuerySet)()
+
     class Meta:
         verbose_name = _("Tarefa")
         verbose_name_plural = _("Tarefas")
-        ordering = ['priority','-created_at']
+        base_manager_name = 'objects'
+        ordering = ['-priority_rank', '-created_at']
+        indexes = [
+            models.Index(fields=['path'], name='task_path_idx', opclasses=['varchar_pattern_ops']),
+            # Paginação por cursor: (ordering, id), com e sem filtro por projeto
+            models.Index(fields=['-priority_rank', '-created_at', '-id'], name='task_keyset_idx'),
+            models.Index(fields=['project', '-priority_rank', '-created_at', '-id'], name='task_project_keyset_idx'),
+            # Lista aninhada (/projects/<id>/tasks/): só as tarefas de nível superior
+            models.Index(
+                fields=['project', '-priority_rank', '-created_at', '-id'],
+                name='task_project_roots_idx',
+                condition=Q(parent_task__isnull=True)
+            ),
+            models.Index(fields=['project', 'status'], name='task_project_status_idx'),
+            models.Index(fields=['assignee', 'status'], name='task_assignee_status_idx'),
+            # Tarefas em aberto com prazo (atrasadas / próximos prazos)
+            models.Index(
+                fields=['project', 'due_date'],
+                name='task_open_due_date_idx',
+                condition=Q(due_date__isnull=False) & ~Q(status='DONE')
+            ),
+            GinIndex(fields=['search_vector'], name='task_search_idx'),
+        ]
 
     def __str__(self):
         return self.title
 
+    # Campos cujo valor carregado da base de dados é guardado para
+    # detetar movimentos na hierarquia e atualizar os contadores.
+    TRACKED_FIELDS = ('project_id', 'parent_task_id', 'status', 'priority')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._snapshot_tracked_fields()
+        return instance
+
+    def _snapshot_tracked_fields(self):
+        self._loaded_values = {
+            field: self.__dict__[field]
+            for field in self.TRACKED_FIELDS
+            if field in self.__dict__
+        }
+
+    @property
+    def subtask_list(self):
+        """
+        Subtarefas diretas. Usa a árvore montada em memória por
+        `build_task_tree` quando existir, evitando uma query por nó.
+        """
+        if hasattr(self, '_subtask_list'):
+            return self._subtask_list
+        return self.subtasks.all()
+
+    def get_descendants(self):
+        return Task.objects.descendants_of(self)
+
+    def save(self, *args, **kwargs):
+        """
+        Mantém o `path` coerente com `parent_task`. Quando a tarefa muda
+        de pai, os caminhos de todos os descendentes são reescritos com
+        um único UPDATE.
+        """
+        is_new = self._state.adding
+        loaded_parent_id = getattr(self, '_loaded_values', {}).get('parent_task_id', self.parent_task_id)
+        moved = not is_new and self.parent_task_id != loaded_parent_id
+        old_prefix = child_path(self) if moved else None
+
+        if is_new or moved:
+            self.path = child_path(self.parent_task) if self.parent_task_id else ''
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None and 'parent_task' in update_fields:
+                kwargs['update_fields'] = {*update_fields, 'path'}
+
+        super().save(*args, **kwargs)
+
+        if moved:
+            new_prefix = child_path(self)
+            Task.objects.filter(path__startswith=old_prefix).update(
+                path=Concat(Value(new_prefix), Substr('path', len(old_prefix) + 1))
+            )
+        self._snapshot_tracked_fields()
+
 
 class Idea(models.Model):
 
@@ -354,12 +598,19 @@ class Idea(models.Model):
         _('Atualizado em'),
         auto_now=True
     )
+    # Mantido por um trigger da base de dados (ver search.py)
+    search_vector = SearchVectorField(null=True, editable=False)
 
+    objects = SearchableManager()
 
     class Meta:
         verbose_name = _("Ideia")
         verbose_name_plural = _("Ideias")
+        base_manager_name = 'objects'
         ordering = ['-created_at']
+        indexes = [
+            GinIndex(fields=['search_vector'], name='idea_search_idx'),
+        ]
     
     def __str__(self):
         return self.title
@@ -388,6 +639,9 @@ class Comment(models.Model):
         ordering = ['created_at']
         verbose_name = _("Comentário")
         verbose_name_plural = _("Comentários")
+        indexes = [
+            models.Index(fields=['content_type', 'object_id', 'created_at'], name='comment_object_idx'),
+        ]
 
     def __str__(self):
         return f'Comentário de {self.author} em {self.created_at.strftime("%d/%m/%Y")}'
@@ -405,6 +659,113 @@ def get_attachment_upload_path(instance, filename):
     return os.path.join('attachments', now.strftime('%Y/%m/%d'), new_filename)
 
 
+def get_blob_path(sha256):
+    """
+    Caminho de um conteúdo identificado pelo seu SHA-256.
+    O formato será: 'blobs/ab/cd/abcd...'
+    """
+    return os.path.join('blobs', sha256[:2], sha256[2:4], sha256)
+
+
+class Blob(models.Model):
+    """
+    Conteúdo de um ficheiro, guardado uma única vez e identificado pelo seu
+    SHA-256. Vários anexos com o mesmo conteúdo partilham o mesmo Blob;
+    `ref_count` conta-os e o Blob é apagado quando deixa de ser usado.
+    """
+    sha256 = models.CharField(
+        _("SHA-256"),
+        max_length=64,
+        unique=True
+    )
+    file = models.FileField(
+        upload_to='blobs/'
+    )
+    size = models.PositiveBigIntegerField(_("Tamanho (bytes)"))
+    ref_count = models.PositiveIntegerField(
+        _("Referências"),
+        default=0
+    )
+    # Miniaturas já geradas (ver thumbnails.py)
+    thumbnails_ready = models.BooleanField(
+        _("Miniaturas Prontas"),
+        default=False,
+        editable=False
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = _("Conteúdo de Anexo")
+        verbose_name_plural = _("Conteúdos de Anexos")
+
+    def __str__(self):
+        return self.sha256
+
+
+class UploadSession(models.Model):
+    """
+    Upload em partes (retomável) de um anexo. As partes são acrescentadas a
+    um ficheiro temporário em CHUNKED_UPLOAD_TEMP_DIR; quando `received`
+    atinge `size`, o conteúdo é guardado como Blob e o Attachment criado.
+    """
+    id = models.UUIDField(
+        primary_key=True,
+        default=uuid.uuid4,
+        editable=False
+    )
+    uploaded_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        verbose_name=_("Enviado por")
+    )
+    filename = models.CharField(
+        _("Nome do Ficheiro"),
+        max_length=255
+    )
+    description = models.CharField(
+        _("Descrição"),
+        max_length=255,
+        blank=True
+    )
+    size = models.PositiveBigIntegerField(_("Tamanho (bytes)"))
+    received = models.PositiveBigIntegerField(
+        _("Recebido (bytes)"),
+        default=0
+    )
+    # Parte a ser escrita neste momento (ver uploads.append_chunk)
+    claim = models.UUIDField(
+        _("Parte em Curso"),
+        null=True,
+        blank=True
+    )
+    content_type = models.ForeignKey(
+        ContentType,
+        on_delete=models.CASCADE
+    )
+    object_id = models.PositiveIntegerField()
+    content_object = GenericForeignKey(
+        'content_type',
+        'object_id'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = _("Upload em Curso")
+        verbose_name_plural = _("Uploads em Curso")
+
+    def __str__(self):
+        return f'{self.filename} ({self.received}/{self.size})'
+
+    @property
+    def is_complete(self):
+        return self.received >= self.size
+
+    @property
+    def expires_at(self):
+        return self.updated_at + datetime.timedelta(hours=settings.CHUNKED_UPLOAD_EXPIRY_HOURS)
+
+
 class Attachment(models.Model):
     uploaded_by = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -414,6 +775,20 @@ class Attachment(models.Model):
     file = models.FileField(
         upload_to=get_attachment_upload_path
     )
+    # Conteúdo partilhado (deduplicado). Quando existe, `file` aponta para
+    # o mesmo ficheiro do Blob.
+    blob = models.ForeignKey(
+        Blob,
+        on_delete=models.PROTECT,
+        null=True, blank=True,
+        related_name='attachments',
+        verbose_name=_("Conteúdo")
+    )
+    original_name = models.CharField(
+        _("Nome Original"),
+        max_length=255,
+        blank=True
+    )
     description = models.CharField(
         _("Descrição"),
         max_length=255,
@@ -434,6 +809,48 @@ class Attachment(models.Model):
     class Meta:
         verbose_name = _("Anexo")
         verbose_name_plural = _("Anexos")
+        indexes = [
+            models.Index(fields=['content_type', 'object_id'], name='attachment_object_idx'),
+        ]
+
+    def __str__(self):
+        return self.original_name or os.path.basename(self.file.name)
+
+
+class ChangeLog(models.Model):
+    """
+    Registo, só de acréscimo, das criações, alterações e remoções de
+    projetos, tarefas, membros, comentários e anexos (ver changes.py).
+    O `id` é o cursor devolvido aos clientes em /api/changes/.
+    """
+
+    class Action(models.TextChoices):
+        CREATED = 'created', _("Criado")
+        UPDATED = 'updated', _("Alterado")
+        DELETED = 'deleted', _("Removido")
+
+    id = models.BigAutoField(primary_key=True)
+    model = models.CharField(_("Tipo"), max_length=20)
+    object_id = models.PositiveBigIntegerField(_("ID do Objeto"))
+    action = models.CharField(_("Ação"), max_length=10, choices=Action.choices)
+    # Sem chave estrangeira: o registo sobrevive à remoção do projeto
+    project_id = models.BigIntegerField(_("Projeto"), null=True, blank=True)
+    # Utilizador afetado (membros), que deixa de ver o projeto ao ser removido
+    user_id = models.BigIntegerField(_("Utilizador"), null=True, blank=True)
+    created_at = models.DateTimeField(_("Registado em"), auto_now_add=True, db_index=True)
+    # No PostgreSQL, preenchido por um trigger com o xmax do snapshot no
+    # INSERT: a entrada assenta quando todas as transações anteriores a esse
+    # xid terminarem (ver changes.settled_cursor)
+    settle_xid = models.BigIntegerField(null=True, editable=False)
+
+    class Meta:
+        verbose_name = _("Alteração")
+        verbose_name_plural = _("Alterações")
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['project_id', 'id'], name='changelog_project_cursor_idx'),
+            models.Index(fields=['user_id', 'id'], name='changelog_user_cursor_idx'),
+        ]
 
     def __str__(self):
-        return os.path.basename(self.file.name)
+        return f'{self.model} {self.object_id} {self.action}'
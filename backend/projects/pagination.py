@@ -0,0 +1,186 @@
+import base64
+import datetime
+import decimal
+import json
+from django.db.models import Q
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Paginação por cursor ("keyset") sobre a ordenação do queryset.
+
+    A ordenação vem do próprio queryset (ou de Meta.ordering) e é sempre
+    completada com o `id`, na direção do último campo, para ser total. A
+    página seguinte é obtida com uma condição do tipo
+    `(a, b, id) > (valores da última linha)`, servida diretamente por um
+    índice composto com a mesma ordenação: a página N custa o mesmo que a
+    página 1, sem OFFSET nem COUNT(*).
+
+    Os campos de ordenação devem ser colunas não nulas do modelo.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_size = 50
+    max_page_size = 200
+    invalid_cursor_message = _('Cursor inválido.')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.set_page(list(self.page_queryset(queryset, request)))
+
+    async def apaginate_queryset(self, queryset, request):
+        """Igual a paginate_queryset, com o ORM assíncrono."""
+        return self.set_page([row async for row in self.page_queryset(queryset, request)])
+
+    def page_queryset(self, queryset, request):
+        """Queryset da página pedida, com uma linha a mais (ver set_page)."""
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.page_model = queryset.model
+        self.ordering = self.get_ordering(queryset)
+
+        self.cursor = self.decode_cursor(request)
+        self.reverse = self.cursor is not None and self.cursor['reverse']
+        ordering = [self._flip(field) for field in self.ordering] if self.reverse else self.ordering
+
+        queryset = queryset.order_by(*ordering)
+        if self.cursor is not None:
+            queryset = queryset.filter(self._after(ordering, self.cursor['values']))
+        return queryset[:self.page_size + 1]
+
+    def set_page(self, results):
+        # Uma linha extra indica se existe mais uma página nesta direção
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if self.reverse:
+            results.reverse()
+
+        self.page = results
+        self.has_next = has_more if not self.reverse else True
+        self.has_previous = self.cursor is not None and (has_more if self.reverse else True)
+        return results
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def get_ordering(self, queryset):
+        ordering = list(queryset.query.order_by or queryset.model._meta.ordering)
+        if not any(field.lstrip('-') in ('id', 'pk') for field in ordering):
+            descending = bool(ordering) and ordering[-1].startswith('-')
+            ordering.append('-id' if descending else 'id')
+        return ordering
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self._link(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self._link(self.page[0], reverse=True)
+
+    # -- cursores -------------------------------------------------------
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+            values = payload['v']
+            if len(values) != len(self.ordering):
+                raise ValueError
+            return {'values': values, 'reverse': bool(payload.get('r'))}
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def _link(self, instance, reverse):
+        values = [self._encode(self._value(instance, field)) for field in self.ordering]
+        payload = json.dumps({'v': values, 'r': reverse}, separators=(',', ':'))
+        cursor = base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, cursor)
+
+    def _after(self, ordering, raw_values):
+        """
+        Condição "linha vem depois do cursor" para uma ordenação com
+        direções mistas: OR de (prefixo igual E campo seguinte depois).
+
+        O OR sozinho não serve de início a um intervalo do índice (o
+        PostgreSQL leria e descartaria as páginas anteriores): vai junto
+        com a condição redundante `primeiro campo >= valor` (ou <=), que o
+        planeador usa como Index Cond na coluna da frente.
+        """
+        model = self.page_model
+        values = [
+            self._decode(model, field.lstrip('-'), value)
+            for field, value in zip(ordering, raw_values)
+        ]
+        condition = Q()
+        equal = Q()
+        for field, value in zip(ordering, values):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+
+        first, value = ordering[0], values[0]
+        bound = Q(**{f"{first.lstrip('-')}__{'lte' if first.startswith('-') else 'gte'}": value})
+        return bound & condition
+
+    @staticmethod
+    def _flip(field):
+        return field[1:] if field.startswith('-') else f'-{field}'
+
+    @staticmethod
+    def _value(instance, field):
+        name = field.lstrip('-')
+        if not hasattr(instance, '_meta'):
+            # Linha de values_list(named=True), com os campos pelo nome
+            return getattr(instance, 'id' if name == 'pk' else name)
+        return getattr(instance, 'pk' if name == 'pk' else instance._meta.get_field(name).attname)
+
+    @staticmethod
+    def _encode(value):
+        # isoformat preserva os microssegundos, ao contrário do DjangoJSONEncoder
+        if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+            return value.isoformat()
+        if isinstance(value, decimal.Decimal):
+            return str(value)
+        return value
+
+    def _decode(self, model, name, value):
+        field = model._meta.pk if name == 'pk' else model._meta.get_field(name)
+        try:
+            return field.to_python(value)
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
@@ -1,32 +1,24 @@
 from rest_framework import permissions
-from backend.projects.models import ProjectMember, Task
+from backend.projects.models import Task
+from backend.projects.membership import ADMIN_ROLES, get_project_roles
+
+
+def get_project_id(obj):
+    """ID do projeto a que o objeto pertence (o próprio projeto ou o da tarefa)."""
+    # Se for uma Task, verifica permissões no projeto relacionado
+    if isinstance(obj, Task):
+        return obj.project_id
+    return obj.pk
 
 
 class IsMemberOrOwner(permissions.BasePermission):
     
     def has_object_permission(self, request, view, obj):
-        # Se for uma Task, verifica permissões no projeto relacionado
-        if isinstance(obj, Task):
-            project = obj.project
-        else:
-            project = obj
-        if project.owner == request.user:
-            return True
-        return project.members.filter(pk=request.user.pk).exists()
+        # O mapa de papéis inclui os projetos de que o utilizador é dono
+        return get_project_id(obj) in get_project_roles(request)
 
 
 class IsProjectAdminOrOwner(permissions.BasePermission):
     
     def has_object_permission(self, request, view, obj):
-        # Se for uma Task, verifica permissões no projeto relacionado
-        if isinstance(obj, Task):
-            project = obj.project
-        else:
-            project = obj
-        if project.owner == request.user:
-            return True
-        try:
-            member = ProjectMember.objects.get(project=project, user=request.user)
-            return member.role == ProjectMember.Role.ADMIN
-        except ProjectMember.DoesNotExist:
-            return False
+        return get_project_roles(request).get(get_project_id(obj)) in ADMIN_ROLES
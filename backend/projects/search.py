@@ -0,0 +1,115 @@
+"""
+Pesquisa de texto integral (PostgreSQL) em projetos, tarefas, feedbacks e ideias.
+
+Cada modelo tem uma coluna `search_vector` (tsvector, com índice GIN)
+mantida por um trigger da base de dados a cada INSERT ou UPDATE do título
+ou da descrição, incluindo as escritas em massa que não passam pelo
+`save()`. Os triggers são criados na migração 0012; uma alteração ao
+vetor (pesos, configuração) precisa de uma migração nova com o SQL.
+
+A pesquisa é feita em duas queries: um UNION ALL de todos os tipos, já
+filtrado pelos projetos do utilizador e ordenado por relevância, que
+devolve apenas os N melhores; e, para esses, os excertos destacados
+(ts_headline, que é caro), uma query por tipo presente nos resultados.
+"""
+import html
+from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank
+from django.db.models import CharField, F, IntegerField, Value
+from backend.projects.models import Feedback, Idea, Project, Task
+
+# Configuração de texto usada nas pesquisas (tem de coincidir com a dos triggers)
+SEARCH_CONFIG = 'portuguese'
+
+# Marcadores usados pelo ts_headline, substituídos depois de escapar o HTML
+HIGHLIGHT_START, HIGHLIGHT_STOP = '\x02', '\x03'
+
+# tipo: (modelo, campo do título, campo do texto)
+SEARCH_SOURCES = {
+    'project': (Project, 'name', 'description'),
+    'task': (Task, 'title', 'description'),
+    'feedback': (Feedback, 'summary', 'description'),
+    'idea': (Idea, 'title', 'description'),
+}
+
+
+def visible(kind, roles, user):
+    """Queryset dos objetos de `kind` que o utilizador pode ver."""
+    model = SEARCH_SOURCES[kind][0]
+    project_ids = list(roles)
+    if kind == 'project':
+        return model.objects.filter(pk__in=project_ids)
+    if kind == 'idea':
+        # As ideias não pertencem a projetos: cada utilizador vê as suas
+        return model.objects.filter(author=user)
+    return model.objects.filter(project_id__in=project_ids)
+
+
+def search(text, roles, user, kinds=None, limit=20):
+    """
+    Devolve até `limit` resultados, do mais para o menos relevante:
+    [{'type', 'id', 'title', 'snippet', 'rank', 'project'}].
+    """
+    query = SearchQuery(text, config=SEARCH_CONFIG, search_type='websearch')
+    kinds = [kind for kind in SEARCH_SOURCES if kinds is None or kind in kinds]
+
+    ranked = []
+    for kind in kinds:
+        project = F('pk') if kind == 'project' else (
+            Value(None, output_field=IntegerField()) if kind == 'idea' else F('project_id')
+        )
+        # Só anotações, pela mesma ordem em todos os ramos do UNION
+        ranked.append(
+            visible(kind, roles, user)
+            .filter(search_vector=query)
+            .order_by()
+            .annotate(
+                result_type=Value(kind, output_field=CharField()),
+                result_id=F('pk'),
+                result_project=project,
+                rank=SearchRank(F('search_vector'), query),
+            )
+            .values('result_type', 'result_id', 'result_project', 'rank')
+        )
+    if not ranked:
+        return []
+
+    combined = ranked[0].union(*ranked[1:], all=True) if len(ranked) > 1 else ranked[0]
+    top = list(combined.order_by('-rank', 'result_type', 'result_id')[:limit])
+
+    snippets = {}
+    for kind in {row['result_type'] for row in top}:
+        model, title_field, body_field = SEARCH_SOURCES[kind]
+        ids = [row['result_id'] for row in top if row['result_type'] == kind]
+        rows = model.objects.filter(pk__in=ids).annotate(
+            snippet=SearchHeadline(
+                body_field,
+                query,
+                config=SEARCH_CONFIG,
+                start_sel=HIGHLIGHT_START,
+                stop_sel=HIGHLIGHT_STOP,
+                max_words=35,
+                min_words=15,
+                max_fragments=2,
+            ),
+        ).values_list('pk', title_field, 'snippet')
+        for pk, title, snippet in rows:
+            snippets[kind, pk] = (title, snippet)
+
+    results = []
+    for row in top:
+        title, snippet = snippets[row['result_type'], row['result_id']]
+        results.append({
+            'type': row['result_type'],
+            'id': row['result_id'],
+            'title': title,
+            'snippet': highlight(snippet),
+            'rank': row['rank'],
+            'project': row['result_project'],
+        })
+    return results
+
+
+def highlight(snippet):
+    """Escapa o excerto e converte os marcadores do ts_headline em <mark>."""
+    escaped = html.escape(snippet or '')
+    return escaped.replace(HIGHLIGHT_START, '<mark>').replace(HIGHLIGHT_STOP, '</mark>')
@@ -1,11 +1,53 @@
 from datetime import date
+from django.conf import settings
 from rest_framework import serializers
-from backend.projects.models import Project, ProjectMember, Tag, Task, Comment, Attachment
+from rest_framework.reverse import reverse
+from backend.projects.models import Project, ProjectMember, Tag, Task, Comment, Attachment, UploadSession
+from backend.projects.counters import priority_counter, status_counter
+from backend.projects.search import SEARCH_SOURCES
+from backend.projects.thumbnails import is_image, thumbnail_url
 from backend.accounts.models import Account
 
 
+def build_tasks_summary(project):
+    """Resumo das tarefas do projeto, lido dos contadores mantidos em Project."""
+    return {
+        'completed': project.tasks_done,
+        'total': project.tasks_total,
+        'by_status': {
+            status: getattr(project, status_counter(status)) for status in Task.Status.values
+        },
+        'by_priority': {
+            priority: getattr(project, priority_counter(priority)) for priority in Task.Priority.values
+        },
+    }
+
+
+class ThumbnailField(serializers.ImageField):
+    """
+    Devolve o URL da miniatura da foto de perfil no tamanho indicado (ver
+    THUMBNAIL_SIZES), ou do original enquanto a miniatura é gerada.
+    """
+
+    def __init__(self, size, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+        self.size = size
+
+    def to_representation(self, value):
+        if not value:
+            return None
+        # A conta regista a foto cujas miniaturas já existem
+        url = thumbnail_url(value, self.size, ready=value.instance.thumbnail_source == value.name)
+        request = self.context.get('request', None)
+        if request is not None:
+            return request.build_absolute_uri(url)
+        return url
+
+
 class AssigneeSerializer(serializers.ModelSerializer):
     """Serializer leve para mostrar o responsável pela tarefa."""
+    profile_picture = ThumbnailField(size='sm')
     class Meta:
         model = Account
         fields = ['id', 'first_name', 'last_name', 'profile_picture']
@@ -22,9 +64,23 @@ class CommentSerializer(serializers.ModelSerializer):
 class AttachmentSerializer(serializers.ModelSerializer):
     """Serializer para exibir os anexos de uma tarefa."""
     uploaded_by = AssigneeSerializer(read_only=True)
+    download_url = serializers.SerializerMethodField()
+    preview = serializers.SerializerMethodField()
     class Meta:
         model = Attachment
-        fields = ['id', 'file', 'description', 'uploaded_by', 'uploaded_at']
+        fields = ['id', 'file', 'download_url', 'preview', 'description', 'uploaded_by', 'uploaded_at']
+
+    def get_preview(self, obj):
+        # Os blobs não têm extensão: o tipo vem do nome original
+        if not is_image(obj.original_name or obj.file.name):
+            return None
+        url = thumbnail_url(obj.file, 'md', ready=obj.blob_id is not None and obj.blob.thumbnails_ready)
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request is not None else url
+
+    def get_download_url(self, obj):
+        # Endpoint autenticado; o URL de `file` só funciona se o MEDIA for público
+        return reverse('attachment-download', kwargs={'pk': obj.pk}, request=self.context.get('request'))
 
 
 class CommentCreateSerializer(serializers.ModelSerializer):
@@ -47,6 +103,59 @@ class AttachmentCreateSerializer(serializers.ModelSerializer):
         fields = ['file', 'description']
 
 
+class SearchQuerySerializer(serializers.Serializer):
+    """
+    Parâmetros de /api/search/: `q` (sintaxe de pesquisa web: "frase exata",
+    -excluir, OR), `types` (lista separada por vírgulas) e `limit`.
+    """
+    q = serializers.CharField(min_length=2, max_length=200)
+    types = serializers.CharField(required=False)
+    limit = serializers.IntegerField(min_value=1, max_value=50, default=20)
+
+    def validate_types(self, value):
+        types = {kind.strip() for kind in value.split(',') if kind.strip()}
+        unknown = types - set(SEARCH_SOURCES)
+        if unknown:
+            raise serializers.ValidationError(
+                f"Tipos desconhecidos: {', '.join(sorted(unknown))}. Válidos: {', '.join(SEARCH_SOURCES)}."
+            )
+        return types
+
+
+class ChangesQuerySerializer(serializers.Serializer):
+    """Parâmetros de /api/changes/: `since` (último cursor recebido) e `limit`."""
+    since = serializers.IntegerField(min_value=0, required=False)
+    limit = serializers.IntegerField(min_value=1, max_value=1000, default=500)
+
+
+class UploadStartSerializer(serializers.Serializer):
+    """
+    Inicia um upload em partes de um anexo para uma tarefa.
+    O cliente declara o nome e o tamanho total do ficheiro.
+    """
+    task = serializers.IntegerField()
+    filename = serializers.CharField(max_length=255)
+    size = serializers.IntegerField(min_value=1)
+    description = serializers.CharField(max_length=255, required=False, allow_blank=True, default='')
+
+    def validate_size(self, value):
+        if value > settings.CHUNKED_UPLOAD_MAX_SIZE:
+            raise serializers.ValidationError(
+                f"O tamanho máximo é {settings.CHUNKED_UPLOAD_MAX_SIZE} bytes."
+            )
+        return value
+
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    """Estado de um upload em partes, para o cliente saber onde retomar."""
+    offset = serializers.IntegerField(source='received', read_only=True)
+    expires_at = serializers.DateTimeField(read_only=True)
+
+    class Meta:
+        model = UploadSession
+        fields = ['id', 'filename', 'size', 'offset', 'expires_at']
+
+
 class RecursiveField(serializers.Serializer):
     """
     Um campo especial para lidar com a recursividade das subtarefas.
@@ -81,6 +190,98 @@ class TaskTagActionSerializer(serializers.Serializer):
         return value
 
 
+class TaskBulkTagSerializer(serializers.Serializer):
+    """
+    Valida uma alteração de tags em várias tarefas de uma vez:
+    {"task_ids": [...], "add": [<tag_id>, ...], "remove": [<tag_id>, ...]}.
+    """
+    MAX_TASKS = 5000
+
+    task_ids = serializers.ListField(
+        child=serializers.IntegerField(), allow_empty=False, max_length=MAX_TASKS
+    )
+    add = serializers.ListField(child=serializers.IntegerField(), required=False, default=list)
+    remove = serializers.ListField(child=serializers.IntegerField(), required=False, default=list)
+
+    def validate(self, attrs):
+        attrs['task_ids'] = set(attrs['task_ids'])
+        attrs['add'], attrs['remove'] = set(attrs['add']), set(attrs['remove'])
+        if not attrs['add'] and not attrs['remove']:
+            raise serializers.ValidationError("Indique pelo menos uma tag a adicionar ou remover.")
+        if attrs['add'] & attrs['remove']:
+            raise serializers.ValidationError("Uma tag não pode ser adicionada e removida ao mesmo tempo.")
+
+        # Todas as tags referenciadas são validadas numa única query
+        requested = attrs['add'] | attrs['remove']
+        missing = requested - set(Tag.objects.filter(pk__in=requested).values_list('pk', flat=True))
+        if missing:
+            raise serializers.ValidationError({'tags': f"Tags inexistentes: {sorted(missing)}"})
+        return attrs
+
+
+class TaskBulkUpdateSerializer(serializers.Serializer):
+    """
+    Campos editáveis de uma tarefa numa operação em massa. As relações
+    são recebidas como IDs e resolvidas de uma só vez pela view, em vez
+    de uma query por item.
+    """
+    title = serializers.CharField(max_length=255)
+    description = serializers.CharField(max_length=255)
+    status = serializers.ChoiceField(choices=Task.Status.choices)
+    priority = serializers.ChoiceField(choices=Task.Priority.choices)
+    assignee = serializers.IntegerField(allow_null=True)
+    start_date = serializers.DateTimeField(allow_null=True)
+    due_date = serializers.DateField(allow_null=True)
+    estimated_hours = serializers.DecimalField(max_digits=5, decimal_places=2, allow_null=True)
+
+
+class TaskBulkCreateSerializer(TaskBulkUpdateSerializer):
+    """Campos para criar uma tarefa numa operação em massa."""
+    project = serializers.IntegerField()
+    parent_task = serializers.IntegerField(required=False, allow_null=True)
+    status = serializers.ChoiceField(choices=Task.Status.choices, required=False)
+    priority = serializers.ChoiceField(choices=Task.Priority.choices, required=False)
+    assignee = serializers.IntegerField(required=False, allow_null=True)
+    start_date = serializers.DateTimeField(required=False, allow_null=True)
+    due_date = serializers.DateField(required=False, allow_null=True)
+    estimated_hours = serializers.DecimalField(max_digits=5, decimal_places=2, required=False, allow_null=True)
+
+
+class TaskBulkOperationSerializer(serializers.Serializer):
+    """
+    Uma operação do endpoint em massa:
+    - {"op": "create", "data": {...}}
+    - {"op": "update", "id": <id>, "data": {...}} (atualização parcial)
+    - {"op": "transition", "id": <id>, "status": "<STATUS>"}
+    """
+    OPERATION_CHOICES = ('create', 'update', 'transition')
+
+    op = serializers.ChoiceField(choices=OPERATION_CHOICES)
+    id = serializers.IntegerField(required=False)
+    status = serializers.ChoiceField(choices=Task.Status.choices, required=False)
+    data = serializers.DictField(required=False)
+
+    def validate(self, attrs):
+        op = attrs['op']
+        if op in ('update', 'transition') and 'id' not in attrs:
+            raise serializers.ValidationError({'id': "Obrigatório para esta operação."})
+        if op in ('create', 'update') and 'data' not in attrs:
+            raise serializers.ValidationError({'data': "Obrigatório para esta operação."})
+        if op == 'transition' and 'status' not in attrs:
+            raise serializers.ValidationError({'status': "Obrigatório para esta operação."})
+
+        if op == 'create':
+            fields = TaskBulkCreateSerializer(data=attrs['data'])
+        elif op == 'update':
+            fields = TaskBulkUpdateSerializer(data=attrs['data'], partial=True)
+        else:
+            return attrs
+        if not fields.is_valid():
+            raise serializers.ValidationError({'data': fields.errors})
+        attrs['data'] = fields.validated_data
+        return attrs
+
+
 class TaskListSerializer(serializers.ModelSerializer):
     """
     Serializer 'LEVE' para a listagem inicial de tarefas.
@@ -88,14 +289,18 @@ class TaskListSerializer(serializers.ModelSerializer):
     """
     assignee = AssigneeSerializer(read_only=True)
     tags = TagSerializer(many=True, read_only=True)
-    # Aqui está a magia da recursividade para as subtarefas
-    subtasks = RecursiveField(many=True, read_only=True)
+    # Aqui está a magia da recursividade para as subtarefas.
+    # `subtask_list` usa a árvore já montada em memória pela view.
+    subtasks = RecursiveField(source='subtask_list', many=True, read_only=True)
+    # Anotados pelo queryset (TaskQuerySet.with_activity_counts)
+    comment_count = serializers.IntegerField(read_only=True)
+    attachment_count = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = Task
         fields = [
             'id', 'title', 'status', 'priority', 'due_date', 'updated_at',
-            'assignee', 'tags', 'subtasks'
+            'assignee', 'tags', 'comment_count', 'attachment_count', 'subtasks'
         ]
 
 
@@ -118,6 +323,29 @@ class TaskDetailSerializer(serializers.ModelSerializer):
             'assignee', 'tags', 'comments', 'attachments', 'project', 'parent_task'
         ]
 
+    def validate(self, attrs):
+        """
+        Garante que a tarefa pai pertence ao mesmo projeto e que a
+        hierarquia não fica com ciclos.
+        """
+        parent = attrs.get('parent_task', getattr(self.instance, 'parent_task', None))
+        project = attrs.get('project', getattr(self.instance, 'project', None))
+        if parent is None:
+            return attrs
+
+        if project is not None and parent.project_id != project.pk:
+            raise serializers.ValidationError(
+                {'parent_task': "A tarefa pai tem de pertencer ao mesmo projeto."}
+            )
+        if self.instance is not None and (
+            parent.pk == self.instance.pk
+            or parent.path.startswith(f'{self.instance.path}{self.instance.pk}/')
+        ):
+            raise serializers.ValidationError(
+                {'parent_task': "Uma tarefa não pode ser movida para dentro de si própria."}
+            )
+        return attrs
+
 
 class MemberSerializer(serializers.ModelSerializer):
     
@@ -132,6 +360,7 @@ class MemberSerializer(serializers.ModelSerializer):
 class ProjectMemberAvatarSerializer(serializers.ModelSerializer):
     
     full_name = serializers.CharField(source='get_full_name', read_only=True)
+    profile_picture = ThumbnailField(size='sm')
     
     class Meta:
         model = Account
@@ -142,10 +371,21 @@ class ProjectListSerializer(serializers.ModelSerializer):
     
     owner_name = serializers.CharField(source='owner.get_full_name', read_only=True)
     members = ProjectMemberAvatarSerializer(many=True, read_only=True)
+    progress_percentage = serializers.IntegerField(read_only=True)
+    tasks_summary = serializers.SerializerMethodField()
+    # Anotados pelo queryset (with_activity_counts)
+    comment_count = serializers.IntegerField(read_only=True)
+    attachment_count = serializers.IntegerField(read_only=True)
     
     class Meta:
         model = Project
-        fields = ['id', 'name', 'description', 'status', 'is_archived', 'due_date', 'owner_name', 'members']
+        fields = [
+            'id', 'name', 'description', 'status', 'is_archived', 'due_date', 'owner_name', 'members',
+            'progress_percentage', 'tasks_summary', 'comment_count', 'attachment_count'
+        ]
+
+    def get_tasks_summary(self, obj):
+        return build_tasks_summary(obj)
 
 
 class MemberDetailSerializer(serializers.ModelSerializer):
@@ -153,7 +393,7 @@ class MemberDetailSerializer(serializers.ModelSerializer):
     full_name = serializers.CharField(source='user.get_full_name', read_only=True)
     email = serializers.EmailField(source='user.email', read_only=True)
     job_title = serializers.CharField(source='user.job_title', read_only=True)
-    profile_picture = serializers.ImageField(source='user.profile_picture', read_only=True)
+    profile_picture = ThumbnailField(source='user.profile_picture', size='md')
 
     class Meta:
         model = ProjectMember
@@ -180,25 +420,11 @@ class ProjectDetailSerializer(serializers.ModelSerializer):
         ]
     
     def get_tasks_summary(self, obj):
-        
-        total_tasks = obj.tasks.count()
-        completed_tasks = obj.tasks.filter(status=Task.Status.DONE).count()
-        
-        return {
-            'completed': completed_tasks,
-            'total': total_tasks
-        }
+        # Lido dos contadores do projeto, sem queries adicionais
+        return build_tasks_summary(obj)
     
     def get_progress_percentage(self, obj):
-        
-        summary = self.get_tasks_summary(obj)
-        total = summary['total']
-        completed = summary['completed']
-        
-        if total == 0:
-            return 0
-        
-        return round((completed / total) * 100)
+        return obj.progress_percentage
     
     def get_days_remaining(self, obj):
         
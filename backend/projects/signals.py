@@ -0,0 +1,173 @@
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.db.models.signals import m2m_changed, post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from backend.accounts.models import Account
+from backend.projects.catalogue import invalidate_tag_catalogue
+from backend.projects.changes import CREATED, DELETED, UPDATED, record_change, record_task_updates
+from backend.projects.counters import apply_task_counter_deltas, counter_state, task_counter_deltas
+from backend.projects.membership import invalidate_project_roles
+from backend.projects.models import Attachment, Blob, Comment, Project, ProjectMember, Tag, Task
+from backend.projects.thumbnails import delete_thumbnails, is_image, schedule_thumbnails
+
+
+@receiver(post_save, sender=Task)
+def update_task_counters_on_save(sender, instance, created, raw=False, **kwargs):
+    """Atualiza os contadores do projeto quando uma tarefa é criada ou alterada."""
+    if raw:
+        return
+    new_state = counter_state(instance.__dict__)
+    if created:
+        old_state = None
+    else:
+        old_state = counter_state(getattr(instance, '_loaded_values', {}))
+        if old_state is None or new_state is None:
+            # Sem o estado anterior não há como calcular a variação;
+            # o comando reconcile_task_counters corrige o desvio.
+            return
+    apply_task_counter_deltas(task_counter_deltas(old_state, new_state))
+
+
+@receiver(post_delete, sender=Task)
+def update_task_counters_on_delete(sender, instance, **kwargs):
+    """Desconta a tarefa removida (inclui remoções em cascata)."""
+    old_state = counter_state(instance.__dict__)
+    if old_state is not None:
+        apply_task_counter_deltas(task_counter_deltas(old_state, None))
+
+
+@receiver(post_save, sender=ProjectMember)
+@receiver(post_delete, sender=ProjectMember)
+def invalidate_roles_on_membership_change(sender, instance, **kwargs):
+    invalidate_project_roles(instance.user_id)
+
+
+@receiver(post_save, sender=ProjectMember)
+@receiver(post_delete, sender=ProjectMember)
+def touch_project_on_membership_change(sender, instance, **kwargs):
+    # Os membros fazem parte da representação do projeto (ver conditional.py)
+    Project.objects.filter(pk=instance.project_id).update(updated_at=timezone.now())
+
+
+@receiver(m2m_changed, sender=Project.tags.through)
+@receiver(m2m_changed, sender=Task.tags.through)
+def touch_on_tags_change(sender, instance, action, reverse, model, pk_set, **kwargs):
+    """Atualiza o `updated_at` dos projetos/tarefas cujas tags mudaram."""
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            type(instance).objects.filter(pk=instance.pk).update(updated_at=timezone.now())
+            record_change(instance, UPDATED)
+    elif action in ('post_add', 'post_remove') and pk_set:
+        model.objects.filter(pk__in=pk_set).update(updated_at=timezone.now())
+        record_tagged_changes(model, pk_set)
+    elif action == 'pre_clear':
+        # tag.task_set.clear(): os afetados só são conhecidos antes de apagar
+        linked = list(sender.objects.filter(tag_id=instance.pk).values_list(f'{model._meta.model_name}_id', flat=True))
+        model.objects.filter(pk__in=linked).update(updated_at=timezone.now())
+        record_tagged_changes(model, linked)
+
+
+def record_tagged_changes(model, pks):
+    if model is Task:
+        record_task_updates(pks)
+    else:
+        for project in Project.objects.filter(pk__in=pks).only('pk'):
+            record_change(project, UPDATED)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_save, sender=Attachment)
+@receiver(post_delete, sender=Comment)
+@receiver(post_delete, sender=Attachment)
+def touch_on_activity_change(sender, instance, raw=False, **kwargs):
+    """Comentários e anexos contam para o `updated_at` do objeto a que pertencem."""
+    if raw:
+        return
+    model = instance.content_type.model_class()
+    if model in (Project, Task):
+        model.objects.filter(pk=instance.object_id).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=Project)
+@receiver(post_save, sender=Task)
+@receiver(post_save, sender=ProjectMember)
+@receiver(post_save, sender=Comment)
+@receiver(post_save, sender=Attachment)
+def record_change_on_save(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        record_change(instance, CREATED if created else UPDATED)
+
+
+@receiver(post_delete, sender=Project)
+@receiver(post_delete, sender=Task)
+@receiver(post_delete, sender=ProjectMember)
+@receiver(post_delete, sender=Comment)
+@receiver(post_delete, sender=Attachment)
+def record_change_on_delete(sender, instance, **kwargs):
+    record_change(instance, DELETED)
+
+
+@receiver(post_save, sender=Project)
+def invalidate_roles_on_owner_change(sender, instance, created, **kwargs):
+    loaded_owner_id = getattr(instance, '_loaded_owner_id', None)
+    if created or instance.owner_id != loaded_owner_id:
+        invalidate_project_roles(instance.owner_id, loaded_owner_id)
+    instance._loaded_owner_id = instance.owner_id
+
+
+@receiver(post_delete, sender=Project)
+def invalidate_roles_on_project_delete(sender, instance, **kwargs):
+    invalidate_project_roles(instance.owner_id)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def invalidate_tag_catalogue_on_change(sender, **kwargs):
+    invalidate_tag_catalogue()
+
+
+@receiver(post_save, sender=Attachment)
+def increment_blob_references(sender, instance, created, raw=False, **kwargs):
+    if created and not raw and instance.blob_id:
+        Blob.objects.filter(pk=instance.blob_id).update(ref_count=F('ref_count') + 1)
+
+
+@receiver(post_delete, sender=Attachment)
+def release_blob_reference(sender, instance, **kwargs):
+    """Desconta a referência e apaga o conteúdo quando deixa de ser usado."""
+    if not instance.blob_id:
+        return
+    Blob.objects.filter(pk=instance.blob_id).update(ref_count=Greatest(F('ref_count') - 1, 0))
+
+    unused = Blob.objects.filter(pk=instance.blob_id, ref_count=0)
+    names = list(unused.values_list('file', flat=True))
+    if names:
+        unused.delete()
+        # O ficheiro só é apagado depois de a transação ser confirmada
+        transaction.on_commit(lambda: [_delete_blob_file(name) for name in names])
+
+
+def _delete_blob_file(name):
+    default_storage.delete(name)
+    delete_thumbnails(name)
+
+
+@receiver(post_save, sender=Attachment)
+def generate_attachment_previews(sender, instance, created, raw=False, **kwargs):
+    if created and not raw and is_image(instance.original_name or instance.file.name):
+        name = instance.file.name
+        transaction.on_commit(lambda: schedule_thumbnails(name))
+
+
+@receiver(post_save, sender=Account)
+def generate_avatar_thumbnails(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Gera as miniaturas da foto de perfil assim que esta é alterada."""
+    if raw or not instance.profile_picture:
+        return
+    if update_fields is not None and 'profile_picture' not in update_fields:
+        return
+    name = instance.profile_picture.name
+    transaction.on_commit(lambda: schedule_thumbnails(name))
@@ -0,0 +1,231 @@
+"""
+/api/events/: Server-Sent Events com as alterações dos projetos do utilizador.
+
+É servido por uma aplicação ASGI própria, montada à frente do Django em
+backend/asgi.py, e não por uma view: o handler ASGI do Django mantém uma
+thread e uma ligação à base de dados por pedido enquanto a resposta
+estiver aberta, o que não escala para milhares de ligações inativas.
+Aqui, a autenticação e as leituras correm na pool de threads e libertam a
+ligação à base de dados logo a seguir; depois disso, cada cliente é apenas
+uma subscrição no broker (ver events.py) e uma tarefa asyncio suspensa.
+
+Parâmetros (o EventSource não permite definir cabeçalhos):
+- `access_token`: token JWT de acesso (ou o cabeçalho Authorization);
+- `projects`: IDs separados por vírgulas (por omissão, todos os do utilizador).
+O Last-Event-ID (cabeçalho, ou `last_event_id`) retoma a partir do registo
+de alterações.
+"""
+import asyncio
+import json
+from urllib.parse import parse_qs
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from backend.accounts.authentication import CachedJWTAuthentication
+from backend.projects.changes import ChangesExpired, changes_since, settled_cursor
+from backend.projects.events import EVENT_TYPES, get_broker
+from backend.projects.membership import get_user_project_roles
+
+EVENTS_PATH = '/api/events/'
+
+
+class EventStreamError(Exception):
+
+    def __init__(self, status, detail):
+        super().__init__(detail)
+        self.status = status
+        self.detail = detail
+
+
+def database_call(function):
+    """
+    Corre `function` na pool de threads, como um pedido do Django: as
+    ligações à base de dados são libertadas no fim (CONN_MAX_AGE).
+    """
+    def call(*args):
+        close_old_connections()
+        try:
+            return function(*args)
+        finally:
+            close_old_connections()
+    return sync_to_async(call, thread_sensitive=False)
+
+
+def parse_project_ids(value):
+    try:
+        return {int(project_id) for project_id in value.split(',') if project_id.strip()}
+    except ValueError:
+        raise EventStreamError(400, "`projects` deve ser uma lista de IDs separados por vírgulas.")
+
+
+@database_call
+def open_stream(token, projects):
+    """Autentica o token e devolve (utilizador, projetos a acompanhar)."""
+    if not token:
+        raise EventStreamError(401, "As credenciais de autenticação não foram fornecidas.")
+    authentication = CachedJWTAuthentication()
+    try:
+        user = authentication.get_user(authentication.get_validated_token(token))
+    except AuthenticationFailed:
+        raise EventStreamError(401, "Token inválido ou expirado.")
+
+    visible = set(get_user_project_roles(user))
+    if projects is None:
+        return user, visible
+    requested = parse_project_ids(projects)
+    if requested - visible:
+        raise EventStreamError(403, "Sem permissão para algum dos projetos pedidos.")
+    return user, requested
+
+
+@database_call
+def read_backlog(user, project_ids, last_event_id):
+    """
+    Alterações perdidas desde `last_event_id`, e se o cliente tem de
+    voltar a ler tudo (cursor expirado ou demasiadas alterações).
+    """
+    try:
+        since = int(last_event_id)
+    except (TypeError, ValueError):
+        return [], False
+    try:
+        # O id do último evento pode estar à frente de entradas ainda por
+        # confirmar quando foi enviado: as recentes são enviadas outra vez
+        since = min(since, settled_cursor())
+        data = changes_since(user, list(project_ids), since=since, limit=settings.EVENTS_REPLAY_LIMIT)
+    except ChangesExpired:
+        return [], True
+    backlog = [
+        entry for entry in data['changes']
+        if entry['type'] in EVENT_TYPES and entry['project'] in project_ids
+    ]
+    return backlog, data['has_more']
+
+
+def format_event(entry, event='change'):
+    """Mensagem SSE; o cursor é o `id`, devolvido no Last-Event-ID."""
+    return f"id: {entry['cursor']}\nevent: {event}\ndata: {json.dumps(entry)}\n\n"
+
+
+async def event_stream(subscription, backlog=(), resync=False):
+    """
+    Mensagens da ligação: primeiro as alterações perdidas (`backlog`),
+    depois os eventos à medida que chegam, com um comentário periódico
+    para manter a ligação aberta em proxies. A subscrição é removida
+    quando o gerador termina ou é cancelado (cliente desligou).
+    """
+    try:
+        yield f'retry: {settings.EVENTS_RETRY_MS}\n\n'
+        if resync:
+            yield 'event: resync\ndata: {}\n\n'
+        replayed = set()
+        for entry in backlog:
+            replayed.add(entry['cursor'])
+            yield format_event(entry)
+        while True:
+            try:
+                entry = await subscription.get(settings.EVENTS_HEARTBEAT)
+            except asyncio.TimeoutError:
+                yield ': ping\n\n'
+                continue
+            if subscription.overflowed:
+                return
+            # A subscrição começa antes da leitura do backlog: evita repetidos
+            if entry['cursor'] not in replayed:
+                yield format_event(entry)
+    finally:
+        subscription.close()
+
+
+def cors_headers(origin):
+    # Este endpoint não passa pelo CorsMiddleware
+    if origin and origin in settings.CORS_ALLOWED_ORIGINS:
+        return [
+            (b'access-control-allow-origin', origin.encode('latin-1')),
+            (b'access-control-allow-credentials', b'true'),
+            (b'vary', b'Origin'),
+        ]
+    return []
+
+
+async def send_json(send, status, data, headers=()):
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'application/json'), *headers],
+    })
+    await send({'type': 'http.response.body', 'body': json.dumps(data).encode('utf-8')})
+
+
+async def wait_for_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+async def serve_events(scope, receive, send):
+    headers = {name.decode('latin-1').lower(): value.decode('latin-1') for name, value in scope['headers']}
+    params = {key: values[-1] for key, values in parse_qs(scope.get('query_string', b'').decode('latin-1')).items()}
+    cors = cors_headers(headers.get('origin'))
+    if scope['method'] != 'GET':
+        return await send_json(send, 405, {'detail': "Método não permitido."}, cors)
+
+    token = params.get('access_token')
+    authorization = headers.get('authorization', '').split()
+    if not token and len(authorization) == 2 and authorization[0] == 'Bearer':
+        token = authorization[1]
+    try:
+        user, project_ids = await open_stream(token, params.get('projects'))
+    except EventStreamError as error:
+        return await send_json(send, error.status, {'detail': error.detail}, cors)
+
+    subscription = get_broker().subscribe(project_ids)
+    try:
+        backlog, resync = await read_backlog(
+            user, project_ids, headers.get('last-event-id') or params.get('last_event_id')
+        )
+    except BaseException:
+        subscription.close()
+        raise
+    stream = event_stream(subscription, backlog, resync)
+
+    async def respond():
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [
+                (b'content-type', b'text/event-stream; charset=utf-8'),
+                (b'cache-control', b'no-cache'),
+                # Sem buffering no nginx
+                (b'x-accel-buffering', b'no'),
+                *cors,
+            ],
+        })
+        async for message in stream:
+            await send({'type': 'http.response.body', 'body': message.encode('utf-8'), 'more_body': True})
+        await send({'type': 'http.response.body', 'body': b''})
+
+    response = asyncio.ensure_future(respond())
+    disconnect = asyncio.ensure_future(wait_for_disconnect(receive))
+    try:
+        await asyncio.wait({response, disconnect}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in (response, disconnect):
+            task.cancel()
+        await asyncio.gather(response, disconnect, return_exceptions=True)
+        await stream.aclose()
+    if not response.cancelled() and response.exception() is not None:
+        raise response.exception()
+
+
+class EventsApplication:
+    """Encaminha /api/events/ para serve_events e o resto para o Django."""
+
+    def __init__(self, application, path=EVENTS_PATH):
+        self.application = application
+        self.path = path
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http' and scope['path'] == self.path:
+            return await serve_events(scope, receive, send)
+        return await self.application(scope, receive, send)
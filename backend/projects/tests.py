@@ -1,3 +1,2396 @@
-from django.test import TestCase
+import asyncio
+import contextlib
+import datetime
+import errno
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import mock, skipUnless
+from urllib.parse import urlencode
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache, caches
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import http_date, parse_http_date
+from PIL import Image
+from rest_framework.request import Request
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from backend.accounts.authentication import get_cached_account
+from backend.accounts.models import Account
+from backend.instrumentation import RequestProfile, fingerprint, serializer_timing_installed, uninstall_serializer_timing
+from backend.replicas import ReplicaRouter, ReplicaRoutingMiddleware
+from backend.projects.conditional import validators_last_modified
+from backend.projects.events import ChangeLogBroker, get_broker
+from backend.projects.membership import get_user_project_roles, load_project_roles
+from backend.projects.models import Attachment, Blob, ChangeLog, Comment, Feedback, Idea, Project, ProjectMember, Tag, Task, UploadSession
+from backend.projects.pagination import KeysetPagination
+from backend.projects.sse import EVENTS_PATH, serve_events
+from backend.projects.thumbnails import generate_thumbnails, thumbnail_name
+from backend.projects.transfer import ProjectImporter, aexport_lines, export_lines
+from backend.projects.uploads import append_chunk
+from backend.projects.views import ProjectViewSet
 
-# Create your tests here.
+
+class QueryBudget(CaptureQueriesContext):
+    """
+    Context manager que falha o teste quando o bloco executa mais
+    queries do que o orçamento declarado. Mostra o SQL executado
+    para facilitar a identificação de N+1.
+    """
+
+    def __init__(self, testcase, budget, label=''):
+        super().__init__(connection)
+        self.testcase = testcase
+        self.budget = budget
+        self.label = label
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        super().__exit__(exc_type, exc_value, traceback)
+        if exc_type is not None:
+            return
+        executed = len(self)
+        if executed > self.budget:
+            queries = '\n'.join(
+                f'{i}. {query["sql"]}' for i, query in enumerate(self.captured_queries, start=1)
+            )
+            self.testcase.fail(
+                f'{self.label or "Bloco"} executou {executed} queries '
+                f'(orçamento: {self.budget}):\n{queries}'
+            )
+
+
+class QueryBudgetMixin:
+    """
+    Mixin para TestCases que querem declarar orçamentos de queries.
+
+    Uso:
+        with self.assertQueryBudget(3):
+            self.client.get(url)
+    """
+
+    def assertQueryBudget(self, budget, label=''):
+        return QueryBudget(self, budget, label)
+
+
+class SharedCacheMixin:
+    """
+    Cache partilhada (em ficheiros) vista por duas aliases: 'default' e
+    'worker', como dois processos com a mesma cache.
+    """
+
+    def use_shared_cache(self):
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location, ignore_errors=True)
+        backend = {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location}
+        settings_override = override_settings(CACHES={'default': backend, 'worker': backend})
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def as_other_worker(self, *modules):
+        """Os módulos indicados passam a usar a alias 'worker'."""
+        stack = contextlib.ExitStack()
+        for module in ('backend.projects.cache_versions', *modules):
+            stack.enter_context(mock.patch(f'{module}.cache', caches['worker']))
+        return stack
+
+
+class ProjectsAPITestCase(SharedCacheMixin, QueryBudgetMixin, TestCase):
+    """
+    Base com utilizadores, cliente autenticado e fábricas simples. A cache é
+    partilhada, como em produção (REDIS_URL): os orçamentos de queries
+    contam com as caches entre pedidos ativas.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = Account.objects.create_user(
+            email='owner@example.com', password='x', first_name='Ana', last_name='Dona'
+        )
+        cls.member = Account.objects.create_user(
+            email='member@example.com', password='x', first_name='Bruno', last_name='Membro'
+        )
+        cls.outsider = Account.objects.create_user(
+            email='outsider@example.com', password='x'
+        )
+
+    def setUp(self):
+        self.use_shared_cache()
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def create_project(self, owner=None, members=(), **kwargs):
+        owner = owner or self.owner
+        kwargs.setdefault('name', 'Projeto')
+        project = Project.objects.create(owner=owner, **kwargs)
+        ProjectMember.objects.create(project=project, user=owner, role=ProjectMember.Role.ADMIN)
+        for user in members:
+            ProjectMember.objects.create(project=project, user=user)
+        return project
+
+    def create_task(self, project, **kwargs):
+        kwargs.setdefault('title', 'Tarefa')
+        kwargs.setdefault('description', '')
+        return Task.objects.create(project=project, **kwargs)
+
+
+class ProjectQueryBudgetTests(ProjectsAPITestCase):
+    """
+    Orçamentos de queries dos endpoints de projetos. Cada endpoint deve
+    manter o mesmo número de queries independentemente da quantidade
+    de linhas devolvidas.
+    """
+
+    # Inclui a query dos validadores do GET condicional
+    BUDGETS = {
+        'project-list': 4,
+        'project-detail': 5,
+    }
+
+    def assertEndpointWithinBudget(self, url_name, **kwargs):
+        url = reverse(url_name, kwargs=kwargs or None)
+        with self.assertQueryBudget(self.BUDGETS[url_name], label=url_name):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_project_list_is_constant(self):
+        for _ in range(2):
+            self.create_project(members=[self.member])
+        self.assertEndpointWithinBudget('project-list')
+
+        for _ in range(20):
+            self.create_project(members=[self.member, self.outsider])
+        response = self.assertEndpointWithinBudget('project-list')
+        self.assertEqual(len(response.data['results']), 22)
+
+    def test_project_list_has_no_duplicates_for_owner_member(self):
+        self.create_project(members=[self.member])
+        response = self.client.get(reverse('project-list'))
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual(response.data['results'][0]['owner_name'], 'Ana Dona')
+
+    def test_project_list_excludes_foreign_projects(self):
+        self.create_project(owner=self.outsider)
+        member_project = self.create_project(owner=self.outsider, members=[self.owner])
+        response = self.client.get(reverse('project-list'))
+        self.assertEqual([p['id'] for p in response.data['results']], [member_project.id])
+
+    def test_project_detail_within_budget(self):
+        project = self.create_project(members=[self.member, self.outsider])
+        project.tags.add(Tag.objects.create(name='backend'))
+        for _ in range(5):
+            self.create_task(project)
+        response = self.assertEndpointWithinBudget('project-detail', pk=project.pk)
+        self.assertEqual(len(response.data['members']), 3)
+
+    def test_search_vector_is_never_selected(self):
+        project = self.create_project(members=[self.member])
+        task = self.create_task(project)
+        Feedback.objects.create(project=project, summary='Lento', submitted_by=self.owner)
+        urls = [
+            reverse('project-list'),
+            reverse('project-detail', kwargs={'pk': project.pk}),
+            reverse('project-tasks-list', kwargs={'project_pk': project.pk}),
+            reverse('task-detail', kwargs={'pk': task.pk}),
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            for url in urls:
+                self.assertEqual(self.client.get(url).status_code, 200, url)
+            response = self.client.patch(urls[-1], {'title': 'Renomeada'}, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertFalse([query['sql'] for query in queries if 'search_vector' in query['sql']])
+
+        for model in (Project, Task, Feedback, Idea):
+            self.assertNotIn('search_vector', str(model.objects.all().query), model.__name__)
+
+
+class TaskHierarchyTests(ProjectsAPITestCase):
+    """Índice da hierarquia de tarefas (Task.path) e listagem em árvore."""
+
+    def setUp(self):
+        super().setUp()
+        self.project = self.create_project(members=[self.member])
+
+    def create_chain(self, depth, parent=None):
+        tasks = []
+        for level in range(depth):
+            parent = self.create_task(self.project, title=f'Nível {level}', parent_task=parent)
+            tasks.append(parent)
+        return tasks
+
+    def test_path_follows_parent_on_create(self):
+        root, child, grandchild = self.create_chain(3)
+        self.assertEqual(root.path, '')
+        self.assertEqual(child.path, f'{root.pk}/')
+        self.assertEqual(grandchild.path, f'{root.pk}/{child.pk}/')
+        self.assertEqual(list(root.get_descendants().order_by('pk')), [child, grandchild])
+
+    def test_moving_task_rewrites_descendant_paths(self):
+        root, child, grandchild = self.create_chain(3)
+        other_root = self.create_task(self.project, title='Outra raiz')
+
+        child.parent_task = other_root
+        child.save()
+
+        grandchild.refresh_from_db()
+        self.assertEqual(child.path, f'{other_root.pk}/')
+        self.assertEqual(grandchild.path, f'{other_root.pk}/{child.pk}/')
+        self.assertFalse(root.get_descendants().exists())
+
+        child.parent_task = None
+        child.save()
+        grandchild.refresh_from_db()
+        self.assertEqual(grandchild.path, f'{child.pk}/')
+
+    def test_cannot_move_task_below_its_descendant(self):
+        root, child, grandchild = self.create_chain(3)
+        response = self.client.patch(
+            reverse('task-detail', kwargs={'pk': root.pk}),
+            {'parent_task': grandchild.pk},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('parent_task', response.data)
+
+    def test_nested_list_queries_do_not_grow_with_depth(self):
+        url = reverse('project-tasks-list', kwargs={'project_pk': self.project.pk})
+        self.create_chain(2)
+        with self.assertQueryBudget(5, label='project-tasks-list'):
+            self.client.get(url)
+
+        for _ in range(3):
+            chain = self.create_chain(5)
+        with self.assertQueryBudget(5, label='project-tasks-list'):
+            response = self.client.get(url)
+
+        self.assertEqual(len(response.data['results']), 4)
+        deepest = next(task for task in response.data['results'] if task['id'] == chain[0].pk)
+        for _ in range(4):
+            self.assertEqual(len(deepest['subtasks']), 1)
+            deepest = deepest['subtasks'][0]
+        self.assertEqual(deepest['subtasks'], [])
+
+    def test_rebuild_command_repairs_paths(self):
+        root, child, grandchild = self.create_chain(3)
+        Task.objects.update(path='')
+
+        call_command('rebuild_task_paths', stdout=StringIO())
+
+        grandchild.refresh_from_db()
+        self.assertEqual(grandchild.path, f'{root.pk}/{child.pk}/')
+
+
+class ProjectTaskCounterTests(ProjectsAPITestCase):
+    """Contadores de tarefas mantidos incrementalmente em Project."""
+
+    def setUp(self):
+        super().setUp()
+        self.project = self.create_project()
+
+    def assertCounters(self, project, **expected):
+        project.refresh_from_db()
+        for field, value in expected.items():
+            self.assertEqual(getattr(project, field), value, field)
+
+    def test_create_update_and_delete_keep_counters(self):
+        task = self.create_task(self.project, priority=Task.Priority.HIGH)
+        self.create_task(self.project)
+        self.assertCounters(self.project, tasks_total=2, tasks_todo=2, tasks_high_priority=1, tasks_medium_priority=1)
+
+        task.status = Task.Status.DONE
+        task.priority = Task.Priority.LOW
+        task.save()
+        self.assertCounters(
+            self.project, tasks_total=2, tasks_todo=1, tasks_done=1,
+            tasks_high_priority=0, tasks_low_priority=1
+        )
+
+        task.delete()
+        self.assertCounters(self.project, tasks_total=1, tasks_done=0, tasks_low_priority=0)
+
+    def test_moving_task_between_projects(self):
+        other = self.create_project()
+        task = self.create_task(self.project, status=Task.Status.DONE)
+        task.project = other
+        task.save()
+        self.assertCounters(self.project, tasks_total=0, tasks_done=0)
+        self.assertCounters(other, tasks_total=1, tasks_done=1)
+
+    def test_cascade_delete_of_subtasks(self):
+        root = self.create_task(self.project)
+        child = self.create_task(self.project, parent_task=root)
+        self.create_task(self.project, parent_task=child)
+        root.delete()
+        self.assertCounters(self.project, tasks_total=0, tasks_todo=0)
+
+    def test_serializers_read_counters(self):
+        self.create_task(self.project, status=Task.Status.DONE)
+        self.create_task(self.project)
+        self.create_task(self.project)
+
+        detail = self.client.get(reverse('project-detail', kwargs={'pk': self.project.pk})).data
+        self.assertEqual(detail['tasks_summary']['total'], 3)
+        self.assertEqual(detail['tasks_summary']['by_status']['DONE'], 1)
+        self.assertEqual(detail['progress_percentage'], 33)
+
+        listed = self.client.get(reverse('project-list')).data['results'][0]
+        self.assertEqual(listed['progress_percentage'], 33)
+        self.assertEqual(listed['tasks_summary'], detail['tasks_summary'])
+
+    def test_project_save_keeps_concurrent_counter_changes(self):
+        get_object = ProjectViewSet.get_object
+
+        def get_object_then_add_task(view):
+            project = get_object(view)
+            # Outra transação confirma uma tarefa depois de o projeto ser lido
+            self.create_task(self.project, status=Task.Status.DONE)
+            return project
+
+        with mock.patch.object(ProjectViewSet, 'get_object', get_object_then_add_task):
+            response = self.client.patch(
+                reverse('project-detail', kwargs={'pk': self.project.pk}), {'name': 'Renomeado'}, format='json'
+            )
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertCounters(self.project, name='Renomeado', tasks_total=1, tasks_done=1)
+
+        project = Project.objects.get(pk=self.project.pk)
+        Project.objects.filter(pk=project.pk).update(tasks_total=5)
+        project.tasks_total = 0
+        project.save()
+        self.assertCounters(self.project, tasks_total=5)
+
+    def test_reconcile_command_repairs_drift(self):
+        self.create_task(self.project, status=Task.Status.DONE)
+        Project.objects.filter(pk=self.project.pk).update(tasks_total=10, tasks_done=0)
+
+        call_command('reconcile_task_counters', stdout=StringIO())
+        self.assertCounters(self.project, tasks_total=1, tasks_done=1, tasks_medium_priority=1)
+
+
+class ProjectRoleCacheTests(ProjectsAPITestCase):
+    """Mapa de papéis partilhado por permissões e querysets."""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.project = self.create_project(members=[self.member])
+
+    def count_role_queries(self, url, method='get'):
+        with self.assertQueryBudget(100) as queries:
+            response = getattr(self.client, method)(url)
+        return response, sum('UNION' in query['sql'] for query in queries.captured_queries)
+
+    def test_roles_loaded_once_per_request(self):
+        task = self.create_task(self.project)
+        response, role_queries = self.count_role_queries(reverse('task-detail', kwargs={'pk': task.pk}))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(role_queries, 1)
+
+    def test_admin_permission_uses_roles(self):
+        self.client.force_authenticate(self.member)
+        url = reverse('project-detail', kwargs={'pk': self.project.pk})
+        self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertEqual(self.client.delete(url).status_code, 403)
+
+        self.client.force_authenticate(self.outsider)
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    @override_settings(PROJECT_ROLES_CACHE_TIMEOUT=60)
+    def test_cross_request_cache_is_invalidated_by_membership_changes(self):
+        self.client.force_authenticate(self.outsider)
+        url = reverse('project-list')
+
+        self.assertEqual(self.count_role_queries(url)[1], 1)
+        response, role_queries = self.count_role_queries(url)
+        self.assertEqual((len(response.data['results']), role_queries), (0, 0))
+
+        ProjectMember.objects.create(project=self.project, user=self.outsider)
+        response, role_queries = self.count_role_queries(url)
+        self.assertEqual((len(response.data['results']), role_queries), (1, 1))
+
+    @override_settings(PROJECT_ROLES_CACHE_TIMEOUT=60)
+    def test_cross_request_cache_is_invalidated_by_owner_change(self):
+        self.client.force_authenticate(self.outsider)
+        url = reverse('project-list')
+        self.assertEqual(len(self.client.get(url).data['results']), 0)
+
+        self.project.owner = self.outsider
+        self.project.save()
+        self.assertEqual(len(self.client.get(url).data['results']), 1)
+
+    @override_settings(PROJECT_ROLES_CACHE_TIMEOUT=60)
+    def test_removed_member_loses_access_on_other_workers(self):
+        self.client.force_authenticate(self.member)
+        url = reverse('project-detail', kwargs={'pk': self.project.pk})
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+        ProjectMember.objects.filter(project=self.project, user=self.member).delete()
+        with self.as_other_worker('backend.projects.membership'):
+            self.assertEqual(self.client.get(url).status_code, 404)
+
+    @override_settings(
+        PROJECT_ROLES_CACHE_TIMEOUT=60,
+        CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    )
+    def test_process_local_cache_is_not_used(self):
+        self.client.force_authenticate(self.member)
+        url = reverse('project-detail', kwargs={'pk': self.project.pk})
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+        # Remoção feita noutro worker: a versão local deste nunca mudaria
+        with mock.patch('backend.projects.signals.invalidate_project_roles'):
+            ProjectMember.objects.filter(project=self.project, user=self.member).delete()
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+
+class KeysetPaginationTests(ProjectsAPITestCase):
+    """Paginação por cursor das viewsets de projetos, tarefas e tags."""
+
+    def collect_pages(self, url, page_size):
+        ids, pages = [], 0
+        while url:
+            with self.assertQueryBudget(5, label=url):
+                response = self.client.get(url, {'page_size': page_size} if not pages else None)
+            self.assertEqual(response.status_code, 200)
+            ids.extend(item['id'] for item in response.data['results'])
+            url = response.data['next']
+            pages += 1
+        return ids, pages
+
+    def test_task_pages_follow_priority_then_created_at(self):
+        project = self.create_project()
+        for priority in Task.Priority.values * 3:
+            self.create_task(project, priority=priority)
+
+        ids, pages = self.collect_pages(reverse('task-list'), page_size=5)
+        expected = list(Task.objects.order_by('-priority_rank', '-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual(ids, expected)
+        self.assertEqual(pages, 3)
+
+    def test_previous_link_returns_previous_page(self):
+        for index in range(5):
+            Tag.objects.create(name=f'tag-{index}')
+        first = self.client.get(reverse('tag-list'), {'page_size': 2}).data
+        self.assertIsNone(first['previous'])
+        second = self.client.get(first['next']).data
+        back = self.client.get(second['previous']).data
+        self.assertEqual(back['results'], first['results'])
+
+    def test_project_pagination_does_not_count(self):
+        for _ in range(4):
+            self.create_project()
+        with self.assertQueryBudget(10) as queries:
+            ids, _ = self.collect_pages(reverse('project-list'), page_size=3)
+        self.assertEqual(len(ids), 4)
+        self.assertFalse(any('COUNT(*)' in q['sql'] or 'OFFSET' in q['sql'] for q in queries.captured_queries))
+
+    def test_invalid_cursor_is_404(self):
+        response = self.client.get(reverse('tag-list'), {'cursor': 'lixo'})
+        self.assertEqual(response.status_code, 404)
+
+
+class TaskPriorityRankTests(ProjectsAPITestCase):
+
+    def test_tasks_are_ordered_by_importance(self):
+        project = self.create_project()
+        for priority in (Task.Priority.LOW, Task.Priority.URGENT, Task.Priority.MEDIUM, Task.Priority.HIGH):
+            self.create_task(project, priority=priority)
+        self.assertEqual(
+            list(Task.objects.values_list('priority', flat=True)),
+            ['URGENT', 'HIGH', 'MEDIUM', 'LOW']
+        )
+
+
+@skipUnless(connection.vendor == 'postgresql', "Os planos de execução só são verificados em PostgreSQL.")
+class QueryPlanTests(ProjectsAPITestCase):
+    """
+    Captura o EXPLAIN das principais queries dos endpoints e falha se
+    alguma recorrer a um Seq Scan numa tabela que devia ser servida por
+    índice. Com `enable_seqscan = off`, o planeador só escolhe um Seq Scan
+    quando não existe nenhum índice utilizável.
+    """
+
+    INDEXED_TABLES = {'projects_task', 'projects_project', 'projects_projectmember'}
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.projects = []
+        for index in range(10):
+            project = Project.objects.create(owner=cls.owner, name=f'Projeto {index}')
+            ProjectMember.objects.create(project=project, user=cls.member)
+            cls.projects.append(project)
+            parent = None
+            for position in range(30):
+                parent = Task.objects.create(
+                    project=project,
+                    title=f'Tarefa {position}',
+                    description='',
+                    priority=Task.Priority.values[position % 4],
+                    status=Task.Status.values[position % 5],
+                    assignee=cls.member if position % 2 else None,
+                    parent_task=parent if position % 3 else None,
+                    due_date=datetime.date(2030, 1, 1) + datetime.timedelta(days=position) if position % 4 else None,
+                )
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def setUp(self):
+        super().setUp()
+        with connection.cursor() as cursor:
+            cursor.execute('SET enable_seqscan = off')
+        self.addCleanup(self._reset_seqscan)
+
+    def _reset_seqscan(self):
+        with connection.cursor() as cursor:
+            cursor.execute('RESET enable_seqscan')
+
+    def plan_nodes(self, queryset):
+        def walk(node):
+            yield node
+            for child in node.get('Plans', []):
+                yield from walk(child)
+        plan = json.loads(queryset.explain(format='json'))
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return list(walk(plan[0]['Plan']))
+
+    def assertUsesIndexes(self, queryset):
+        nodes = self.plan_nodes(queryset)
+        seq_scans = [
+            node['Relation Name'] for node in nodes
+            if node['Node Type'] == 'Seq Scan' and node.get('Relation Name') in self.INDEXED_TABLES
+        ]
+        self.assertEqual(seq_scans, [], f'Seq Scan em {seq_scans}:\n{json.dumps(nodes, indent=2)}')
+
+    def assertUsesIndex(self, queryset, *names, condition_on=None):
+        """O plano lê um dos índices indicados, com `condition_on` no Index Cond."""
+        nodes = self.plan_nodes(queryset)
+        scans = [node for node in nodes if node.get('Index Name') in names]
+        self.assertTrue(scans, f'Nenhum de {names} no plano:\n{json.dumps(nodes, indent=2)}')
+        if condition_on is not None:
+            self.assertTrue(
+                any(condition_on in scan.get('Index Cond', '') for scan in scans),
+                f'Sem Index Cond em {condition_on}:\n{json.dumps(scans, indent=2)}',
+            )
+
+    def cursor_page(self, queryset, page_size=3):
+        """Queryset da segunda página da KeysetPagination (com cursor)."""
+        paginator = KeysetPagination()
+        paginator.paginate_queryset(queryset, Request(RequestFactory().get('/', {'page_size': page_size})))
+        request = Request(RequestFactory().get(paginator.get_next_link()))
+        return KeysetPagination().page_queryset(queryset, request)
+
+    def test_nested_task_list(self):
+        project = self.projects[0]
+        roots = Task.objects.filter(project=project, parent_task__isnull=True)
+        self.assertUsesIndexes(roots[:51])
+        self.assertUsesIndex(roots[:51], 'task_project_roots_idx')
+        self.assertUsesIndex(self.cursor_page(roots), 'task_project_roots_idx', condition_on='priority_rank')
+
+    def test_task_list_page(self):
+        project_ids = [project.pk for project in self.projects]
+        tasks = Task.objects.filter(project_id__in=project_ids)
+        self.assertUsesIndexes(tasks[:51])
+        # Ordenação por priority_rank servida por um dos índices compostos
+        self.assertUsesIndex(tasks[:51], 'task_keyset_idx', 'task_project_keyset_idx')
+        self.assertUsesIndex(
+            self.cursor_page(Task.objects.filter(project=self.projects[0])),
+            'task_project_keyset_idx', 'task_project_roots_idx', condition_on='priority_rank',
+        )
+
+    def test_subtree_by_path(self):
+        root = Task.objects.filter(parent_task__isnull=True).first()
+        self.assertUsesIndexes(Task.objects.descendants_of(root))
+        self.assertUsesIndex(Task.objects.descendants_of(root), 'task_path_idx', condition_on='path')
+
+    def test_task_filters(self):
+        project = self.projects[0]
+        by_status = Task.objects.filter(project=project, status=Task.Status.DONE)
+        self.assertUsesIndexes(by_status)
+        self.assertUsesIndex(by_status, 'task_project_status_idx', condition_on='status')
+        by_assignee = Task.objects.filter(assignee=self.member, status=Task.Status.TODO)
+        self.assertUsesIndexes(by_assignee)
+        self.assertUsesIndex(by_assignee, 'task_assignee_status_idx', condition_on='status')
+        open_due = Task.objects.filter(project=project, due_date__isnull=False).exclude(status=Task.Status.DONE)
+        self.assertUsesIndexes(open_due)
+        self.assertUsesIndex(open_due, 'task_open_due_date_idx')
+
+    def test_cursor_page_starts_in_the_index(self):
+        # A página com cursor começa no índice, na coluna da frente
+        self.assertUsesIndex(self.cursor_page(Task.objects.all()), 'task_keyset_idx', condition_on='priority_rank')
+        self.assertUsesIndex(
+            self.cursor_page(Project.objects.all()), 'project_created_keyset_idx', condition_on='created_at'
+        )
+
+    def test_project_list_and_roles(self):
+        self.assertUsesIndexes(Project.objects.filter(pk__in=[p.pk for p in self.projects])[:51])
+        self.assertUsesIndexes(ProjectMember.objects.filter(user=self.member))
+        self.assertUsesIndexes(Project.objects.filter(owner=self.owner))
+        self.assertTrue(load_project_roles(self.member))
+
+
+class TaskBulkOperationTests(ProjectsAPITestCase):
+    """Endpoint em massa /api/tasks/bulk/."""
+
+    def setUp(self):
+        super().setUp()
+        self.project = self.create_project(members=[self.member])
+        self.url = reverse('task-bulk')
+
+    def test_creates_updates_and_transitions_in_one_request(self):
+        parent = self.create_task(self.project)
+        done = self.create_task(self.project)
+        operations = [
+            {'op': 'create', 'data': {'project': self.project.pk, 'title': f'Nova {i}', 'description': '-'}}
+            for i in range(50)
+        ]
+        operations += [
+            {'op': 'create', 'data': {
+                'project': self.project.pk, 'parent_task': parent.pk, 'title': 'Filha',
+                'description': '-', 'priority': 'URGENT', 'assignee': self.member.pk,
+            }},
+            {'op': 'update', 'id': parent.pk, 'data': {'title': 'Renomeada', 'priority': 'LOW'}},
+            {'op': 'transition', 'id': done.pk, 'status': 'DONE'},
+        ]
+
+        with self.assertQueryBudget(10, label='task-bulk'):
+            response = self.client.post(self.url, operations, format='json')
+
+        self.assertEqual(response.status_code, 200, response.data)
+        results = response.data['results']
+        self.assertEqual(len(results), 53)
+        child = Task.objects.get(pk=results[50]['id'])
+        self.assertEqual((child.path, child.assignee_id), (f'{parent.pk}/', self.member.pk))
+        parent.refresh_from_db()
+        self.assertEqual((parent.title, parent.priority), ('Renomeada', 'LOW'))
+
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.tasks_total, 53)
+        self.assertEqual(self.project.tasks_done, 1)
+        self.assertEqual(self.project.tasks_urgent_priority, 1)
+        self.assertEqual(self.project.tasks_low_priority, 1)
+
+    def test_invalid_operation_rejects_whole_batch(self):
+        foreign = self.create_task(self.create_project(owner=self.outsider))
+        operations = [
+            {'op': 'create', 'data': {'project': self.project.pk, 'title': 'Ok', 'description': '-'}},
+            {'op': 'transition', 'id': foreign.pk, 'status': 'DONE'},
+            {'op': 'update', 'id': foreign.pk},
+            {'op': 'create', 'data': {'project': self.project.pk, 'priority': 'ENORME'}},
+        ]
+        response = self.client.post(self.url, operations, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([result['index'] for result in response.data['results']], [1, 2, 3])
+        self.assertEqual(Task.objects.filter(project=self.project).count(), 0)
+
+    def test_requires_a_list(self):
+        response = self.client.post(self.url, {'op': 'create'}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+@skipUnless(connection.vendor == 'postgresql', "Só o PostgreSQL tem transações concorrentes nos testes.")
+class TaskBulkConcurrencyTests(TransactionTestCase):
+    """Uma operação em massa sobre uma tarefa alterada noutra transação ainda aberta."""
+
+    def test_counters_start_from_the_committed_state(self):
+        owner = Account.objects.create_user(email='owner@example.com', password='x')
+        project = Project.objects.create(owner=owner, name='Projeto')
+        task = Task.objects.create(project=project, title='Tarefa', description='')
+        changed = threading.Event()
+
+        def concurrent_edit():
+            try:
+                with transaction.atomic():
+                    edited = Task.objects.select_for_update().get(pk=task.pk)
+                    edited.status = Task.Status.DONE
+                    edited.save()
+                    changed.set()
+                    time.sleep(0.5)
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=concurrent_edit)
+        thread.start()
+        self.assertTrue(changed.wait(timeout=5))
+        client = APIClient()
+        client.force_authenticate(owner)
+        response = client.post(
+            reverse('task-bulk'), [{'op': 'transition', 'id': task.pk, 'status': 'IN_PROGRESS'}], format='json'
+        )
+        thread.join()
+
+        self.assertEqual(response.status_code, 200, response.data)
+        project.refresh_from_db()
+        self.assertEqual(
+            (project.tasks_total, project.tasks_todo, project.tasks_done, project.tasks_in_progress), (1, 0, 0, 1)
+        )
+
+
+class TaskBulkTagTests(ProjectsAPITestCase):
+    """Endpoint /api/tasks/bulk-tags/."""
+
+    def setUp(self):
+        super().setUp()
+        self.project = self.create_project()
+        self.tasks = [self.create_task(self.project) for _ in range(20)]
+        self.backend, self.frontend, self.bug = (
+            Tag.objects.create(name=name) for name in ('backend', 'frontend', 'bug')
+        )
+        self.url = reverse('task-bulk-tags')
+
+    def test_adds_and_removes_in_constant_queries(self):
+        self.tasks[0].tags.add(self.backend, self.bug)
+        payload = {
+            'task_ids': [task.pk for task in self.tasks],
+            'add': [self.backend.pk, self.frontend.pk],
+            'remove': [self.bug.pk],
+        }
+        # Inclui as duas queries do registo de alterações (ver changes.py)
+        with self.assertQueryBudget(12, label='task-bulk-tags'):
+            response = self.client.post(self.url, payload, format='json')
+
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data, {'tasks': 20, 'added': 39, 'removed': 1})
+        self.assertEqual(Task.tags.through.objects.filter(tag=self.frontend).count(), 20)
+        self.assertFalse(Task.tags.through.objects.filter(tag=self.bug).exists())
+
+    def test_rejects_unknown_tags_and_foreign_tasks(self):
+        foreign = self.create_task(self.create_project(owner=self.outsider))
+        response = self.client.post(self.url, {'task_ids': [self.tasks[0].pk], 'add': [999]}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.post(
+            self.url, {'task_ids': [self.tasks[0].pk, foreign.pk], 'add': [self.bug.pk]}, format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Task.tags.through.objects.exists())
+
+
+class TaskActivityTests(ProjectsAPITestCase):
+    """Relações genéricas de comentários/anexos e respetivas contagens."""
+
+    def setUp(self):
+        super().setUp()
+        self.project = self.create_project(members=[self.member])
+
+    def add_activity(self, obj, comments=0, attachments=0):
+        for index in range(comments):
+            Comment.objects.create(author=self.member, text=f'Comentário {index}', content_object=obj)
+        for index in range(attachments):
+            Attachment.objects.create(uploaded_by=self.owner, file=f'attachments/{index}.txt', content_object=obj)
+
+    def test_list_annotates_counts(self):
+        task = self.create_task(self.project)
+        child = self.create_task(self.project, parent_task=task)
+        self.add_activity(task, comments=3, attachments=2)
+        self.add_activity(child, comments=1)
+        self.add_activity(self.project, attachments=1)
+
+        url = reverse('project-tasks-list', kwargs={'project_pk': self.project.pk})
+        data = self.client.get(url).data['results'][0]
+        self.assertEqual((data['comment_count'], data['attachment_count']), (3, 2))
+        self.assertEqual(data['subtasks'][0]['comment_count'], 1)
+
+        project = self.client.get(reverse('project-list')).data['results'][0]
+        self.assertEqual((project['comment_count'], project['attachment_count']), (0, 1))
+
+    def test_detail_loads_activity_in_constant_queries(self):
+        task = self.create_task(self.project)
+        url = reverse('task-detail', kwargs={'pk': task.pk})
+        self.add_activity(task, comments=1, attachments=1)
+        with self.assertQueryBudget(6, label='task-detail'):
+            self.client.get(url)
+
+        self.add_activity(task, comments=10, attachments=10)
+        with self.assertQueryBudget(6, label='task-detail'):
+            response = self.client.get(url)
+        self.assertEqual(len(response.data['comments']), 11)
+        self.assertEqual(response.data['comments'][0]['author']['first_name'], 'Bruno')
+        self.assertEqual(len(response.data['attachments']), 11)
+
+    def test_deleting_task_removes_its_comments(self):
+        task = self.create_task(self.project)
+        self.add_activity(task, comments=2)
+        task.delete()
+        self.assertFalse(Comment.objects.exists())
+
+
+class ChunkedUploadTests(ProjectsAPITestCase):
+    """Uploads em partes e armazenamento deduplicado por SHA-256."""
+
+    def setUp(self):
+        super().setUp()
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        settings_override = override_settings(
+            MEDIA_ROOT=media, CHUNKED_UPLOAD_TEMP_DIR=os.path.join(media, 'tmp')
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.task = self.create_task(self.create_project())
+
+    def start(self, content, filename='build.log'):
+        response = self.client.post(
+            reverse('upload-list'),
+            {'task': self.task.pk, 'filename': filename, 'size': len(content)},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 201, response.data)
+        return reverse('upload-detail', kwargs={'pk': response.data['id']})
+
+    def send(self, url, chunk, offset):
+        return self.client.patch(
+            url, chunk, content_type='application/offset+octet-stream', HTTP_UPLOAD_OFFSET=str(offset)
+        )
+
+    def upload(self, content, chunk_size=4):
+        url = self.start(content)
+        for offset in range(0, len(content), chunk_size):
+            response = self.send(url, content[offset:offset + chunk_size], offset)
+        return response
+
+    def test_chunks_are_resumable(self):
+        content = b'linha 1\nlinha 2\nlinha 3\n'
+        url = self.start(content)
+
+        self.assertEqual(self.send(url, content[:10], 0).data['offset'], 10)
+        # Uma parte repetida ou fora de ordem devolve o offset correto
+        conflict = self.send(url, content[:10], 0)
+        self.assertEqual((conflict.status_code, conflict.data['offset']), (409, 10))
+        self.assertEqual(self.client.get(url).data['offset'], 10)
+
+        response = self.send(url, content[10:], 10)
+        self.assertEqual(response.status_code, 201)
+        attachment = Attachment.objects.get(pk=response.data['id'])
+        self.assertEqual(attachment.blob.sha256, hashlib.sha256(content).hexdigest())
+        self.assertEqual(attachment.original_name, 'build.log')
+        with attachment.file.open('rb') as stored:
+            self.assertEqual(stored.read(), content)
+        self.assertFalse(UploadSession.objects.exists())
+
+    def test_chunk_larger_than_declared_size(self):
+        url = self.start(b'1234')
+        self.assertEqual(self.send(url, b'123456', 0).status_code, 413)
+        self.assertEqual(self.client.get(url).data['offset'], 0)
+
+    def test_concurrent_chunk_is_rejected_while_writing(self):
+        content = b'0123456789'
+        url = self.start(content)
+        session = UploadSession.objects.get()
+        test = self
+
+        class SlowStream(BytesIO):
+            def read(self, size=-1):
+                if not self.tell():
+                    # A meio da escrita, outra parte no mesmo offset é recusada
+                    test.assertEqual(test.client.get(url).data['offset'], 0)
+                    test.assertEqual(test.send(url, content, 0).status_code, 409)
+                return super().read(size)
+
+        session, attachment = append_chunk(session.pk, 0, SlowStream(content))
+        self.assertEqual(attachment.blob.sha256, hashlib.sha256(content).hexdigest())
+
+    def test_completes_across_filesystems(self):
+        def cross_device_rename(source, target):
+            raise OSError(errno.EXDEV, os.strerror(errno.EXDEV))
+
+        content = b'0123456789'
+        with mock.patch('os.rename', cross_device_rename), mock.patch('os.replace', cross_device_rename):
+            response = self.upload(content)
+        self.assertEqual(response.status_code, 201)
+        with Attachment.objects.get(pk=response.data['id']).file.open('rb') as stored:
+            self.assertEqual(stored.read(), content)
+        self.assertEqual(os.listdir(settings.CHUNKED_UPLOAD_TEMP_DIR), [])
+
+    def test_expired_sessions_are_pruned(self):
+        url = self.start(b'0123456789')
+        self.send(url, b'01234', 0)
+        stale = timezone.now() - datetime.timedelta(hours=settings.CHUNKED_UPLOAD_EXPIRY_HOURS + 1)
+        UploadSession.objects.update(updated_at=stale)
+        self.assertEqual(self.send(url, b'56789', 5).status_code, 404)
+
+        orphan = os.path.join(settings.CHUNKED_UPLOAD_TEMP_DIR, f'{uuid.uuid4()}.part')
+        open(orphan, 'wb').close()
+        os.utime(orphan, (stale.timestamp(), stale.timestamp()))
+        self.start(b'abc')
+        fresh = UploadSession.objects.get(updated_at__gt=stale)
+
+        output = StringIO()
+        call_command('prune_upload_sessions', stdout=output)
+        self.assertIn('1 upload(s) expirado(s) e 1 ficheiro(s)', output.getvalue())
+        self.assertEqual(list(UploadSession.objects.all()), [fresh])
+        self.assertEqual(os.listdir(settings.CHUNKED_UPLOAD_TEMP_DIR), [f'{fresh.pk}.part'])
+
+    def test_abandoned_claim_is_taken_over(self):
+        content = b'0123456789'
+        url = self.start(content)
+        UploadSession.objects.update(
+            claim=uuid.uuid4(), updated_at=timezone.now() - datetime.timedelta(hours=1)
+        )
+        self.assertEqual(self.send(url, content, 0).status_code, 201)
+
+    def test_identical_uploads_share_one_blob(self):
+        content = b'mesmo artefacto' * 10
+        first = self.upload(content)
+        second = self.upload(content)
+        legacy = self.client.post(
+            reverse('task-add-attachment', kwargs={'pk': self.task.pk}),
+            {'file': SimpleUploadedFile('artefacto.bin', content)},
+            format='multipart'
+        )
+        self.assertEqual(legacy.status_code, 201)
+
+        self.assertEqual(Blob.objects.count(), 1)
+        blob = Blob.objects.get()
+        self.assertEqual(blob.ref_count, 3)
+        self.assertEqual(len({first.data['file'], second.data['file'], legacy.data['file']}), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Attachment.objects.filter(pk__in=[first.data['id'], second.data['id']]).delete()
+        blob.refresh_from_db()
+        self.assertEqual(blob.ref_count, 1)
+
+        path = blob.file.path
+        with self.captureOnCommitCallbacks(execute=True):
+            self.task.delete()
+        self.assertFalse(Blob.objects.exists())
+        self.assertFalse(os.path.exists(path))
+
+    def test_failed_attachment_leaves_no_blob(self):
+        with mock.patch.object(Attachment.objects, 'create', side_effect=RuntimeError('falha')):
+            with self.assertRaises(RuntimeError):
+                self.client.post(
+                    reverse('task-add-attachment', kwargs={'pk': self.task.pk}),
+                    {'file': SimpleUploadedFile('artefacto.bin', b'conteudo')},
+                    format='multipart'
+                )
+        self.assertFalse(Blob.objects.exists())
+
+    def test_cannot_upload_to_foreign_task(self):
+        foreign = self.create_task(self.create_project(owner=self.outsider))
+        response = self.client.post(
+            reverse('upload-list'), {'task': foreign.pk, 'filename': 'x', 'size': 1}, format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class AttachmentDownloadTests(ProjectsAPITestCase):
+    """Download autenticado de anexos, com Range, ETag e sendfile."""
+    content = b'0123456789abcdefghij'
+
+    def setUp(self):
+        super().setUp()
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        task = self.create_task(self.create_project(members=[self.member]))
+        response = self.client.post(
+            reverse('task-add-attachment', kwargs={'pk': task.pk}),
+            {'file': SimpleUploadedFile('notas.txt', self.content)},
+            format='multipart'
+        )
+        self.url = response.data['download_url']
+        self.etag = f'"{hashlib.sha256(self.content).hexdigest()}"'
+
+    def test_full_download(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.content)
+        self.assertEqual(response['ETag'], self.etag)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertIn('notas.txt', response['Content-Disposition'])
+        self.assertEqual(response['Content-Type'], 'text/plain')
+
+    def test_if_none_match(self):
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=self.etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_range_requests(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=5-9')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), b'56789')
+        self.assertEqual(response['Content-Range'], f'bytes 5-9/{len(self.content)}')
+
+        suffix = self.client.get(self.url, HTTP_RANGE='bytes=-3')
+        self.assertEqual(b''.join(suffix.streaming_content), b'hij')
+
+        # If-Range com uma versão antiga devolve o ficheiro completo
+        stale = self.client.get(self.url, HTTP_RANGE='bytes=5-9', HTTP_IF_RANGE='"antigo"')
+        self.assertEqual(stale.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/plain')
+
+        # If-Range com uma data: só a do Last-Modified mantém o intervalo
+        last_modified = response['Last-Modified']
+        current = self.client.get(self.url, HTTP_RANGE='bytes=5-9', HTTP_IF_RANGE=last_modified)
+        self.assertEqual(current.status_code, 206)
+        older = http_date(parse_http_date(last_modified) - 60)
+        self.assertEqual(self.client.get(self.url, HTTP_RANGE='bytes=5-9', HTTP_IF_RANGE=older).status_code, 200)
+
+        unsatisfiable = self.client.get(self.url, HTTP_RANGE='bytes=100-')
+        self.assertEqual(unsatisfiable.status_code, 416)
+        self.assertEqual(unsatisfiable['Content-Range'], f'bytes */{len(self.content)}')
+
+    @override_settings(ATTACHMENT_SENDFILE_BACKEND='nginx', ATTACHMENT_SENDFILE_PREFIX='/protected-media/')
+    def test_nginx_offload(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b'')
+        blob = Blob.objects.get()
+        self.assertEqual(response['X-Accel-Redirect'], f'/protected-media/{blob.file.name}')
+        self.assertEqual(response['Content-Type'], 'text/plain')
+
+    @override_settings(ATTACHMENT_SENDFILE_BACKEND='sendfile')
+    def test_sendfile_offload(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Sendfile'], Blob.objects.get().file.path)
+        self.assertEqual(response['Content-Type'], 'text/plain')
+
+    def test_requires_membership(self):
+        self.client.force_authenticate(self.outsider)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        self.client.force_authenticate(self.member)
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+
+
+@override_settings(THUMBNAIL_WORKERS=0)
+class ThumbnailTests(ProjectsAPITestCase):
+    """Miniaturas das fotos de perfil e pré-visualização de anexos de imagem."""
+
+    def setUp(self):
+        super().setUp()
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def image(self, name='foto.png', size=(800, 600)):
+        output = BytesIO()
+        Image.new('RGB', size, 'teal').save(output, 'PNG')
+        return SimpleUploadedFile(name, output.getvalue(), content_type='image/png')
+
+    def test_avatars_use_small_thumbnail(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.owner.profile_picture = self.image()
+            self.owner.save()
+        self.create_project()
+
+        response = self.client.get(reverse('project-list'))
+        url = response.data['results'][0]['members'][0]['profile_picture']
+        expected = thumbnail_name(self.owner.profile_picture.name, 'sm')
+        self.assertTrue(url.endswith(expected), url)
+        with Image.open(os.path.join(settings.MEDIA_ROOT, expected)) as thumbnail:
+            self.assertEqual(thumbnail.size, (64, 48))
+
+    def test_all_sizes_generated_after_upload(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.owner.profile_picture = self.image()
+            self.owner.save()
+        for size in settings.THUMBNAIL_SIZES:
+            name = thumbnail_name(self.owner.profile_picture.name, size)
+            self.assertTrue(default_storage.exists(name), name)
+        self.owner.refresh_from_db()
+        self.assertEqual(self.owner.thumbnail_source, self.owner.profile_picture.name)
+
+    def test_attachment_preview(self):
+        task = self.create_task(self.create_project())
+        url = reverse('task-add-attachment', kwargs={'pk': task.pk})
+        with self.captureOnCommitCallbacks(execute=True):
+            image = self.client.post(url, {'file': self.image('ecra.png')}, format='multipart')
+            text = self.client.post(url, {'file': SimpleUploadedFile('notas.txt', b'x')}, format='multipart')
+
+        # A resposta do upload sai antes da geração: mostra o original
+        attachment = Attachment.objects.get(pk=image.data['id'])
+        self.assertTrue(image.data['preview'].endswith(attachment.file.name))
+        self.assertIsNone(text.data['preview'])
+
+        detail = self.client.get(reverse('task-detail', kwargs={'pk': task.pk}))
+        previews = {item['id']: item['preview'] for item in detail.data['attachments']}
+        self.assertTrue(previews[attachment.pk].endswith(thumbnail_name(attachment.file.name, 'md')))
+        self.assertTrue(Blob.objects.get(pk=attachment.blob_id).thumbnails_ready)
+
+    def test_serialization_never_checks_storage(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.owner.profile_picture = self.image()
+            self.owner.save()
+        project = self.create_project()
+        task = self.create_task(project, assignee=self.owner)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                reverse('task-add-attachment', kwargs={'pk': task.pk}),
+                {'file': self.image('ecra.png')}, format='multipart',
+            )
+
+        # Com as miniaturas prontas, também não há nada a agendar
+        with mock.patch.object(default_storage, 'exists', side_effect=AssertionError("storage.exists")), \
+                mock.patch('backend.projects.thumbnails.schedule_thumbnails', side_effect=AssertionError("agendado")), \
+                self.captureOnCommitCallbacks(execute=True):
+            for url in (
+                reverse('project-list'),
+                reverse('project-detail', kwargs={'pk': project.pk}),
+                reverse('project-tasks-list', kwargs={'project_pk': project.pk}),
+                reverse('task-detail', kwargs={'pk': task.pk}),
+            ):
+                self.assertEqual(self.client.get(url).status_code, 200, url)
+
+    def test_missing_thumbnails_are_scheduled_on_read(self):
+        # Gravadas sem correr o on_commit, como imagens antigas ou gerações perdidas
+        self.owner.profile_picture = self.image()
+        self.owner.save()
+        task = self.create_task(self.create_project(), assignee=self.owner)
+        with self.captureOnCommitCallbacks(execute=False):
+            self.client.post(
+                reverse('task-add-attachment', kwargs={'pk': task.pk}),
+                {'file': self.image('ecra.png')}, format='multipart',
+            )
+        url = reverse('task-detail', kwargs={'pk': task.pk})
+        attachment = Attachment.objects.get()
+
+        with mock.patch.object(default_storage, 'exists', side_effect=AssertionError("storage.exists")), \
+                mock.patch('backend.projects.thumbnails.schedule_thumbnails') as schedule, \
+                self.captureOnCommitCallbacks(execute=True):
+            response = self.client.get(url)
+        self.assertTrue(response.data['attachments'][0]['preview'].endswith(attachment.file.name))
+        self.assertEqual(
+            {call.args[0] for call in schedule.call_args_list},
+            {attachment.file.name, self.owner.profile_picture.name},
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.get(url)
+        response = self.client.get(url)
+        self.assertTrue(response.data['attachments'][0]['preview'].endswith(thumbnail_name(attachment.file.name, 'md')))
+        self.assertTrue(response.data['assignee']['profile_picture'].endswith(
+            thumbnail_name(self.owner.profile_picture.name, 'sm')
+        ))
+
+    @override_settings(AUTH_USER_CACHE_TIMEOUT=60)
+    def test_ready_thumbnails_refresh_the_user_cache(self):
+        self.owner.profile_picture = self.image()
+        self.owner.save()
+        self.assertEqual(get_cached_account(self.owner.pk).thumbnail_source, '')
+
+        generate_thumbnails(self.owner.profile_picture.name)
+        self.assertEqual(get_cached_account(self.owner.pk).thumbnail_source, self.owner.profile_picture.name)
+
+    def test_etag_changes_when_thumbnails_are_ready(self):
+        # Gravada sem correr o on_commit: as miniaturas ainda não existem
+        self.owner.profile_picture = self.image()
+        self.owner.save()
+        task = self.create_task(self.create_project(), assignee=self.owner)
+        url = reverse('task-detail', kwargs={'pk': task.pk})
+        with self.captureOnCommitCallbacks(execute=False):
+            self.client.post(
+                reverse('task-add-attachment', kwargs={'pk': task.pk}),
+                {'file': self.image('ecra.png')}, format='multipart',
+            )
+        first = self.client.get(url)
+        attachment = Attachment.objects.get()
+        self.assertTrue(first.data['attachments'][0]['preview'].endswith(attachment.file.name))
+
+        generate_thumbnails(attachment.file.name)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['attachments'][0]['preview'].endswith(thumbnail_name(attachment.file.name, 'md')))
+
+        second = response['ETag']
+        generate_thumbnails(self.owner.profile_picture.name)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=second)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['attachments'][0]['uploaded_by']['profile_picture'].endswith(
+            thumbnail_name(self.owner.profile_picture.name, 'sm')
+        ))
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+    def test_generate_thumbnails_command(self):
+        self.owner.profile_picture = self.image()
+        self.owner.save()
+        task = self.create_task(self.create_project())
+        with self.captureOnCommitCallbacks(execute=False):
+            self.client.post(
+                reverse('task-add-attachment', kwargs={'pk': task.pk}),
+                {'file': self.image('ecra.png')}, format='multipart',
+            )
+
+        output = StringIO()
+        call_command('generate_thumbnails', stdout=output)
+        self.assertIn('2 imagem(ns)', output.getvalue())
+        self.owner.refresh_from_db()
+        self.assertEqual(self.owner.thumbnail_source, self.owner.profile_picture.name)
+        self.assertTrue(Blob.objects.get().thumbnails_ready)
+
+        call_command('generate_thumbnails', stdout=output)
+        self.assertIn('0 imagem(ns)', output.getvalue())
+
+
+class TagCatalogueCacheTests(ProjectsAPITestCase):
+    """Cache versionada e ETag do catálogo de tags."""
+
+    def setUp(self):
+        super().setUp()
+        Tag.objects.create(name='backend')
+        # Autenticação real por JWT (a conta vem da cache da autenticação)
+        self.client.force_authenticate(None)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.owner)}')
+
+    def test_repeat_requests_skip_the_database(self):
+        url = reverse('tag-list')
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, 200)
+        etag = first['ETag']
+
+        with self.assertNumQueries(0):
+            cached = self.client.get(url)
+            not_modified = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(cached.data, first.data)
+        self.assertEqual(not_modified.status_code, 304)
+
+        detail = reverse('tag-detail', kwargs={'pk': Tag.objects.get().pk})
+        self.assertEqual(self.client.get(detail).data['name'], 'backend')
+        with self.assertNumQueries(0):
+            self.client.get(detail)
+
+    def test_tag_changes_bump_the_version(self):
+        url = reverse('tag-list')
+        etag = self.client.get(url)['ETag']
+
+        Tag.objects.create(name='frontend')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual([tag['name'] for tag in response.data['results']], ['backend', 'frontend'])
+
+        Tag.objects.filter(name='frontend').get().delete()
+        self.assertEqual(len(self.client.get(url).data['results']), 1)
+
+    def test_invalidation_reaches_other_workers(self):
+        url = reverse('tag-list')
+        etag = self.client.get(url)['ETag']
+        Tag.objects.create(name='frontend')
+
+        with self.as_other_worker('backend.projects.catalogue'):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.data['results']), 2)
+            etag = response['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_process_local_cache_is_not_used(self):
+        url = reverse('tag-list')
+        with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}):
+            etag = self.client.get(url)['ETag']
+            # Escrita feita noutro worker: a versão local deste nunca mudaria
+            with mock.patch('backend.projects.signals.invalidate_tag_catalogue'):
+                Tag.objects.filter(name='backend').get().save()
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+    def test_requires_token(self):
+        self.client.credentials()
+        self.assertEqual(self.client.get(reverse('tag-list')).status_code, 401)
+
+    def test_rejects_deactivated_accounts(self):
+        self.assertEqual(self.client.get(reverse('tag-list')).status_code, 200)
+        self.owner.is_active = False
+        self.owner.save()
+        # O token continua válido, mas a conta já não
+        self.assertEqual(self.client.get(reverse('tag-list')).status_code, 401)
+        self.assertEqual(async_to_sync(self.async_client.get)(
+            reverse('tag-list'), headers={'Authorization': f'Bearer {AccessToken.for_user(self.owner)}'}
+        ).status_code, 401)
+
+
+class ConditionalGetTests(ProjectsAPITestCase):
+    """ETag/Last-Modified nos endpoints de projetos e tarefas."""
+
+    def setUp(self):
+        super().setUp()
+        self.project = self.create_project()
+        self.task = self.create_task(self.project)
+
+    def assertNotModified(self, url, etag):
+        # Papéis + validadores, sem serializar nada
+        with self.assertNumQueries(2):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def assertModified(self, url, etag):
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        return response['ETag']
+
+    def test_project_detail(self):
+        url = reverse('project-detail', kwargs={'pk': self.project.pk})
+        etag = self.client.get(url)['ETag']
+        self.assertNotModified(url, etag)
+
+        ProjectMember.objects.create(project=self.project, user=self.member)
+        etag = self.assertModified(url, etag)
+
+        self.task.status = Task.Status.DONE
+        self.task.save()
+        etag = self.assertModified(url, etag)
+
+        self.task.delete()
+        self.assertModified(url, etag)
+
+    def test_project_list(self):
+        url = reverse('project-list')
+        etag = self.client.get(url)['ETag']
+        self.assertNotModified(url, etag)
+
+        self.member.first_name = 'Beatriz'
+        self.member.save()
+        self.assertNotModified(url, etag)
+        ProjectMember.objects.create(project=self.project, user=self.member)
+        etag = self.assertModified(url, etag)
+
+        self.create_task(self.project)
+        self.assertModified(url, etag)
+
+    def test_task_list_tracks_activity_and_tags(self):
+        url = reverse('project-tasks-list', kwargs={'project_pk': self.project.pk})
+        etag = self.client.get(url)['ETag']
+        self.assertNotModified(url, etag)
+
+        Comment.objects.create(author=self.owner, text='Feito?', content_object=self.task)
+        etag = self.assertModified(url, etag)
+
+        tag = Tag.objects.create(name='api')
+        self.client.post(
+            reverse('task-manage-tags', kwargs={'pk': self.task.pk}),
+            {'action': 'add', 'tag_id': tag.pk}, format='json'
+        )
+        etag = self.assertModified(url, etag)
+
+        tag.name = 'API'
+        tag.save()
+        self.assertModified(url, etag)
+
+    def assertIgnoresIfModifiedSince(self, url):
+        # Os validadores incluem contagens e versões: sem Last-Modified, um
+        # If-Modified-Since posterior a tudo não pode dar 304
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=http_date(time.time() + 3600))
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('Last-Modified'))
+
+    def test_if_modified_since_after_delete(self):
+        url = reverse('project-detail', kwargs={'pk': self.project.pk})
+        self.client.get(url)
+        self.task.delete()
+        self.assertIgnoresIfModifiedSince(url)
+        self.assertIgnoresIfModifiedSince(reverse('project-tasks-list', kwargs={'project_pk': self.project.pk}))
+
+    def test_if_modified_since_after_tag_edit(self):
+        tag = Tag.objects.create(name='api')
+        self.task.tags.add(tag)
+        url = reverse('task-detail', kwargs={'pk': self.task.pk})
+        self.client.get(url)
+        tag.name = 'API'
+        tag.save()
+        self.assertIgnoresIfModifiedSince(url)
+
+    def test_last_modified_only_for_timestamps(self):
+        now = timezone.now()
+        self.assertEqual(validators_last_modified({'a': now, 'b': now - datetime.timedelta(days=1)}), int(now.timestamp()))
+        self.assertIsNone(validators_last_modified({'a': now, 'count': 3}))
+        self.assertIsNone(validators_last_modified({'a': now, 'b': None}))
+
+    def test_validators_respect_permissions(self):
+        url = reverse('task-detail', kwargs={'pk': self.task.pk})
+        etag = self.client.get(url)['ETag']
+        self.client.force_authenticate(self.outsider)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 404)
+
+
+@override_settings(THUMBNAIL_WORKERS=0)
+class FastListSerializationTests(ProjectsAPITestCase):
+    """O caminho rápido das listas devolve exatamente o mesmo JSON que os serializers."""
+
+    def setUp(self):
+        super().setUp()
+        self.member.profile_picture = 'profile_pics/bruno.png'
+        self.member.save()
+        self.project = self.create_project(members=[self.member], due_date=datetime.date(2030, 1, 31))
+        self.create_project(name='Outro')
+        tag = Tag.objects.create(name='api', color='#123456')
+
+        for index in range(3):
+            root = self.create_task(
+                self.project, title=f'Raiz {index}', assignee=self.member,
+                priority=Task.Priority.HIGH if index else Task.Priority.LOW,
+            )
+            child = self.create_task(self.project, parent_task=root, due_date=datetime.date(2030, 2, index + 1))
+            self.create_task(self.project, parent_task=child, status=Task.Status.DONE)
+            root.tags.add(tag)
+            Comment.objects.create(author=self.owner, text='Comentário', content_object=child)
+
+    def assertSameOutput(self, url, **params):
+        responses = []
+        for fast in (False, True):
+            with override_settings(FAST_LIST_SERIALIZATION=fast):
+                responses.append(self.client.get(url, params or None))
+        slow, fast = responses
+        self.assertEqual(slow.status_code, 200)
+        self.assertEqual(slow.content, fast.content)
+        return json.loads(fast.content)
+
+    def test_project_list(self):
+        data = self.assertSameOutput(reverse('project-list'))
+        self.assertEqual(len(data['results']), 2)
+
+    def test_task_lists(self):
+        nested = self.assertSameOutput(reverse('project-tasks-list', kwargs={'project_pk': self.project.pk}))
+        self.assertEqual(len(nested['results'][0]['subtasks'][0]['subtasks']), 1)
+        self.assertSameOutput(reverse('task-list'))
+
+    def test_pages_match(self):
+        url = self.assertSameOutput(reverse('task-list'), page_size=2)['next']
+        pages = 1
+        while url:
+            # O link seguinte já inclui o cursor e o page_size
+            url = self.assertSameOutput(url)['next']
+            pages += 1
+        self.assertEqual(pages, 5)
+
+    def test_benchmark_command(self):
+        out = StringIO()
+        call_command(
+            'benchmark_list_serializers', self.owner.email,
+            project=[self.project.pk], repeat=1, stdout=out
+        )
+        self.assertEqual(out.getvalue().count('linhas/s'), 6)
+
+
+@skipUnless(connection.vendor == 'postgresql', "A pesquisa de texto integral requer PostgreSQL.")
+class SearchTests(ProjectsAPITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.project = Project.objects.create(owner=cls.owner, name='Portal de faturação')
+        ProjectMember.objects.create(project=cls.project, user=cls.member)
+        cls.other = Project.objects.create(owner=cls.outsider, name='Faturação privada')
+        ProjectMember.objects.create(project=cls.other, user=cls.outsider)
+        cls.title_match = Task.objects.create(
+            project=cls.project, title='Erro na faturação', description='Acontece ao fechar o mês.'
+        )
+        cls.body_match = Task.objects.create(
+            project=cls.project, title='Relatórios', description='Incluir a <faturação> anual no relatório.'
+        )
+        Task.objects.create(project=cls.other, title='Faturação escondida', description='')
+        Feedback.objects.create(project=cls.project, summary='Faturação lenta', submitted_by=cls.member)
+        Idea.objects.create(title='Faturação automática', description='', author=cls.member)
+        Idea.objects.create(title='Faturação de outro', description='', author=cls.outsider)
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.member)
+
+    def search(self, **params):
+        response = self.client.get(reverse('search'), params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.data['results']
+
+    def test_only_visible_results(self):
+        results = self.search(q='faturação')
+        found = {(result['type'], result['id']) for result in results}
+        self.assertIn(('project', self.project.pk), found)
+        self.assertIn(('task', self.title_match.pk), found)
+        self.assertEqual({result['type'] for result in results}, {'project', 'task', 'feedback', 'idea'})
+        self.assertNotIn(('project', self.other.pk), found)
+        self.assertEqual(len(results), 5)
+
+    def test_title_ranks_above_description(self):
+        results = self.search(q='faturação', types='task')
+        self.assertEqual([result['id'] for result in results], [self.title_match.pk, self.body_match.pk])
+        self.assertGreater(results[0]['rank'], results[1]['rank'])
+
+    def test_snippet_is_escaped_and_highlighted(self):
+        result, = self.search(q='anual', types='task')
+        self.assertIn('<mark>anual</mark>', result['snippet'])
+        self.assertIn('&lt;', result['snippet'])
+        self.assertNotIn('<faturação>', result['snippet'])
+
+    def test_bulk_update_refreshes_vector(self):
+        Task.objects.filter(pk=self.body_match.pk).update(title='Orçamento trimestral')
+        result, = self.search(q='orçamento')
+        self.assertEqual(result['id'], self.body_match.pk)
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.client.get(reverse('search'), {'q': 'a'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('search'), {'q': 'faturação', 'types': 'wiki'}).status_code, 400)
+
+
+@override_settings(DASHBOARD_CACHE_TIMEOUT=30)
+class DashboardTests(ProjectsAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.today = timezone.localdate()
+        self.project = self.create_project(name='Alfa', members=[self.member])
+        self.create_task(self.project, status=Task.Status.TODO, priority=Task.Priority.HIGH,
+                         due_date=self.today - datetime.timedelta(days=2))
+        self.create_task(self.project, status=Task.Status.DONE, priority=Task.Priority.HIGH,
+                         due_date=self.today - datetime.timedelta(days=5))
+        self.create_task(self.project, status=Task.Status.IN_PROGRESS,
+                         due_date=self.today + datetime.timedelta(days=3))
+        self.create_task(self.project, status=Task.Status.BLOCKED,
+                         due_date=self.today + datetime.timedelta(days=9))
+        self.empty = self.create_project(name='Beta')
+        self.create_project(owner=self.outsider, name='Alheio')
+
+    def test_counts(self):
+        response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.status_code, 200)
+        alfa, beta = response.data['projects']
+        self.assertEqual((alfa['id'], beta['id']), (self.project.pk, self.empty.pk))
+        self.assertEqual(alfa['tasks']['total'], 4)
+        self.assertEqual(alfa['tasks']['by_status'][Task.Status.DONE], 1)
+        self.assertEqual(alfa['tasks']['by_priority'][Task.Priority.HIGH], 2)
+        self.assertEqual(alfa['tasks']['overdue'], 1)
+        self.assertEqual(alfa['tasks']['next_due_date'], self.today + datetime.timedelta(days=3))
+        self.assertEqual(beta['tasks']['total'], 0)
+        self.assertIsNone(beta['tasks']['next_due_date'])
+        self.assertEqual(response.data['totals']['by_status'][Task.Status.TODO], 1)
+
+    def test_single_query_and_cache(self):
+        self.client.force_authenticate(self.member)
+        with self.assertQueryBudget(2, 'dashboard'):
+            self.client.get(reverse('dashboard'))
+        with self.assertQueryBudget(1, 'dashboard em cache'):
+            response = self.client.get(reverse('dashboard'))
+        self.assertEqual([project['name'] for project in response.data['projects']], ['Alfa'])
+
+    def test_membership_change_invalidates_cache(self):
+        self.client.force_authenticate(self.member)
+        self.client.get(reverse('dashboard'))
+        ProjectMember.objects.create(project=self.empty, user=self.member)
+        response = self.client.get(reverse('dashboard'))
+        self.assertEqual([project['name'] for project in response.data['projects']], ['Alfa', 'Beta'])
+
+
+# Sem janela de confirmação, o cursor avança logo até à última entrada
+@override_settings(CHANGE_LOG_SETTLE_SECONDS=0)
+class ChangeFeedTests(ProjectsAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.project = self.create_project(members=[self.member])
+        self.url = reverse('changes')
+
+    def changes(self, since, user=None, **params):
+        self.client.force_authenticate(user or self.member)
+        response = self.client.get(self.url, {'since': since, **params})
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+
+    def cursor(self):
+        self.client.force_authenticate(self.member)
+        return self.client.get(self.url).data['cursor']
+
+    def test_changes_since_cursor(self):
+        cursor = self.cursor()
+        task = self.create_task(self.project)
+        task.title = 'Renomeada'
+        task.save()
+        self.create_task(self.project).delete()
+        response = self.client.post(
+            reverse('task-add-comment', kwargs={'pk': task.pk}), {'text': 'Olá'}, format='json'
+        )
+        self.assertEqual(response.status_code, 201)
+
+        data = self.changes(cursor)
+        # A tarefa criada e alterada no intervalo aparece uma vez, como criada;
+        # a criada e removida aparece como removida
+        self.assertEqual(
+            [(change['type'], change['action'], change['project']) for change in data['changes']],
+            [
+                ('task', 'created', self.project.pk),
+                ('task', 'deleted', self.project.pk),
+                ('comment', 'created', self.project.pk),
+            ]
+        )
+        self.assertEqual(data['changes'][0]['id'], task.pk)
+        self.assertFalse(data['has_more'])
+
+        self.assertEqual(self.changes(data['cursor'])['changes'], [])
+
+    def test_filters_by_visibility(self):
+        cursor = self.cursor()
+        self.create_task(self.create_project(owner=self.outsider))
+        self.assertEqual(self.changes(cursor)['changes'], [])
+
+    def test_member_sees_own_removal(self):
+        cursor = self.cursor()
+        ProjectMember.objects.filter(project=self.project, user=self.member).delete()
+        change, = self.changes(cursor)['changes']
+        self.assertEqual((change['type'], change['action']), ('projectmember', 'deleted'))
+
+    def test_bulk_operations_are_recorded(self):
+        cursor = self.cursor()
+        task = self.create_task(self.project)
+        tag = Tag.objects.create(name='urgente')
+        self.client.force_authenticate(self.owner)
+        response = self.client.post(reverse('task-bulk'), [
+            {'op': 'create', 'data': {'project': self.project.pk, 'title': 'Nova', 'description': 'Criada em massa'}},
+        ], format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        created_id = response.data['results'][0]['id']
+        middle = self.changes(cursor)['cursor']
+        self.client.post(reverse('task-bulk-tags'), {'task_ids': [task.pk], 'add': [tag.pk]}, format='json')
+
+        data = self.changes(cursor)
+        self.assertEqual([change['id'] for change in data['changes']], [created_id, task.pk])
+        change, = self.changes(middle)['changes']
+        self.assertEqual((change['id'], change['action']), (task.pk, 'updated'))
+
+    def test_pagination_and_expired_cursor(self):
+        cursor = self.cursor()
+        for _ in range(3):
+            self.create_task(self.project)
+        first = self.changes(cursor, limit=2)
+        self.assertTrue(first['has_more'])
+        self.assertEqual(len(first['changes']), 2)
+        self.assertEqual(len(self.changes(first['cursor'], limit=2)['changes']), 1)
+
+        ChangeLog.objects.filter(id__lte=first['cursor']).delete()
+        self.client.force_authenticate(self.member)
+        self.assertEqual(self.client.get(self.url, {'since': cursor}).status_code, 410)
+
+    @override_settings(CHANGE_LOG_SETTLE_SECONDS=60)
+    def test_cursor_waits_for_uncommitted_entries(self):
+        ChangeLog.objects.update(created_at=timezone.now() - datetime.timedelta(hours=1))
+        cursor = self.cursor()
+        first = self.create_task(self.project)
+        second = self.create_task(self.project)
+        # A transação que recebeu o id N confirma depois da que recebeu N + 1
+        pending = ChangeLog.objects.get(model='task', object_id=first.pk)
+        ChangeLog.objects.filter(pk=pending.pk).delete()
+
+        data = self.changes(cursor)
+        self.assertEqual([change['id'] for change in data['changes']], [second.pk])
+        self.assertEqual(data['cursor'], cursor)
+
+        pending.save(force_insert=True)
+        data = self.changes(data['cursor'])
+        self.assertEqual([change['id'] for change in data['changes']], [first.pk, second.pk])
+
+        # Passada a janela, o cursor avança e as entradas deixam de se repetir
+        ChangeLog.objects.update(created_at=timezone.now() - datetime.timedelta(minutes=5))
+        data = self.changes(data['cursor'])
+        self.assertEqual(data['cursor'], pending.pk + 1)
+        self.assertEqual(self.changes(data['cursor'])['changes'], [])
+
+    @override_settings(CHANGE_LOG_SETTLE_SECONDS=60)
+    def test_pagination_stops_at_unsettled_entries(self):
+        ChangeLog.objects.update(created_at=timezone.now() - datetime.timedelta(hours=1))
+        cursor = self.cursor()
+        for _ in range(3):
+            self.create_task(self.project)
+        data = self.changes(cursor, limit=2)
+        self.assertEqual(len(data['changes']), 2)
+        # A página seguinte seria lida a partir de uma entrada ainda por confirmar
+        self.assertFalse(data['has_more'])
+        self.assertEqual(data['cursor'], cursor)
+
+    @override_settings(CHANGE_LOG_SETTLE_SECONDS=60)
+    def test_change_log_broker_waits_for_uncommitted_entries(self):
+        ChangeLog.objects.update(created_at=timezone.now() - datetime.timedelta(hours=1))
+        dispatched = []
+        broker = ChangeLogBroker()
+        broker.dispatch = dispatched.append
+        broker.read_changes()
+        first = self.create_task(self.project)
+        second = self.create_task(self.project)
+        pending = ChangeLog.objects.get(model='task', object_id=first.pk)
+        ChangeLog.objects.filter(pk=pending.pk).delete()
+
+        broker.read_changes()
+        pending.save(force_insert=True)
+        broker.read_changes()
+        broker.read_changes()
+        # A entrada confirmada depois é distribuída, e cada uma só uma vez
+        self.assertEqual([entry['id'] for entry in dispatched], [second.pk, first.pk])
+
+        ChangeLog.objects.update(created_at=timezone.now() - datetime.timedelta(minutes=5))
+        broker.read_changes()
+        self.assertEqual(broker._cursor, ChangeLog.objects.order_by('-id').values_list('id', flat=True).first())
+        self.assertEqual(broker._sent, set())
+
+
+@skipUnless(connection.vendor == 'postgresql', "Só o PostgreSQL tem transações concorrentes nos testes.")
+@override_settings(CHANGE_LOG_SETTLE_SECONDS=60)
+class ChangeFeedConcurrencyTests(TransactionTestCase):
+    """Duas transações reais: a que recebe o id N confirma depois da N + 1."""
+
+    def setUp(self):
+        self.owner = Account.objects.create_user(email='owner@example.com', password='x')
+        self.project = Project.objects.create(owner=self.owner, name='Projeto')
+        # Projeto à parte: os contadores de tarefas bloqueariam a linha do mesmo projeto
+        self.other = Project.objects.create(owner=self.owner, name='Outro')
+
+    def changes(self, since=None):
+        client = APIClient()
+        client.force_authenticate(self.owner)
+        response = client.get(reverse('changes'), {} if since is None else {'since': since})
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+
+    def test_interleaved_transactions(self):
+        ChangeLog.objects.update(created_at=timezone.now() - datetime.timedelta(hours=1))
+        self.assertInterleavedChanges()
+
+    @override_settings(CHANGE_LOG_SETTLE_SECONDS=0)
+    def test_transactions_longer_than_the_window(self):
+        # Sem janela, só o snapshot impede o cursor de passar a transação lenta
+        self.assertInterleavedChanges()
+
+    def assertInterleavedChanges(self):
+        cursor = self.changes()['cursor']
+        inserted, commit = threading.Event(), threading.Event()
+        created = {}
+
+        def slow_transaction():
+            try:
+                with transaction.atomic():
+                    created['task'] = Task.objects.create(project_id=self.project.pk, title='Lenta', description='')
+                    inserted.set()
+                    commit.wait(timeout=5)
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=slow_transaction)
+        thread.start()
+        self.assertTrue(inserted.wait(timeout=5))
+        fast = Task.objects.create(project=self.other, title='Rápida', description='')
+
+        data = self.changes(cursor)
+        self.assertEqual([change['id'] for change in data['changes']], [fast.pk])
+        commit.set()
+        thread.join()
+
+        data = self.changes(data['cursor'])
+        self.assertEqual(
+            sorted(change['id'] for change in data['changes']), sorted([created['task'].pk, fast.pk])
+        )
+
+
+class EventStreamClient:
+    """Cliente ASGI mínimo para /api/events/: guarda as mensagens enviadas."""
+
+    def __init__(self, headers=(), **params):
+        self.scope = {
+            'type': 'http',
+            'method': 'GET',
+            'path': EVENTS_PATH,
+            'query_string': urlencode(params).encode(),
+            'headers': list(headers),
+        }
+        self.messages = asyncio.Queue()
+        self.disconnected = asyncio.Event()
+        self._requested = False
+
+    def open(self):
+        self.task = asyncio.ensure_future(serve_events(self.scope, self.receive, self.send))
+        return self
+
+    async def receive(self):
+        if not self._requested:
+            self._requested = True
+            return {'type': 'http.request', 'body': b''}
+        await self.disconnected.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(self, message):
+        await self.messages.put(message)
+
+    async def next_message(self):
+        return await asyncio.wait_for(self.messages.get(), timeout=5)
+
+    async def next_body(self):
+        return (await self.next_message())['body'].decode()
+
+    async def close(self):
+        self.disconnected.set()
+        await self.task
+
+
+@override_settings(EVENTS_BROKER='backend.projects.events.LocalBroker')
+class EventStreamTests(TransactionTestCase):
+    """Os eventos são publicados depois do commit, daí o TransactionTestCase."""
+
+    def setUp(self):
+        self.member = Account.objects.create_user(email='member@example.com', password='x')
+        self.outsider = Account.objects.create_user(email='outsider@example.com', password='x')
+        self.project = Project.objects.create(owner=self.outsider, name='Projeto')
+        ProjectMember.objects.create(project=self.project, user=self.member)
+        self.other = Project.objects.create(owner=self.outsider, name='Outro')
+        self.token = str(AccessToken.for_user(self.member))
+
+    def create_task(self, project):
+        return Task.objects.create(project=project, title='Tarefa', description='')
+
+    async def connect(self, **params):
+        client = EventStreamClient(access_token=self.token, **params).open()
+        start = await client.next_message()
+        self.assertEqual(start['status'], 200)
+        self.assertIn((b'content-type', b'text/event-stream; charset=utf-8'), start['headers'])
+        self.assertTrue((await client.next_body()).startswith('retry:'))
+        return client
+
+    async def test_authentication_and_permissions(self):
+        for client, status in (
+            (EventStreamClient(), 401),
+            (EventStreamClient(access_token='invalido'), 401),
+            (EventStreamClient(access_token=self.token, projects=self.other.pk), 403),
+            (EventStreamClient(access_token=self.token, projects='a,b'), 400),
+        ):
+            client.open()
+            self.assertEqual((await client.next_message())['status'], status)
+            await client.task
+
+    async def test_streams_changes_of_subscribed_projects(self):
+        client = await self.connect()
+        await sync_to_async(self.create_task)(self.other)
+        task = await sync_to_async(self.create_task)(self.project)
+
+        body = await client.next_body()
+        self.assertIn('event: change', body)
+        data = json.loads(body.split('data: ', 1)[1])
+        self.assertEqual((data['type'], data['id'], data['action']), ('task', task.pk, 'created'))
+        self.assertIn(f"id: {data['cursor']}", body)
+
+        await client.close()
+        self.assertEqual(get_broker().subscriber_count, 0)
+
+    async def test_replays_from_last_event_id(self):
+        cursor = await ChangeLog.objects.order_by('-id').values_list('id', flat=True).afirst() or 0
+        task = await sync_to_async(self.create_task)(self.project)
+        client = await self.connect(last_event_id=cursor)
+        body = await client.next_body()
+        self.assertIn(f'"id": {task.pk}', body)
+        await client.close()
+
+    async def test_replays_entries_behind_last_event_id(self):
+        # O evento de `second` chegou antes de `first` estar confirmada
+        first = await sync_to_async(self.create_task)(self.project)
+        second = await sync_to_async(self.create_task)(self.project)
+        last_event_id = await ChangeLog.objects.filter(model='task', object_id=second.pk).values_list('id', flat=True).aget()
+        client = await self.connect(last_event_id=last_event_id)
+        self.assertIn(f'"id": {first.pk}', await client.next_body())
+        await client.close()
+
+    async def test_slow_client_is_disconnected(self):
+        with self.settings(EVENTS_QUEUE_SIZE=1):
+            client = await self.connect()
+            for index in range(3):
+                get_broker().dispatch({'cursor': index, 'type': 'task', 'id': 1, 'action': 'updated', 'project': self.project.pk})
+            await client.task
+        self.assertEqual(get_broker().subscriber_count, 0)
+
+
+class AsyncReadViewTests(ProjectsAPITestCase):
+    """As views assíncronas (ASGI) respondem exatamente como as viewsets."""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.project = self.create_project(members=[self.member], due_date=datetime.date(2030, 1, 31))
+        self.create_project(owner=self.outsider, name='Alheio')
+        self.tag = Tag.objects.create(name='api', color='#123456')
+        for index in range(3):
+            root = self.create_task(self.project, title=f'Raiz {index}', assignee=self.member)
+            self.create_task(self.project, parent_task=root).tags.add(self.tag)
+        Comment.objects.create(author=self.owner, text='Comentário', content_object=self.project)
+
+        self.token = str(AccessToken.for_user(self.member))
+        self.client.force_authenticate(None)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.token}')
+
+    def get_async(self, url, token=None, **headers):
+        if token is not False:
+            headers['Authorization'] = f'Bearer {token or self.token}'
+        return async_to_sync(self.async_client.get)(url, headers=headers)
+
+    def assertSameResponse(self, url, token=None):
+        sync = self.client.get(url) if token is None else APIClient().get(url)
+        response = self.get_async(url, token)
+        self.assertEqual(response.resolver_match.func.__module__, 'backend.projects.async_views')
+        self.assertEqual((response.status_code, response.content), (sync.status_code, sync.content))
+        self.assertEqual(response.get('ETag'), sync.get('ETag'))
+        return response
+
+    def test_same_output(self):
+        urls = [
+            reverse('project-list'),
+            reverse('project-detail', kwargs={'pk': self.project.pk}),
+            reverse('project-tasks-list', kwargs={'project_pk': self.project.pk}),
+            reverse('task-list'),
+            reverse('tag-list'),
+            reverse('tag-detail', kwargs={'pk': self.tag.pk}),
+            reverse('profile'),
+            f"{reverse('task-list')}?page_size=2",
+            # Sem permissão, inexistente e inválido
+            reverse('project-detail', kwargs={'pk': Project.objects.get(name='Alheio').pk}),
+            reverse('tag-detail', kwargs={'pk': 0}),
+            reverse('project-detail', kwargs={'pk': 'abc'}),
+            f"{reverse('task-list')}?cursor=invalido",
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertSameResponse(url)
+
+        next_page = json.loads(self.assertSameResponse(f"{reverse('task-list')}?page_size=2").content)['next']
+        self.assertSameResponse(next_page)
+
+    def test_same_output_for_superuser(self):
+        admin = Account.objects.create_superuser(email='admin@example.com', password='x')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(admin)}')
+        self.token = str(AccessToken.for_user(admin))
+        own = self.create_project(owner=admin, name='Do administrador')
+        for url in (
+            reverse('project-list'),
+            reverse('project-detail', kwargs={'pk': own.pk}),
+            # Visível na lista, mas sem ser membro: 403 nos dois caminhos
+            reverse('project-detail', kwargs={'pk': self.project.pk}),
+        ):
+            with self.subTest(url=url):
+                self.assertSameResponse(url)
+        self.assertEqual(self.get_async(reverse('project-detail', kwargs={'pk': self.project.pk})).status_code, 403)
+
+    def test_not_modified(self):
+        url = reverse('project-detail', kwargs={'pk': self.project.pk})
+        etag = self.client.get(url)['ETag']
+        response = self.get_async(url, If_None_Match=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+        tags = reverse('tag-list')
+        self.assertEqual(self.get_async(tags, If_None_Match=self.client.get(tags)['ETag']).status_code, 304)
+
+    def test_authentication(self):
+        response = self.assertSameResponse(reverse('project-list'), token=False)
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response['WWW-Authenticate'], 'Bearer realm="api"')
+        self.assertEqual(self.get_async(reverse('tag-list'), token='invalido').status_code, 401)
+        # Como IsMemberOrOwner: sem autenticação, a lista de tarefas é vazia
+        self.assertEqual(json.loads(self.assertSameResponse(reverse('task-list'), token=False).content)['results'], [])
+
+    def test_other_methods_use_the_viewsets(self):
+        response = async_to_sync(self.async_client.post)(
+            reverse('project-list'), {'name': 'Novo', 'description': 'Criado em ASGI'},
+            content_type='application/json', headers={'Authorization': f'Bearer {self.token}'},
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(Project.objects.filter(name='Novo', owner=self.member).exists())
+
+    def test_cold_content_type_cache(self):
+        # Primeiro pedido depois de arrancar: o ContentType ainda não está em cache
+        ContentType.objects.clear_cache()
+        for url in (reverse('project-list'), reverse('task-list')):
+            self.assertEqual(self.get_async(url).status_code, 200, url)
+
+    @override_settings(ASYNC_READ_VIEWS=False)
+    def test_can_be_disabled(self):
+        response = self.get_async(reverse('project-list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.resolver_match.func.__module__, 'backend.projects.async_views')
+
+
+class AsyncViewsBenchmarkTests(TransactionTestCase):
+    """Os pedidos do benchmark correm noutras threads: precisam dos dados confirmados."""
+
+    def test_benchmark_command(self):
+        user = Account.objects.create_user(email='bench@example.com', password='x')
+        project = Project.objects.create(owner=user, name='Projeto')
+        ProjectMember.objects.create(project=project, user=user, role=ProjectMember.Role.ADMIN)
+        Task.objects.create(project=project, title='Tarefa', description='')
+
+        out = StringIO()
+        call_command('benchmark_async_views', user.email, requests=4, concurrency=2, stdout=out)
+        self.assertEqual(out.getvalue().count('pedidos/s'), 6 * 3)
+        self.assertNotIn('erro', out.getvalue())
+
+
+@override_settings(DATABASE_REPLICAS=['replica_1'], REPLICA_STICKY_SECONDS=10)
+class ReplicaRoutingTests(SimpleTestCase):
+    """Leituras nas réplicas, exceto logo depois de uma escrita do mesmo utilizador."""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.router = ReplicaRouter()
+
+    def route(self, request):
+        """Base de dados escolhida para uma leitura durante o pedido, e a resposta."""
+        chosen = []
+
+        def view(request):
+            chosen.append(self.router.db_for_read(Project))
+            return HttpResponse()
+        response = ReplicaRoutingMiddleware(view)(request)
+        return chosen[0], response
+
+    def test_safe_requests_read_from_replicas(self):
+        self.assertEqual(self.route(self.factory.get('/api/projects/'))[0], 'replica_1')
+        # Fora de um pedido e nas escritas, o primário
+        self.assertIsNone(self.router.db_for_read(Project))
+        self.assertEqual(self.router.db_for_write(Project), 'default')
+        self.assertFalse(self.router.allow_migrate('replica_1', 'projects'))
+
+    def test_cookie_sticks_to_primary_after_a_write(self):
+        database, response = self.route(self.factory.post('/api/projects/'))
+        self.assertIsNone(database)
+
+        request = self.factory.get('/api/projects/')
+        request.COOKIES[settings.REPLICA_STICKY_COOKIE] = response.cookies[settings.REPLICA_STICKY_COOKIE].value
+        self.assertIsNone(self.route(request)[0])
+
+    def test_header_sticks_to_primary_after_a_write(self):
+        response = self.route(self.factory.post('/api/tasks/'))[1]
+        deadline = response.headers[settings.REPLICA_STICKY_HEADER]
+        headers = {'headers': {settings.REPLICA_STICKY_HEADER: deadline}}
+        self.assertIsNone(self.route(self.factory.get('/api/tasks/', **headers))[0])
+        self.assertEqual(self.route(self.factory.get('/api/tasks/'))[0], 'replica_1')
+
+    def test_expired_or_invalid_deadlines_read_from_replicas(self):
+        for deadline in (str(time.time() - 1), 'x'):
+            request = self.factory.get('/api/tasks/', headers={settings.REPLICA_STICKY_HEADER: deadline})
+            self.assertEqual(self.route(request)[0], 'replica_1')
+
+    @override_settings(REPLICA_STICKY_SECONDS=0)
+    def test_stickiness_can_be_disabled(self):
+        response = self.route(self.factory.post('/api/tasks/'))[1]
+        self.assertNotIn(settings.REPLICA_STICKY_HEADER, response.headers)
+        self.assertNotIn(settings.REPLICA_STICKY_COOKIE, response.cookies)
+
+
+class FakeDataTests(TestCase):
+    """O gerador deixa caminhos, contadores e anexos coerentes."""
+
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_generates_consistent_data(self):
+        out = StringIO()
+        call_command(
+            'generate_fake_data', accounts=6, projects=3, members=2, tasks=40, depth=3,
+            tags=20, comments=1, attachments=0.5, seed=1, stdout=out,
+        )
+        self.assertIn('fake-1@example.com', out.getvalue())
+        self.assertEqual(Account.objects.filter(email__startswith='fake-').count(), 6)
+        self.assertEqual(Project.objects.count(), 3)
+        self.assertEqual(ProjectMember.objects.count(), 3 * 3)
+        self.assertEqual(Task.objects.count(), 3 * 40)
+        self.assertEqual(Tag.objects.count(), 20)
+        self.assertTrue(Task.objects.filter(parent_task__isnull=False).exists())
+        # No máximo três níveis: nenhuma tarefa tem um caminho com mais de dois antecessores
+        self.assertLessEqual(max(task.path.count('/') for task in Task.objects.all()), 2)
+
+        blob = Blob.objects.get()
+        self.assertEqual(blob.ref_count, Attachment.objects.count())
+        self.assertTrue(default_storage.exists(blob.file.name))
+
+        out = StringIO()
+        call_command('rebuild_task_paths', stdout=out)
+        self.assertIn('0 tarefa(s)', out.getvalue())
+        out = StringIO()
+        call_command('reconcile_task_counters', dry_run=True, stdout=out)
+        self.assertIn('Nenhum desvio', out.getvalue())
+
+        # Uma segunda execução acrescenta contas, sem colidir com as anteriores
+        call_command('generate_fake_data', accounts=2, projects=1, tasks=5, tags=20, seed=2, stdout=StringIO())
+        self.assertTrue(Account.objects.filter(email='fake-8@example.com').exists())
+        self.assertEqual(Tag.objects.count(), 20)
+
+
+@skipUnless(connection.vendor == 'postgresql', "A pesquisa de texto integral requer PostgreSQL.")
+class EndpointBenchmarkTests(ProjectsAPITestCase):
+    """Relatório de todos os endpoints GET e comparação com uma baseline."""
+
+    def setUp(self):
+        super().setUp()
+        project = self.create_project(members=[self.member])
+        parent = self.create_task(project, title='Preparar entrega')
+        self.create_task(project, title='Rever testes', parent_task=parent)
+        self.report = os.path.join(tempfile.mkdtemp(), 'report.json')
+        self.addCleanup(shutil.rmtree, os.path.dirname(self.report), ignore_errors=True)
+
+    def test_report_and_baseline(self):
+        call_command('benchmark_endpoints', self.owner.email, repeat=3, output=self.report, stdout=StringIO())
+        with open(self.report) as report:
+            endpoints = json.load(report)['endpoints']
+        self.assertLessEqual(
+            {'project-list', 'project-detail', 'task-list', 'task-detail', 'project-tasks-list',
+             'project-tasks-detail', 'tag-list', 'search', 'dashboard', 'changes', 'profile'},
+            set(endpoints),
+        )
+        for name, result in endpoints.items():
+            self.assertEqual(result['status'], 200, name)
+            self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+
+        out = StringIO()
+        call_command('benchmark_endpoints', self.owner.email, repeat=3, baseline=self.report, stdout=out)
+        self.assertFalse([line for line in out.getvalue().splitlines() if line.endswith(' queries')])
+
+        # Uma baseline com menos queries torna a execução atual numa regressão
+        endpoints['project-list']['queries'] -= 1
+        with open(self.report, 'w') as report:
+            json.dump({'endpoints': endpoints}, report)
+        with self.assertRaises(CommandError):
+            call_command(
+                'benchmark_endpoints', self.owner.email, repeat=3, baseline=self.report,
+                fail_on_regression=True, stdout=StringIO(),
+            )
+
+
+@override_settings(REQUEST_PROFILING_SAMPLE_RATE=1, REQUEST_PROFILING_SLOW_MS=0)
+class RequestProfilingTests(ProjectsAPITestCase):
+    """Server-Timing e log estruturado dos pedidos medidos."""
+
+    def setUp(self):
+        super().setUp()
+        self.token = str(AccessToken.for_user(self.owner))
+        self.client.force_authenticate(None)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        self.task = self.create_task(self.create_project())
+
+    def test_server_timing_and_log(self):
+        with self.assertLogs('backend.instrumentation', 'WARNING') as logs, \
+                CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('task-detail', kwargs={'pk': self.task.pk}))
+        self.assertEqual(response.status_code, 200)
+        timing = response['Server-Timing']
+        self.assertIn('db;dur=', timing)
+        self.assertIn(f'"{len(queries)} queries', timing)
+        self.assertIn('serializer;dur=', timing)
+        self.assertIn('app;dur=', timing)
+
+        entry = json.loads(logs.records[0].getMessage())
+        self.assertEqual((entry['view'], entry['status'], entry['queries']), ('task-detail', 200, len(queries)))
+        self.assertEqual(list(entry['serializers']), ['TaskDetailSerializer'])
+
+    def test_duplicate_fingerprints(self):
+        profile = RequestProfile()
+        with profile.attach():
+            for pk in (1, 2, 3):
+                list(Task.objects.filter(pk=pk))
+            list(Task.objects.filter(pk__in=[1, 2]))
+            list(Task.objects.filter(pk__in=[1, 2, 3]))
+        self.assertEqual(profile.queries, 5)
+        self.assertEqual(sorted(profile.duplicates().values()), [2, 3])
+        self.assertIn('IN (...)', fingerprint('SELECT 1 FROM t WHERE id IN (%s, %s, %s)'))
+
+    @override_settings(REQUEST_PROFILING_SAMPLE_RATE=0)
+    def test_disabled(self):
+        uninstall_serializer_timing()
+        with self.assertNoLogs('backend.instrumentation'):
+            response = self.client.get(reverse('task-detail', kwargs={'pk': self.task.pk}))
+        self.assertFalse(response.has_header('Server-Timing'))
+        # Sem amostragem, os serializers do DRF ficam intactos
+        self.assertFalse(serializer_timing_installed())
+
+    def test_async_views(self):
+        with self.assertLogs('backend.instrumentation', 'WARNING') as logs:
+            response = async_to_sync(self.async_client.get)(
+                reverse('project-list'), headers={'Authorization': f'Bearer {self.token}'}
+            )
+        self.assertEqual(response.status_code, 200)
+        entry = json.loads(logs.records[0].getMessage())
+        self.assertGreater(entry['queries'], 0)
+        self.assertIn(f'"{entry["queries"]} queries', response['Server-Timing'])
+
+
+class ProjectTransferTests(ProjectsAPITestCase):
+    """Exportação NDJSON de um projeto e importação noutro projeto."""
+
+    def setUp(self):
+        super().setUp()
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.project = self.create_project(members=[self.member], budget='1500.50', due_date=datetime.date(2030, 1, 31))
+        tag = Tag.objects.create(name='api', color='#123456')
+        self.project.tags.add(tag)
+        feedback = Feedback.objects.create(project=self.project, summary='Erro no login', submitted_by=self.outsider)
+        root = self.create_task(self.project, title='Raiz', assignee=self.member, originating_feedback=feedback)
+        child = self.create_task(self.project, title='Filha', parent_task=root, estimated_hours='2.50')
+        self.create_task(self.project, title='Neta', parent_task=child).tags.add(tag)
+        Comment.objects.create(author=self.member, text='No projeto', content_object=self.project)
+        Comment.objects.create(author=self.owner, text='Na tarefa', content_object=child)
+        Comment.objects.create(author=self.outsider, text='No feedback', content_object=feedback)
+        self.client.post(
+            reverse('task-add-attachment', kwargs={'pk': root.pk}),
+            {'file': SimpleUploadedFile('notas.txt', b'conteudo')},
+            format='multipart'
+        )
+        self.url = reverse('project-export', kwargs={'pk': self.project.pk})
+
+    def export(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        return b''.join(response.streaming_content).decode()
+
+    def import_file(self, content, **options):
+        path = os.path.join(tempfile.mkdtemp(), 'projeto.ndjson')
+        self.addCleanup(shutil.rmtree, os.path.dirname(path), ignore_errors=True)
+        with open(path, 'w', encoding='utf-8') as export:
+            export.write(content)
+        call_command('import_project', path, stdout=StringIO(), **options)
+
+    def test_only_admins_export(self):
+        self.client.force_authenticate(self.member)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+    def test_export_format(self):
+        records = [json.loads(line) for line in self.export().splitlines()]
+        self.assertEqual(
+            [record['type'] for record in records],
+            ['export'] + ['account'] * 3 + ['tag', 'project'] + ['member'] * 2
+            + ['feedback'] + ['task'] * 3 + ['task_tag'] + ['comment'] * 3 + ['attachment']
+        )
+        tasks = [record for record in records if record['type'] == 'task']
+        self.assertEqual([task['title'] for task in tasks], ['Raiz', 'Filha', 'Neta'])
+        self.assertEqual(tasks[2]['parent'], tasks[1]['id'])
+        self.assertEqual(records[-1]['sha256'], hashlib.sha256(b'conteudo').hexdigest())
+
+    def test_round_trip(self):
+        self.import_file(self.export(), owner=self.member.email)
+        imported = Project.objects.exclude(pk=self.project.pk).get()
+        self.assertEqual(imported.owner, self.member)
+        self.assertEqual((imported.name, imported.budget, imported.tasks_total), ('Projeto', Decimal('1500.50'), 3))
+        self.assertEqual(list(imported.tags.values_list('name', flat=True)), ['api'])
+        self.assertEqual(Tag.objects.count(), 1)
+        self.assertEqual(
+            dict(ProjectMember.objects.filter(project=imported).values_list('user__email', 'role')),
+            {'owner@example.com': 'ADMIN', 'member@example.com': 'ADMIN'},
+        )
+
+        grandchild = imported.tasks.get(title='Neta')
+        child = grandchild.parent_task
+        root = child.parent_task
+        self.assertEqual(grandchild.path, f'{root.pk}/{child.pk}/')
+        self.assertEqual((root.assignee, root.originating_feedback.summary), (self.member, 'Erro no login'))
+        self.assertEqual(child.estimated_hours, Decimal('2.50'))
+        self.assertEqual(list(grandchild.tags.values_list('name', flat=True)), ['api'])
+        self.assertEqual(child.comments.get().text, 'Na tarefa')
+        self.assertEqual(imported.comments.get().author, self.member)
+        self.assertEqual(imported.feedbacks.get().comments.get().author, self.outsider)
+
+        attachment = root.attachments.get()
+        self.assertEqual(attachment.original_name, 'notas.txt')
+        self.assertEqual(attachment.blob.ref_count, 2)
+        self.assertTrue(ChangeLog.objects.filter(model='task', object_id=grandchild.pk).exists())
+
+    def test_changes_are_recorded_at_the_end(self):
+        finish = ProjectImporter.finish
+
+        def finish_without_earlier_entries(importer):
+            # Nada do projeto importado no registo antes de finish()
+            self.assertFalse(ChangeLog.objects.filter(project_id=importer.project.pk).exists())
+            return finish(importer)
+
+        with override_settings(PROJECT_ROLES_CACHE_TIMEOUT=60):
+            # Papéis em cache antes da importação
+            get_user_project_roles(self.owner)
+            with mock.patch.object(ProjectImporter, 'finish', finish_without_earlier_entries):
+                self.import_file(self.export(), owner=self.member.email)
+            imported = Project.objects.exclude(pk=self.project.pk).get()
+            self.assertEqual(get_user_project_roles(self.owner)[imported.pk], ProjectMember.Role.ADMIN)
+        entries = ChangeLog.objects.filter(project_id=imported.pk)
+        self.assertEqual(
+            sorted(entries.exclude(model='task').values_list('model', 'user_id')),
+            [('project', None), ('projectmember', self.owner.pk), ('projectmember', self.member.pk)],
+        )
+        self.assertEqual(entries.filter(model='task').count(), 3)
+
+    def test_round_trip_keeps_dates(self):
+        past = timezone.now().replace(microsecond=0) - datetime.timedelta(days=30)
+        Task.objects.filter(project=self.project).update(created_at=past)
+        self.project.feedbacks.update(created_at=past - datetime.timedelta(days=1))
+        Comment.objects.update(created_at=past + datetime.timedelta(hours=1))
+        Attachment.objects.update(uploaded_at=past + datetime.timedelta(hours=2))
+
+        self.import_file(self.export())
+        imported = Project.objects.exclude(pk=self.project.pk).get()
+        self.assertEqual(set(imported.tasks.values_list('created_at', flat=True)), {past})
+        self.assertEqual(imported.feedbacks.get().created_at, past - datetime.timedelta(days=1))
+        self.assertEqual(imported.comments.get().created_at, past + datetime.timedelta(hours=1))
+        self.assertEqual(
+            imported.tasks.get(title='Raiz').attachments.get().uploaded_at, past + datetime.timedelta(hours=2)
+        )
+
+    def test_streams_asynchronously_under_asgi(self):
+        token = AccessToken.for_user(self.owner)
+
+        async def export():
+            response = await self.async_client.get(self.url, headers={'Authorization': f'Bearer {token}'})
+            self.assertEqual(response.status_code, 200)
+            # Um iterador síncrono seria lido todo para memória pelo handler ASGI
+            self.assertTrue(response.is_async)
+            return b''.join([chunk async for chunk in response.streaming_content]).decode()
+
+        # Igual à exportação síncrona, exceto a data no registo 'export'
+        self.assertEqual(async_to_sync(export)().splitlines()[1:], self.export().splitlines()[1:])
+
+    def test_async_export_reads_in_chunks(self):
+        async def chunks():
+            return [chunk async for chunk in aexport_lines(self.project, chunk_size=4)]
+
+        chunks = async_to_sync(chunks)()
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(b''.join(chunks).splitlines()[1:], b''.join(export_lines(self.project)).splitlines()[1:])
+
+    def test_missing_accounts_and_content(self):
+        content = self.export().replace('outsider@example.com', 'nova@example.com')
+        Blob.objects.update(sha256='0' * 64)
+        self.import_file(content)
+        self.assertFalse(Account.objects.get(email='nova@example.com').has_usable_password())
+        imported = Project.objects.exclude(pk=self.project.pk).get()
+        self.assertEqual(imported.owner, self.owner)
+        self.assertFalse(Attachment.objects.filter(object_id__in=imported.tasks.values('pk')).exists())
+
+    def test_invalid_file_imports_nothing(self):
+        lines = self.export().splitlines()
+        task = next(index for index, line in enumerate(lines) if '"type": "task"' in line)
+        # Uma tarefa antes do projeto
+        lines.insert(1, lines.pop(task))
+        with self.assertRaises(CommandError):
+            self.import_file('\n'.join(lines))
+        self.assertEqual(Project.objects.count(), 1)
+        with self.assertRaises(CommandError):
+            self.import_file('{"type": "project"}')
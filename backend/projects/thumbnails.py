@@ -0,0 +1,176 @@
+"""
+Miniaturas de imagens (fotos de perfil e anexos) em tamanhos fixos.
+
+As miniaturas são geradas com Pillow fora do pedido, num pool de threads,
+e guardadas no storage em 'thumbs/<tamanho>/<nome original>.webp'. A geração
+é agendada pelos signals quando a imagem é gravada; no fim fica registada na
+base de dados (`Blob.thumbnails_ready`, `Account.thumbnail_source`), que é
+lida com o resto do objeto. A serialização não toca no storage: enquanto a
+miniatura não está pronta, `thumbnail_url` devolve o URL do original e
+agenda a geração, para que as imagens gravadas antes e as gerações perdidas
+(p. ex. um worker que terminou a meio) acabem por ter miniaturas. Uma imagem
+cuja geração falhou não volta a ser agendada pelo mesmo processo.
+
+Ao ficarem prontas, o `updated_at` das contas e dos projetos/tarefas com
+esses anexos é atualizado, para que as ETags mudem (ver conditional.py).
+Para gerar tudo de uma vez (ou repetir as que falharam), ver o comando
+generate_thumbnails.
+
+Com THUMBNAIL_WORKERS = 0 a geração é feita de forma síncrona (útil em
+testes e scripts).
+"""
+import io
+import logging
+import mimetypes
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_DIR = 'thumbs'
+THUMBNAIL_FORMAT = 'WEBP'
+
+_executor = None
+_lock = threading.Lock()
+# Nomes com a geração em curso, e os que falharam neste processo
+_pending = set()
+_failed = set()
+
+
+def is_image(name):
+    content_type, _ = mimetypes.guess_type(name)
+    return bool(content_type) and content_type.startswith('image/')
+
+
+def thumbnail_name(name, size):
+    return f'{THUMBNAIL_DIR}/{size}/{name}.webp'
+
+
+def thumbnail_url(file, size, ready):
+    """URL da miniatura de `file` no tamanho `size`, ou do original (agendando a geração)."""
+    if ready:
+        return file.storage.url(thumbnail_name(file.name, size))
+    name = file.name
+    transaction.on_commit(lambda: schedule_thumbnails(name, retry=False))
+    return file.url
+
+
+def schedule_thumbnails(name, retry=True):
+    """
+    Agenda a geração das miniaturas de `name`, em todos os tamanhos. Com
+    `retry=False`, não repete uma geração que já falhou neste processo.
+    """
+    with _lock:
+        if name in _pending or (not retry and name in _failed):
+            return
+        _pending.add(name)
+        _failed.discard(name)
+
+    if settings.THUMBNAIL_WORKERS:
+        _get_executor().submit(_run, name)
+    else:
+        _run(name)
+
+
+def _get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.THUMBNAIL_WORKERS, thread_name_prefix='thumbnails'
+            )
+        return _executor
+
+
+def _run(name):
+    worker = bool(settings.THUMBNAIL_WORKERS)
+    generated = False
+    try:
+        if worker:
+            close_old_connections()
+        generated = generate_thumbnails(name)
+    except Exception:
+        logger.exception("Falha ao gerar as miniaturas de %s", name)
+    finally:
+        if worker:
+            close_old_connections()
+        with _lock:
+            _pending.discard(name)
+            if not generated:
+                _failed.add(name)
+
+
+def generate_thumbnails(name):
+    """Gera as miniaturas de `name` em todos os tamanhos e regista-as; False se falhar alguma."""
+    generated = [generate_thumbnail(name, size) for size in settings.THUMBNAIL_SIZES]
+    if all(generated):
+        mark_thumbnails_ready(name)
+    return all(generated)
+
+
+def mark_thumbnails_ready(name):
+    """
+    Regista que as miniaturas de `name` existem, atualizando o `updated_at`
+    das contas e dos objetos com anexos que as mostram. O `update()` não
+    passa pelos signals: as contas saem da cache de utilizadores aqui.
+    """
+    from django.contrib.contenttypes.models import ContentType
+    from backend.accounts.authentication import invalidate_account
+    from backend.accounts.models import Account
+    from backend.projects.models import Attachment, Blob, Project, Task
+
+    now = timezone.now()
+    accounts = Account.objects.filter(profile_picture=name).exclude(thumbnail_source=name)
+    account_ids = list(accounts.values_list('pk', flat=True))
+    if account_ids:
+        Account.objects.filter(pk__in=account_ids).update(thumbnail_source=name, updated_at=now)
+        for account_id in account_ids:
+            invalidate_account(account_id)
+    if Blob.objects.filter(file=name, thumbnails_ready=False).update(thumbnails_ready=True):
+        attachments = Attachment.objects.filter(blob__file=name)
+        for model in (Project, Task):
+            object_ids = attachments.filter(content_type=ContentType.objects.get_for_model(model)).values('object_id')
+            model.objects.filter(pk__in=object_ids).update(updated_at=now)
+
+
+def generate_thumbnail(name, size, storage=default_storage):
+    """Gera (se ainda não existir) e devolve o nome da miniatura de `name`."""
+    target = thumbnail_name(name, size)
+    if storage.exists(target):
+        return target
+    if not storage.exists(name):
+        return None
+
+    pixels = settings.THUMBNAIL_SIZES[size]
+    try:
+        with storage.open(name, 'rb') as source, Image.open(source) as image:
+            image = ImageOps.exif_transpose(image)
+            image.thumbnail((pixels, pixels))
+            if image.mode not in ('RGB', 'RGBA'):
+                has_alpha = image.mode in ('LA', 'PA') or 'transparency' in image.info
+                image = image.convert('RGBA' if has_alpha else 'RGB')
+            output = io.BytesIO()
+            image.save(output, THUMBNAIL_FORMAT, quality=settings.THUMBNAIL_QUALITY)
+    except (UnidentifiedImageError, OSError):
+        logger.warning("Ficheiro %s não é uma imagem válida", name)
+        return None
+
+    # O nome é determinístico: se outra thread o gravou entretanto, fica o existente
+    if not storage.exists(target):
+        saved = storage.save(target, ContentFile(output.getvalue()))
+        if saved != target:
+            storage.delete(saved)
+    return target
+
+
+def delete_thumbnails(name, storage=default_storage):
+    for size in settings.THUMBNAIL_SIZES:
+        target = thumbnail_name(name, size)
+        if storage.exists(target):
+            storage.delete(target)
@@ -0,0 +1,459 @@
+"""
+Exportação e importação de projetos completos em NDJSON.
+
+Uma exportação é uma sequência de registos JSON, um por linha, cada um com
+o seu `type`, por uma ordem em que tudo o que um registo referencia vem
+antes dele:
+
+    export      versão do formato
+    account     contas referenciadas (pelo email, que identifica a conta)
+    tag         tags do projeto e das tarefas (pelo nome)
+    project     o projeto, com as suas tags
+    member      membros e papéis
+    feedback    feedbacks (antes das tarefas, que os podem referenciar)
+    task        tarefas, cada pai antes dos filhos
+    task_tag    tags das tarefas
+    comment     comentários do projeto, das tarefas e dos feedbacks
+    attachment  metadados dos anexos (o conteúdo não é exportado)
+
+Os ids são os da origem e só servem para ligar os registos entre si; na
+importação são remapeados para os novos. As querysets da exportação são
+lidas com `.iterator(chunk_size=...)`, pelo que a memória não cresce com o
+tamanho do projeto; a importação guarda apenas os mapas de ids. Sob ASGI, o
+Django juntaria em memória um iterador síncrono antes de o enviar: a view
+usa então `aexport_lines`, que lê os blocos numa thread e os vai enviando.
+
+Na importação:
+- as contas que não existam são criadas sem palavra-passe utilizável;
+- as tags existentes são reutilizadas (mantêm a sua cor);
+- um anexo só é importado se o seu conteúdo (Blob, pelo SHA-256) já
+  existir no destino, como num restauro no mesmo ambiente;
+- as datas de criação (e de envio dos anexos) são as da exportação;
+- o registo de alterações recebe o projeto, os membros e as tarefas, só
+  no fim (tudo é escrito com bulk_create, sem os signals).
+"""
+import json
+from collections import Counter, defaultdict
+from itertools import islice
+from asgiref.sync import sync_to_async
+from django.contrib.auth.hashers import make_password
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import F, Q
+from django.db.models.functions import Length
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.utils.encoders import JSONEncoder
+from backend.accounts.models import Account
+from backend.projects.catalogue import invalidate_tag_catalogue
+from backend.projects.changes import CREATED, record_change, record_task_changes
+from backend.projects.counters import reconcile_task_counters
+from backend.projects.membership import invalidate_project_roles
+from backend.projects.models import Attachment, Blob, Comment, Feedback, Project, ProjectMember, Tag, Task
+from backend.projects.tree import child_path
+
+FORMAT_VERSION = 1
+EXPORT_CHUNK_SIZE = 2000
+
+ACCOUNT_FIELDS = ('email', 'first_name', 'last_name', 'job_title')
+PROJECT_FIELDS = (
+    'name', 'description', 'status', 'is_archived', 'start_date', 'due_date',
+    'budget', 'repository_url', 'live_url',
+)
+FEEDBACK_FIELDS = ('summary', 'description', 'feedback_type', 'status')
+TASK_FIELDS = (
+    'title', 'description', 'status', 'priority', 'start_date', 'due_date',
+    'estimated_hours',
+)
+
+# Modelos a que comentários e anexos podem estar ligados, pelo nome no registo
+TARGET_MODELS = {'project': Project, 'task': Task, 'feedback': Feedback}
+
+
+class ProjectImportError(Exception):
+    """Ficheiro inválido ou incoerente; a importação é desfeita."""
+
+
+def attached_to(project):
+    """Filtro dos comentários/anexos ligados ao projeto, às suas tarefas e feedbacks."""
+    content_types = ContentType.objects.get_for_models(*TARGET_MODELS.values())
+    return (
+        Q(content_type=content_types[Project], object_id=project.pk)
+        | Q(content_type=content_types[Task], object_id__in=Task.objects.filter(project=project).values('pk'))
+        | Q(content_type=content_types[Feedback], object_id__in=project.feedbacks.values('pk'))
+    )
+
+
+def _rows(queryset, chunk_size, **renames):
+    """Linhas de `values()` lidas aos blocos, com as chaves renomeadas."""
+    for row in queryset.iterator(chunk_size=chunk_size):
+        for old, new in renames.items():
+            row[new] = row.pop(old)
+        yield row
+
+
+def export_records(project, chunk_size=EXPORT_CHUNK_SIZE):
+    """Registos da exportação do projeto, pela ordem do formato (ver acima)."""
+    yield {'type': 'export', 'version': FORMAT_VERSION, 'exported_at': timezone.now()}
+
+    comments = Comment.objects.filter(attached_to(project))
+    attachments = Attachment.objects.filter(attached_to(project))
+    tasks = Task.objects.filter(project=project)
+    accounts = Account.objects.filter(
+        Q(pk=project.owner_id)
+        | Q(pk__in=ProjectMember.objects.filter(project=project).values('user'))
+        | Q(pk__in=tasks.values('assignee'))
+        | Q(pk__in=project.feedbacks.values('submitted_by'))
+        | Q(pk__in=comments.values('author'))
+        | Q(pk__in=attachments.values('uploaded_by'))
+    )
+    for row in _rows(accounts.order_by('pk').values(*ACCOUNT_FIELDS), chunk_size):
+        yield {'type': 'account', **row}
+
+    tags = Tag.objects.filter(Q(project=project) | Q(task__project=project)).distinct()
+    for row in _rows(tags.order_by('name').values('name', 'color'), chunk_size):
+        yield {'type': 'tag', **row}
+
+    yield {
+        'type': 'project',
+        'id': project.pk,
+        'owner': project.owner.email,
+        'tags': sorted(project.tags.values_list('name', flat=True)),
+        **{field: getattr(project, field) for field in PROJECT_FIELDS},
+    }
+
+    members = ProjectMember.objects.filter(project=project).order_by('pk').values('user__email', 'role')
+    for row in _rows(members, chunk_size, user__email='user'):
+        yield {'type': 'member', **row}
+
+    feedbacks = project.feedbacks.order_by('pk').values('id', *FEEDBACK_FIELDS, 'created_at', 'submitted_by__email')
+    for row in _rows(feedbacks, chunk_size, submitted_by__email='submitted_by'):
+        yield {'type': 'feedback', **row}
+
+    # Um pai tem sempre um caminho mais curto do que os filhos
+    tasks_by_depth = tasks.order_by(Length('path'), 'pk').values(
+        'id', *TASK_FIELDS, 'created_at', 'parent_task_id', 'assignee__email', 'originating_feedback_id',
+    )
+    renames = {'parent_task_id': 'parent', 'assignee__email': 'assignee', 'originating_feedback_id': 'feedback'}
+    for row in _rows(tasks_by_depth, chunk_size, **renames):
+        yield {'type': 'task', **row}
+
+    task_tags = Task.tags.through.objects.filter(task__project=project).order_by('pk').values('task_id', 'tag__name')
+    for row in _rows(task_tags, chunk_size, task_id='task', tag__name='tag'):
+        yield {'type': 'task_tag', **row}
+
+    content_types = ContentType.objects.get_for_models(*TARGET_MODELS.values())
+    targets = {content_types[model].pk: name for name, model in TARGET_MODELS.items()}
+    comment_rows = comments.order_by('created_at', 'pk').values(
+        'author__email', 'text', 'created_at', 'content_type_id', 'object_id',
+    )
+    for row in _rows(comment_rows, chunk_size, author__email='author', object_id='target_id'):
+        yield {'type': 'comment', 'target': targets[row.pop('content_type_id')], **row}
+
+    attachment_rows = attachments.order_by('pk').values(
+        'uploaded_by__email', 'original_name', 'description', 'uploaded_at',
+        'blob__sha256', 'blob__size', 'content_type_id', 'object_id',
+    )
+    renames = {
+        'uploaded_by__email': 'uploaded_by', 'blob__sha256': 'sha256', 'blob__size': 'size', 'object_id': 'target_id',
+    }
+    for row in _rows(attachment_rows, chunk_size, **renames):
+        yield {'type': 'attachment', 'target': targets[row.pop('content_type_id')], **row}
+
+
+def export_lines(project, chunk_size=EXPORT_CHUNK_SIZE):
+    """A exportação em NDJSON, uma linha (bytes) por registo."""
+    for record in export_records(project, chunk_size):
+        yield (json.dumps(record, cls=JSONEncoder, ensure_ascii=False) + '\n').encode()
+
+
+async def aexport_lines(project, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    `export_lines` para ASGI: cada bloco de `chunk_size` linhas é lido na
+    thread das queries (sync_to_async) e enviado antes de se ler o seguinte.
+    """
+    lines = export_lines(project, chunk_size)
+    read_chunk = sync_to_async(lambda: b''.join(islice(lines, chunk_size)))
+    try:
+        while chunk := await read_chunk():
+            yield chunk
+    finally:
+        # Liberta o cursor se o cliente desligar a meio
+        await sync_to_async(lines.close)()
+
+
+def restore_dates(objects, records, field, batch_size):
+    """
+    Repõe em `field` as datas da exportação: o bulk_create grava as da
+    importação (auto_now_add). Um UPDATE por bloco.
+    """
+    changed = []
+    for obj, record in zip(objects, records):
+        value = parse_datetime(record[field]) if record.get(field) else None
+        if value is not None:
+            setattr(obj, field, value)
+            changed.append(obj)
+    if changed:
+        type(changed[0]).objects.bulk_update(changed, [field], batch_size=batch_size)
+
+
+class ProjectImporter:
+    """
+    Carrega uma exportação num projeto novo. Os registos de cada tipo são
+    acumulados e escritos com bulk_create em blocos de `batch_size`; deve
+    correr numa transação (ver o comando import_project).
+    """
+    # Ordem dos registos e dos blocos pendentes: cada tipo depende dos anteriores
+    TYPES = ('export', 'account', 'tag', 'project', 'member', 'feedback', 'task', 'task_tag', 'comment', 'attachment')
+
+    def __init__(self, owner=None, batch_size=1000):
+        self.owner = owner
+        self.batch_size = batch_size
+        self.project = None
+        self.users = {}
+        self.tags = {}
+        self.feedbacks = {}
+        # id antigo -> (id novo, caminho novo)
+        self.tasks = {}
+        # sha256 -> Blob existente no destino (None se não existir)
+        self.blobs = {}
+        self.blob_references = Counter()
+        self.pending = defaultdict(list)
+        self.stats = Counter()
+        self.position = 0
+        self.content_types = ContentType.objects.get_for_models(*TARGET_MODELS.values())
+
+    def load(self, lines):
+        """Importa as linhas (str ou bytes) e devolve o projeto criado."""
+        for number, line in enumerate(lines, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                kind = record.pop('type')
+                position = self.TYPES.index(kind)
+            except (ValueError, KeyError, AttributeError, TypeError):
+                raise ProjectImportError(f"Linha {number}: registo inválido.")
+            if position < self.position:
+                raise ProjectImportError(f"Linha {number}: registo '{kind}' fora de ordem.")
+            if position > self.position:
+                self.flush()
+                self.position = position
+            if kind != 'export' and self.stats['export'] == 0:
+                raise ProjectImportError("O ficheiro não começa por um registo 'export'.")
+            try:
+                getattr(self, f'load_{kind}')(record)
+            except KeyError as error:
+                raise ProjectImportError(f"Linha {number}: referência ou campo em falta ({error}).")
+            self.stats[kind] += 1
+        return self.finish()
+
+    def flush(self):
+        for kind in self.TYPES:
+            if self.pending[kind]:
+                getattr(self, f'flush_{kind}')()
+
+    def finish(self):
+        self.flush()
+        if self.project is None:
+            raise ProjectImportError("O ficheiro não tem nenhum registo 'project'.")
+        if self.owner is not None:
+            ProjectMember.objects.bulk_create(
+                [ProjectMember(project=self.project, user=self.owner, role=ProjectMember.Role.ADMIN)],
+                update_conflicts=True, unique_fields=['project', 'user'], update_fields=['role'],
+            )
+        for blob_id, count in self.blob_references.items():
+            Blob.objects.filter(pk=blob_id).update(ref_count=F('ref_count') + count)
+        reconcile_task_counters(Project, Task, project_ids=[self.project.pk])
+
+        # Registadas no fim, junto ao commit: a importação pode demorar mais do
+        # que CHANGE_LOG_SETTLE_SECONDS (ver changes.py)
+        members = list(ProjectMember.objects.filter(project=self.project).order_by('pk'))
+        record_change(self.project, CREATED)
+        for member in members:
+            record_change(member, CREATED)
+        record_task_changes(self.project.tasks.order_by('pk').only('pk', 'project_id'), CREATED)
+        invalidate_project_roles(self.project.owner_id, *(member.user_id for member in members))
+        invalidate_tag_catalogue()
+        return self.project
+
+    def user_id(self, email):
+        return None if email is None else self.users[email]
+
+    # -- registos -----------------------------------------------------------
+
+    def load_export(self, record):
+        if record.get('version') != FORMAT_VERSION:
+            raise ProjectImportError(f"Versão do formato não suportada: {record.get('version')}.")
+
+    def load_account(self, record):
+        self.pending['account'].append(record)
+
+    def flush_account(self):
+        records = {record['email']: record for record in self.pending.pop('account')}
+        self.users.update(Account.objects.filter(email__in=records).values_list('email', 'pk'))
+        unusable = make_password(None)
+        missing = [
+            Account(password=unusable, **{field: record.get(field, '') for field in ACCOUNT_FIELDS})
+            for email, record in records.items() if email not in self.users
+        ]
+        for account in Account.objects.bulk_create(missing, batch_size=self.batch_size):
+            self.users[account.email] = account.pk
+        self.stats['accounts_created'] += len(missing)
+
+    def load_tag(self, record):
+        self.pending['tag'].append(record)
+
+    def flush_tag(self):
+        records = self.pending.pop('tag')
+        Tag.objects.bulk_create(
+            [Tag(name=record['name'], color=record['color']) for record in records],
+            batch_size=self.batch_size,
+            ignore_conflicts=True,
+        )
+        self.tags.update(Tag.objects.filter(name__in=[record['name'] for record in records]).values_list('name', 'pk'))
+
+    def load_project(self, record):
+        if self.project is not None:
+            raise ProjectImportError("O ficheiro tem mais de um registo 'project'.")
+        owner_id = self.owner.pk if self.owner is not None else self.user_id(record['owner'])
+        # Sem signals: as alterações e as caches de papéis ficam para finish()
+        self.project, = Project.objects.bulk_create([
+            Project(owner_id=owner_id, **{field: record[field] for field in PROJECT_FIELDS if field in record})
+        ])
+        through = Project.tags.through
+        through.objects.bulk_create([
+            through(project_id=self.project.pk, tag_id=self.tags[name]) for name in record.get('tags', [])
+        ])
+
+    def load_member(self, record):
+        self.pending['member'].append(record)
+
+    def flush_member(self):
+        ProjectMember.objects.bulk_create([
+            ProjectMember(project=self.project, user_id=self.user_id(record['user']), role=record['role'])
+            for record in self.pending.pop('member')
+        ], ignore_conflicts=True)
+
+    def load_feedback(self, record):
+        self.pending['feedback'].append(record)
+        if len(self.pending['feedback']) >= self.batch_size:
+            self.flush_feedback()
+
+    def flush_feedback(self):
+        records = self.pending.pop('feedback')
+        feedbacks = Feedback.objects.bulk_create([
+            Feedback(
+                project=self.project,
+                submitted_by_id=self.user_id(record['submitted_by']),
+                **{field: record[field] for field in FEEDBACK_FIELDS},
+            )
+            for record in records
+        ])
+        for record, feedback in zip(records, feedbacks):
+            self.feedbacks[record['id']] = feedback.pk
+        restore_dates(feedbacks, records, 'created_at', self.batch_size)
+
+    def load_task(self, record):
+        # O pai tem de existir para se saber o id e o caminho do filho
+        if record['parent'] is not None and record['parent'] not in self.tasks:
+            if not any(task['id'] == record['parent'] for task in self.pending['task']):
+                raise ProjectImportError(f"Tarefa {record['id']}: o pai {record['parent']} não aparece antes.")
+            self.flush_task()
+        self.pending['task'].append(record)
+        if len(self.pending['task']) >= self.batch_size:
+            self.flush_task()
+
+    def flush_task(self):
+        records = self.pending.pop('task')
+        tasks = []
+        for record in records:
+            parent = None
+            if record['parent'] is not None:
+                parent = Task(pk=self.tasks[record['parent']][0], path=self.tasks[record['parent']][1])
+            tasks.append(Task(
+                project=self.project,
+                parent_task_id=parent.pk if parent else None,
+                path=child_path(parent) if parent else '',
+                assignee_id=self.user_id(record['assignee']),
+                originating_feedback_id=self.feedbacks[record['feedback']] if record['feedback'] else None,
+                **{field: record[field] for field in TASK_FIELDS},
+            ))
+        tasks = Task.objects.bulk_create(tasks, batch_size=self.batch_size)
+        for record, task in zip(records, tasks):
+            self.tasks[record['id']] = (task.pk, task.path)
+        restore_dates(tasks, records, 'created_at', self.batch_size)
+
+    def load_task_tag(self, record):
+        self.pending['task_tag'].append(record)
+        if len(self.pending['task_tag']) >= self.batch_size:
+            self.flush_task_tag()
+
+    def flush_task_tag(self):
+        through = Task.tags.through
+        through.objects.bulk_create([
+            through(task_id=self.tasks[record['task']][0], tag_id=self.tags[record['tag']])
+            for record in self.pending.pop('task_tag')
+        ], ignore_conflicts=True)
+
+    def target(self, record):
+        """(content_type, id novo) do objeto a que o comentário/anexo está ligado."""
+        kind, old_id = record['target'], record['target_id']
+        if kind == 'project':
+            new_id = self.project.pk
+        elif kind == 'task':
+            new_id = self.tasks[old_id][0]
+        else:
+            new_id = self.feedbacks[old_id]
+        return self.content_types[TARGET_MODELS[kind]], new_id
+
+    def load_comment(self, record):
+        self.pending['comment'].append(record)
+        if len(self.pending['comment']) >= self.batch_size:
+            self.flush_comment()
+
+    def flush_comment(self):
+        records = self.pending.pop('comment')
+        comments = []
+        for record in records:
+            content_type, object_id = self.target(record)
+            comments.append(Comment(
+                author_id=self.user_id(record['author']), text=record['text'],
+                content_type=content_type, object_id=object_id,
+            ))
+        comments = Comment.objects.bulk_create(comments)
+        restore_dates(comments, records, 'created_at', self.batch_size)
+
+    def load_attachment(self, record):
+        self.pending['attachment'].append(record)
+        if len(self.pending['attachment']) >= self.batch_size:
+            self.flush_attachment()
+
+    def flush_attachment(self):
+        records = self.pending.pop('attachment')
+        missing = {record['sha256'] for record in records} - set(self.blobs)
+        self.blobs.update(dict.fromkeys(missing))
+        self.blobs.update({blob.sha256: blob for blob in Blob.objects.filter(sha256__in=missing)})
+
+        attachments, imported = [], []
+        for record in records:
+            blob = self.blobs[record['sha256']]
+            if blob is None:
+                # Sem o conteúdo no destino, o anexo ficaria sem ficheiro
+                self.stats['attachments_skipped'] += 1
+                continue
+            imported.append(record)
+            content_type, object_id = self.target(record)
+            attachments.append(Attachment(
+                uploaded_by_id=self.user_id(record['uploaded_by']),
+                file=blob.file.name,
+                blob=blob,
+                original_name=record['original_name'],
+                description=record['description'],
+                content_type=content_type,
+                object_id=object_id,
+            ))
+        attachments = Attachment.objects.bulk_create(attachments)
+        restore_dates(attachments, imported, 'uploaded_at', self.batch_size)
+        self.stats['attachments_imported'] += len(attachments)
+        for attachment in attachments:
+            self.blob_references[attachment.blob_id] += 1
@@ -0,0 +1,90 @@
+"""
+Utilitários para a hierarquia de tarefas (Task.parent_task).
+
+A hierarquia é indexada com um "materialized path": cada tarefa guarda em
+`Task.path` os IDs dos seus antecessores, da raiz até ao pai, no formato
+'1/5/12/'. Uma tarefa raiz tem o caminho vazio. Assim:
+
+- os descendentes de uma tarefa T são as tarefas cujo `path` começa por
+  `T.path + f'{T.id}/'` (uma única query indexada);
+- a árvore completa de um projeto sai de uma única query por `project_id`
+  e é remontada em memória em O(n) com `build_task_tree`.
+"""
+
+PATH_SEPARATOR = '/'
+
+
+def child_path(parent):
+    """Devolve o caminho que os filhos diretos de `parent` devem ter."""
+    return f'{parent.path}{parent.pk}{PATH_SEPARATOR}'
+
+
+def compute_paths(pairs):
+    """
+    Recebe pares (id, parent_id) e devolve {id: path}.
+    Ciclos ou pais inexistentes são tratados como raízes.
+    """
+    parents = dict(pairs)
+    paths = {}
+
+    for node_id in parents:
+        # Sobe até encontrar um antecessor já resolvido (ou a raiz)
+        chain = []
+        seen = set()
+        current = node_id
+        while current is not None and current not in paths:
+            if current in seen or current not in parents:
+                current = None
+                break
+            seen.add(current)
+            chain.append(current)
+            current = parents[current]
+
+        for ancestor_id in reversed(chain):
+            parent_id = parents[ancestor_id]
+            if parent_id is not None and parent_id in paths:
+                prefix = paths[parent_id] + f'{parent_id}{PATH_SEPARATOR}'
+            else:
+                prefix = ''
+            paths[ancestor_id] = prefix
+
+    return paths
+
+
+def rebuild_task_paths(task_model, batch_size=1000):
+    """
+    Recalcula `path` para todas as tarefas a partir de `parent_task`.
+    Aceita o modelo histórico das migrações. Devolve o número de
+    tarefas cujo caminho foi corrigido.
+    """
+    rows = list(task_model.objects.values_list('id', 'parent_task_id', 'path'))
+    paths = compute_paths((task_id, parent_id) for task_id, parent_id, _ in rows)
+
+    stale = [
+        task_model(id=task_id, path=paths[task_id])
+        for task_id, _, current in rows
+        if paths[task_id] != current
+    ]
+    task_model.objects.bulk_update(stale, ['path'], batch_size=batch_size)
+    return len(stale)
+
+
+def build_task_tree(tasks):
+    """
+    Liga em memória cada tarefa aos seus filhos presentes em `tasks`
+    (preenchendo `subtask_list`) e devolve as tarefas cujo pai não está
+    no conjunto. A ordem original de `tasks` é preservada.
+    """
+    by_id = {}
+    for task in tasks:
+        task._subtask_list = []
+        by_id[task.pk] = task
+
+    roots = []
+    for task in by_id.values():
+        parent = by_id.get(task.parent_task_id)
+        if parent is None:
+            roots.append(task)
+        else:
+            parent._subtask_list.append(task)
+    return roots
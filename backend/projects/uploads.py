@@ -0,0 +1,285 @@
+"""
+Armazenamento de anexos por conteúdo (deduplicado) e uploads em partes.
+
+Cada ficheiro é identificado pelo seu SHA-256 e guardado uma única vez
+como Blob ('blobs/ab/cd/<sha256>'). Os Attachment apontam para o Blob e
+`Blob.ref_count` é mantido pelos signals de Attachment.
+
+Os uploads em partes acrescentam cada parte a um ficheiro temporário,
+atualizando o SHA-256 à medida que os bytes chegam. O estado do hash fica
+em memória no processo; se a parte seguinte chegar a outro processo, o
+hash é recalculado a partir do ficheiro parcial já recebido.
+
+Uma sessão sem partes novas durante CHUNKED_UPLOAD_EXPIRY_HOURS expira: deixa
+de aceitar partes e é apagada, com o ficheiro parcial, pelo comando
+prune_upload_sessions.
+
+A sessão só é bloqueada (select_for_update) por instantes: para reservar
+o offset, marcando-a com um `claim`, e para registar os bytes escritos.
+A parte é lida do pedido e escrita entre as duas transações; uma reserva
+com mais de CHUNKED_UPLOAD_CLAIM_TIMEOUT segundos é dada como abandonada.
+"""
+import datetime
+import hashlib
+import os
+import shutil
+import threading
+import uuid
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from backend.projects.models import Attachment, Blob, UploadSession, get_blob_path
+
+CHUNK_SIZE = 64 * 1024
+
+
+class UploadOffsetMismatch(Exception):
+    """A parte recebida não começa onde o upload parou."""
+
+    def __init__(self, expected):
+        super().__init__(f"Offset esperado: {expected}")
+        self.expected = expected
+
+
+class UploadInProgress(UploadOffsetMismatch):
+    """Outra parte está a ser escrita neste offset."""
+
+
+class UploadTooLarge(Exception):
+    """A parte recebida ultrapassa o tamanho declarado do upload."""
+
+
+# {session_id: (hasher, bytes já incluídos no hash)}
+_hashers = {}
+_hashers_lock = threading.Lock()
+
+
+def temp_dir():
+    return settings.CHUNKED_UPLOAD_TEMP_DIR
+
+
+def part_path(session):
+    return os.path.join(temp_dir(), f'{session.pk}.part')
+
+
+def hash_stream(stream, hasher=None):
+    """Lê `stream` em blocos e devolve (hasher, bytes lidos)."""
+    hasher = hasher or hashlib.sha256()
+    total = 0
+    for chunk in iter(lambda: stream.read(CHUNK_SIZE), b''):
+        hasher.update(chunk)
+        total += len(chunk)
+    return hasher, total
+
+
+def _session_hasher(session):
+    """
+    Devolve o hash do que já foi recebido. Reutiliza o estado em memória
+    quando corresponde ao offset atual; caso contrário relê o ficheiro.
+    """
+    with _hashers_lock:
+        cached = _hashers.get(session.pk)
+    if cached is not None and cached[1] == session.received:
+        # Cópia: se esta parte falhar, o estado guardado fica intacto
+        return cached[0].copy()
+
+    path = part_path(session)
+    if not os.path.exists(path):
+        return hashlib.sha256()
+    with open(path, 'rb') as part:
+        hasher, _ = hash_stream(part)
+    return hasher
+
+
+def expiry_cutoff(hours=None):
+    """Instante antes do qual uma sessão sem atividade está expirada."""
+    hours = settings.CHUNKED_UPLOAD_EXPIRY_HOURS if hours is None else hours
+    return timezone.now() - datetime.timedelta(hours=hours)
+
+
+def prune_uploads(hours=None):
+    """
+    Apaga as sessões expiradas e os ficheiros parciais sem sessão (ex: de
+    uma sessão apagada à mão). Devolve (sessões, ficheiros) apagados.
+    """
+    cutoff = expiry_cutoff(hours)
+    sessions = 0
+    for session in UploadSession.objects.filter(updated_at__lt=cutoff).iterator():
+        abort_upload(session)
+        sessions += 1
+
+    files = 0
+    if os.path.isdir(temp_dir()):
+        live = {str(pk) for pk in UploadSession.objects.values_list('pk', flat=True)}
+        for entry in os.scandir(temp_dir()):
+            name, extension = os.path.splitext(entry.name)
+            if extension != '.part' or name in live:
+                continue
+            if entry.stat().st_mtime < cutoff.timestamp():
+                os.remove(entry.path)
+                files += 1
+    return sessions, files
+
+
+def start_upload(uploaded_by, content_object, filename, size, description=''):
+    session = UploadSession.objects.create(
+        uploaded_by=uploaded_by,
+        content_object=content_object,
+        filename=filename,
+        size=size,
+        description=description,
+    )
+    os.makedirs(temp_dir(), exist_ok=True)
+    open(part_path(session), 'wb').close()
+    return session
+
+
+def append_chunk(session_id, offset, stream):
+    """
+    Acrescenta os bytes de `stream` ao upload, a partir de `offset`.
+    Quando o upload fica completo, cria e devolve o Attachment; caso
+    contrário devolve None. A sessão atualizada é devolvida em ambos.
+    """
+    session = _claim_offset(session_id, offset)
+    try:
+        hasher, written = _write_chunk(session, stream)
+    except BaseException:
+        UploadSession.objects.filter(pk=session.pk, claim=session.claim).update(claim=None)
+        raise
+
+    with transaction.atomic():
+        claim = session.claim
+        session = UploadSession.objects.select_for_update().get(pk=session_id)
+        if session.claim != claim:
+            # A reserva expirou e outra parte tomou o lugar desta
+            raise UploadOffsetMismatch(session.received)
+        session.received += written
+        session.claim = None
+        session.save(update_fields=['received', 'claim', 'updated_at'])
+
+        if not session.is_complete:
+            with _hashers_lock:
+                _hashers[session.pk] = (hasher, session.received)
+            return session, None
+
+        with _hashers_lock:
+            _hashers.pop(session.pk, None)
+        attachment = _finish_upload(session, hasher.hexdigest())
+    return session, attachment
+
+
+def _claim_offset(session_id, offset):
+    """Valida o offset e reserva a sessão para a parte que vai ser escrita."""
+    with transaction.atomic():
+        session = UploadSession.objects.select_for_update().get(pk=session_id)
+        if offset != session.received:
+            raise UploadOffsetMismatch(session.received)
+        abandoned = timezone.now() - datetime.timedelta(seconds=settings.CHUNKED_UPLOAD_CLAIM_TIMEOUT)
+        if session.claim is not None and session.updated_at >= abandoned:
+            raise UploadInProgress(session.received)
+        session.claim = uuid.uuid4()
+        session.save(update_fields=['claim', 'updated_at'])
+    return session
+
+
+def _write_chunk(session, stream):
+    """Escreve a parte no ficheiro temporário e devolve (hasher, bytes escritos)."""
+    hasher = _session_hasher(session)
+    remaining = session.size - session.received
+    written = 0
+    with open(part_path(session), 'r+b') as part:
+        # Descarta bytes de uma tentativa anterior que não foi registada
+        part.truncate(session.received)
+        part.seek(session.received)
+        for chunk in iter(lambda: stream.read(CHUNK_SIZE), b''):
+            written += len(chunk)
+            if written > remaining:
+                part.truncate(session.received)
+                raise UploadTooLarge()
+            part.write(chunk)
+            hasher.update(chunk)
+    return hasher, written
+
+
+def abort_upload(session):
+    with _hashers_lock:
+        _hashers.pop(session.pk, None)
+    path = part_path(session)
+    session.delete()
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def _finish_upload(session, sha256):
+    path = part_path(session)
+    blob = store_blob(sha256, session.size, path, move=True)
+    attachment = create_attachment(
+        blob,
+        uploaded_by=session.uploaded_by,
+        content_object=session.content_object,
+        original_name=session.filename,
+        description=session.description,
+    )
+    session.delete()
+    if os.path.exists(path):
+        os.remove(path)
+    return attachment
+
+
+def store_blob(sha256, size, source_path=None, source_file=None, move=False):
+    """
+    Devolve o Blob com este conteúdo, guardando o ficheiro apenas se ainda
+    não existir. `source_path` (ficheiro local) pode ser movido em vez de
+    copiado quando o storage é local.
+    """
+    with transaction.atomic():
+        blob = Blob.objects.select_for_update().filter(sha256=sha256).first()
+        if blob is not None:
+            return blob
+
+        name = get_blob_path(sha256)
+        if source_path is not None and move and hasattr(default_storage, 'path'):
+            target = default_storage.path(name)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            # O diretório temporário pode estar noutro sistema de ficheiros
+            shutil.move(source_path, target)
+        elif source_path is not None:
+            with open(source_path, 'rb') as source:
+                name = default_storage.save(name, File(source))
+        else:
+            source_file.seek(0)
+            name = default_storage.save(name, source_file)
+
+        try:
+            with transaction.atomic():
+                return Blob.objects.create(sha256=sha256, size=size, file=name)
+        except IntegrityError:
+            # Outro pedido guardou o mesmo conteúdo entretanto
+            if name != get_blob_path(sha256):
+                default_storage.delete(name)
+            return Blob.objects.get(sha256=sha256)
+
+
+def store_uploaded_file(uploaded_file):
+    """Guarda um ficheiro recebido num único pedido (multipart) como Blob."""
+    uploaded_file.seek(0)
+    hasher, size = hash_stream(uploaded_file)
+    return store_blob(hasher.hexdigest(), size, source_file=uploaded_file)
+
+
+def create_attachment(blob, uploaded_by, content_object, original_name='', description=''):
+    """
+    Cria um anexo que partilha o ficheiro do Blob. Os signals (ref_count,
+    registo de alterações) correm na mesma transação.
+    """
+    with transaction.atomic():
+        return Attachment.objects.create(
+            blob=blob,
+            file=blob.file.name,
+            original_name=original_name,
+            description=description,
+            uploaded_by=uploaded_by,
+            content_object=content_object,
+        )
@@ -1,19 +1,24 @@
 from django.urls import path, include
 from rest_framework_nested.routers import NestedDefaultRouter
 from rest_framework.routers import DefaultRouter
-from backend.projects.views import ProjectViewSet, TaskViewSet, TagViewSet
+from backend.projects.views import ProjectViewSet, TaskViewSet, TagViewSet, UploadViewSet, AttachmentViewSet, SearchView, DashboardView, ChangesView
 
 
 router = DefaultRouter()
 router.register(r'projects', ProjectViewSet, basename='project')
 router.register(r'tasks', TaskViewSet, basename='task')
 router.register(r'tags', TagViewSet, basename='tag')
+router.register(r'uploads', UploadViewSet, basename='upload')
+router.register(r'attachments', AttachmentViewSet, basename='attachment')
 
 tasks_router = NestedDefaultRouter(router, r'projects', lookup='project')
 tasks_router.register(r'tasks', TaskViewSet, basename='project-tasks')
 
 
 urlpatterns = [
+    path('search/', SearchView.as_view(), name='search'),
+    path('dashboard/', DashboardView.as_view(), name='dashboard'),
+    path('changes/', ChangesView.as_view(), name='changes'),
     path('', include(router.urls)),
     path('', include(tasks_router.urls)),
 ]
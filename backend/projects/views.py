@@ -1,14 +1,118 @@
-from rest_framework import viewsets, permissions, status
+import io
+from datetime import date
+from rest_framework import mixins, viewsets, permissions, status
+from rest_framework.exceptions import NotFound
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from rest_framework.parsers import MultiPartParser, FormParser
-from django.db.models import Q
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Count, Max, OuterRef, Prefetch, Q, Sum, prefetch_related_objects
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
 from django.contrib.contenttypes.models import ContentType
-from backend.projects.models import Project, ProjectMember, Task, Tag, Attachment, Comment
-from backend.projects.serializers import ProjectListSerializer, ProjectDetailSerializer, TaskListSerializer, TaskDetailSerializer, TaskTagActionSerializer, TagSerializer, CommentSerializer, AttachmentSerializer, CommentCreateSerializer, AttachmentCreateSerializer
+from django.utils.cache import get_conditional_response
+from backend.accounts.models import Account
+from backend.projects.models import Project, ProjectMember, Task, Tag, Attachment, Comment, Feedback, UploadSession
+from backend.projects.serializers import ProjectListSerializer, ProjectDetailSerializer, TaskListSerializer, TaskDetailSerializer, TaskTagActionSerializer, TaskBulkTagSerializer, TagSerializer, CommentSerializer, AttachmentSerializer, CommentCreateSerializer, AttachmentCreateSerializer, UploadStartSerializer, UploadSessionSerializer, SearchQuerySerializer, ChangesQuerySerializer
 from backend.projects.permissions import IsMemberOrOwner, IsProjectAdminOrOwner
+from backend.projects.membership import get_project_roles
+from backend.projects.catalogue import (
+    get_cached_tag_response, set_cached_tag_response, tag_catalogue_etag, tag_catalogue_version
+)
+from backend.projects.pagination import KeysetPagination
+from backend.projects.conditional import ConditionalGetMixin, latest, latest_for
+from backend.projects.counters import counter_fields
+from backend.projects.tree import build_task_tree
+from backend.projects import fast_lists
+from backend.projects.downloads import serve_attachment
+from backend.projects.search import search
+from backend.projects.dashboard import get_dashboard
+from backend.projects.changes import AtomicWritesMixin, changes_since
+from backend.projects.bulk import TaskBulkError, apply_tag_changes, run_task_operations
+from backend.projects.transfer import aexport_lines, export_lines
+from backend.projects.uploads import (
+    UploadOffsetMismatch, UploadTooLarge, abort_upload, append_chunk, create_attachment,
+    expiry_cutoff, start_upload, store_uploaded_file
+)
 
-class ProjectViewSet(viewsets.ModelViewSet):
+def project_list_validators():
+    """Agregações de que a lista de projetos depende (ver conditional.py)."""
+    return dict(
+        projects=Count('id'),
+        ids=Sum('id'),
+        updated_at=Max('updated_at'),
+        owners_updated=Max('owner__updated_at'),
+        tasks_total=Sum('tasks_total'),
+        tasks_updated=Max(latest_for(Task, 'updated_at', project_id='pk')),
+        members_updated=Max(latest_for(ProjectMember, 'user__updated_at', project_id='pk')),
+    )
+
+
+def project_detail_validators(projects, pk):
+    return projects.filter(pk=pk).values(
+        'updated_at', 'owner__updated_at', *counter_fields(Task)
+    ).annotate(
+        tasks_updated=latest_for(Task, 'updated_at', project_id='pk'),
+        members_updated=latest_for(ProjectMember, 'user__updated_at', project_id='pk'),
+    )
+
+
+def with_project_detail_validators(validators, tags_version):
+    if validators is not None:
+        validators['tags_version'] = tags_version
+        # `days_remaining` muda com o dia
+        validators['today'] = date.today()
+    return validators
+
+
+def plan_projects(queryset, action):
+    """
+    Planeia os select_related/prefetch_related de acordo com o
+    serializer da ação, para que o número de queries seja fixo
+    independentemente do número de projetos devolvidos.
+    """
+    queryset = queryset.select_related('owner')
+    if action == 'list':
+        return queryset.with_activity_counts().prefetch_related(
+            Prefetch(
+                'members',
+                queryset=Account.objects.only(
+                    'id', 'first_name', 'last_name', 'profile_picture', 'thumbnail_source'
+                ).order_by('id')
+            )
+        )
+    return queryset.prefetch_related(
+        'tags',
+        Prefetch(
+            'projectmember_set',
+            queryset=ProjectMember.objects.select_related('user')
+        )
+    )
+
+
+def tasks_list_scope(tasks, project_pk=None):
+    # A lista aninhada inclui as subtarefas: o âmbito é o projeto inteiro
+    return tasks if project_pk is None else tasks.filter(project_id=project_pk)
+
+
+def task_activity(model):
+    """Comentários ou anexos da tarefa exterior (para subqueries correlacionadas)."""
+    return model.objects.filter(content_type=ContentType.objects.get_for_model(Task), object_id=OuterRef('pk'))
+
+
+def task_list_validators():
+    return dict(
+        tasks=Count('id'),
+        ids=Sum('id'),
+        updated_at=Max('updated_at'),
+        assignees_updated=Max('assignee__updated_at'),
+    )
+
+
+class ProjectViewSet(AtomicWritesMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     """
     ViewSet para gerir Projetos.
     - List: Mostra todos os projetos em que o utilizador é membro ou dono.
@@ -16,20 +120,50 @@ class ProjectViewSet(viewsets.ModelViewSet):
     - Create: Permite que qualquer utilizador autenticado crie um projeto.
     - Update/Destroy: Permite alterações apenas por Admins ou pelo Dono.
     """
+    pagination_class = KeysetPagination
+
     def get_queryset(self):
         """
         Filtra o queryset para retornar apenas os projetos associados
         ao utilizador autenticado (seja como dono ou membro).
         Retorna todos os projetos para superutilizadores.
         """
-        user = self.request.user
-        if user.is_superuser:
+        return self.plan_queryset(self.visible_projects().order_by('-created_at'))
+
+    def list(self, request, *args, **kwargs):
+        if not settings.FAST_LIST_SERIALIZATION:
+            return super().list(request, *args, **kwargs)
+        # Mesmo JSON do ProjectListSerializer, sem instanciar modelos (ver fast_lists.py)
+        queryset = self.filter_queryset(self.visible_projects().order_by('-created_at'))
+        rows = self.paginate_queryset(fast_lists.project_rows(queryset))
+        return self.get_paginated_response(fast_lists.serialize_projects(rows, request))
+
+    def visible_projects(self):
+        if self.request.user.is_superuser:
             return Project.objects.all()
-        
-        # Filtra por projetos onde o utilizador é dono OU membro.
-        return Project.objects.filter(
-            Q(owner=user) | Q(members=user)
-        ).distinct().order_by('-created_at')
+        # Filtra por projetos onde o utilizador é dono OU membro,
+        # usando o mapa de papéis já carregado para este pedido.
+        return Project.objects.filter(pk__in=list(get_project_roles(self.request)))
+
+    def get_validators(self):
+        """
+        Valores de que a representação depende, numa única query: o
+        `updated_at` dos projetos (que reflete também membros, tags e
+        comentários), os contadores, e o último `updated_at` das tarefas
+        e das contas mostradas.
+        """
+        projects = self.visible_projects().order_by()
+        if self.action == 'list':
+            return projects.aggregate(**project_list_validators())
+
+        try:
+            validators = project_detail_validators(projects, self.kwargs['pk']).first()
+        except (ValueError, TypeError):
+            return None
+        return with_project_detail_validators(validators, tag_catalogue_version())
+
+    def plan_queryset(self, queryset):
+        return plan_projects(queryset, self.action)
 
     def get_serializer_class(self):
         """
@@ -67,6 +201,20 @@ class ProjectViewSet(viewsets.ModelViewSet):
             role=ProjectMember.Role.ADMIN
         )
 
+    @action(detail=True, methods=['get'], permission_classes=[IsProjectAdminOrOwner])
+    def export(self, request, pk=None):
+        """
+        Exporta o projeto completo em NDJSON (ver transfer.py), em streaming,
+        para ser carregado noutro ambiente com o comando import_project.
+        Sob ASGI, o streaming usa um gerador assíncrono: um síncrono seria
+        lido todo para memória antes de ser enviado.
+        """
+        project = self.get_object()
+        lines = aexport_lines(project) if isinstance(request._request, ASGIRequest) else export_lines(project)
+        response = StreamingHttpResponse(lines, content_type='application/x-ndjson')
+        response['Content-Disposition'] = f'attachment; filename="projeto-{project.pk}.ndjson"'
+        return response
+
 
 class TagViewSet(viewsets.ReadOnlyModelViewSet):
     """
@@ -76,15 +224,50 @@ class TagViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Tag.objects.all().order_by('name')
     serializer_class = TagSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request, *args, **kwargs)
+
+    def cached_response(self, view, request, *args, **kwargs):
+        """
+        Serve a resposta a partir da cache versionada do catálogo, ou
+        devolve 304 se o cliente já tiver a versão atual (ver catalogue.py).
+        """
+        version = tag_catalogue_version()
+        etag = tag_catalogue_etag(version)
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            not_modified['Cache-Control'] = 'private, no-cache'
+            return not_modified
 
+        url = request.build_absolute_uri()
+        data = get_cached_tag_response(version, url)
+        if data is not None:
+            response = Response(data)
+        else:
+            response = view(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            set_cached_tag_response(version, url, response.data)
 
-class TaskViewSet(viewsets.ModelViewSet):
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
+
+class TaskViewSet(AtomicWritesMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     """
     ViewSet para gerir Tarefas. Funciona tanto para rotas aninhadas
     (projects/1/tasks/) como para rotas diretas (tasks/42/).
     """
     serializer_class = TaskDetailSerializer # Usamos o serializer detalhado por padrão
     permission_classes = [IsMemberOrOwner]
+    pagination_class = KeysetPagination
+    MAX_BULK_OPERATIONS = 1000
 
     def get_queryset(self):
         """
@@ -92,20 +275,53 @@ class TaskViewSet(viewsets.ModelViewSet):
         Se a URL for aninhada, retorna apenas as tarefas principais do projeto.
         Se a URL for direta, retorna todas as tarefas a que o utilizador tem acesso.
         """
-        user = self.request.user
-        
         # Queryset base: todas as tarefas de projetos em que o utilizador é membro ou dono.
-        allowed_projects = Project.objects.filter(Q(owner=user) | Q(members=user))
-        queryset = Task.objects.filter(project__in=allowed_projects)
+        allowed_projects = list(get_project_roles(self.request))
+        queryset = Task.objects.filter(project_id__in=allowed_projects)
 
         # Se for um pedido de lista aninhado (ex: /projects/1/tasks/)
         if 'project_pk' in self.kwargs and self.action == 'list':
             project_id = self.kwargs['project_pk']
             # Filtra apenas as tarefas de nível superior daquele projeto específico
             return queryset.filter(project_id=project_id, parent_task__isnull=True)
-        
+
+        if self.action == 'retrieve':
+            # Comentários e anexos com os respetivos autores, em queries fixas
+            return queryset.select_related('assignee').prefetch_related(
+                'tags',
+                Prefetch('comments', queryset=Comment.objects.select_related('author')),
+                Prefetch('attachments', queryset=Attachment.objects.select_related('uploaded_by', 'blob')),
+            )
         return queryset
 
+    def get_validators(self):
+        """
+        Validadores numa única query: para a lista, o último `updated_at`
+        e a contagem das tarefas do âmbito (o projeto, se aninhada), já que
+        a página inclui as subtarefas; para o detalhe, o da própria tarefa
+        (que reflete também tags, comentários e anexos) e o das contas que
+        mostra.
+        """
+        tasks = Task.objects.filter(project_id__in=list(get_project_roles(self.request))).order_by()
+        try:
+            if self.action == 'list':
+                validators = tasks_list_scope(tasks, self.kwargs.get('project_pk')).aggregate(
+                    **task_list_validators()
+                )
+            else:
+                validators = tasks.filter(pk=self.kwargs['pk']).values(
+                    'updated_at', 'assignee__updated_at'
+                ).annotate(
+                    # Contas mostradas nos comentários e anexos (nome, foto e miniaturas)
+                    authors_updated=latest(task_activity(Comment), 'author__updated_at', 'object_id'),
+                    uploaders_updated=latest(task_activity(Attachment), 'uploaded_by__updated_at', 'object_id'),
+                ).first()
+        except (ValueError, TypeError):
+            return None
+        if validators is not None:
+            validators['tags_version'] = tag_catalogue_version()
+        return validators
+
     def get_serializer_class(self):
         """
         Retorna o serializer leve para a lista e o pesado para os detalhes.
@@ -116,6 +332,36 @@ class TaskViewSet(viewsets.ModelViewSet):
         # Para /tasks/42/ (retrieve, update, create)
         return TaskDetailSerializer
 
+    def list(self, request, *args, **kwargs):
+        """
+        Lista as tarefas (paginadas por cursor) com as subtarefas aninhadas.
+        Toda a hierarquia abaixo das tarefas da página é obtida numa única
+        query (via `path`) e montada em memória, em vez de uma query por nó.
+        """
+        if settings.FAST_LIST_SERIALIZATION:
+            # Mesmo JSON do TaskListSerializer, sem instanciar modelos (ver fast_lists.py)
+            rows = self.paginate_queryset(fast_lists.task_rows(self.filter_queryset(self.get_queryset())))
+            return self.get_paginated_response(fast_lists.serialize_tasks(rows, request))
+
+        queryset = self.filter_queryset(self.get_queryset()).select_related('assignee').with_activity_counts()
+        tasks = self.paginate_queryset(queryset)
+
+        # Descendentes das tarefas da página que ainda não estão na página
+        listed = {task.pk for task in tasks}
+        tops = [task for task in tasks if task.parent_task_id not in listed]
+        descendants = [
+            task
+            for task in Task.objects.descendants_of(*tops).select_related('assignee').with_activity_counts()
+            if task.pk not in listed
+        ]
+        nodes = tasks + descendants
+
+        # Uma única query de tags para todos os nós da árvore
+        prefetch_related_objects(nodes, 'tags')
+        build_task_tree(nodes)
+        serializer = self.get_serializer(tasks, many=True)
+        return self.get_paginated_response(serializer.data)
+
     def perform_create(self, serializer):
         """
         Associa a tarefa ao projeto correto ao ser criada.
@@ -125,6 +371,63 @@ class TaskViewSet(viewsets.ModelViewSet):
         # ser adicionada no serializer para maior segurança.
         serializer.save()
     
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk(self, request, *args, **kwargs):
+        """
+        Cria, atualiza e muda o estado de várias tarefas num único pedido.
+        Espera uma lista de operações (ver TaskBulkOperationSerializer).
+        As operações são todas aplicadas ou, se alguma for inválida,
+        nenhuma é, e os erros são devolvidos por índice.
+        """
+        operations = request.data
+        if not isinstance(operations, list):
+            return Response(
+                {'error': 'Esperada uma lista de operações.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(operations) > self.MAX_BULK_OPERATIONS:
+            return Response(
+                {'error': f'No máximo {self.MAX_BULK_OPERATIONS} operações por pedido.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            results = run_task_operations(operations, get_project_roles(request))
+        except TaskBulkError as error:
+            return Response({'results': error.results}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'results': results}, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['post'], url_path='bulk-tags')
+    def bulk_tags(self, request, *args, **kwargs):
+        """
+        Adiciona e/ou remove várias tags de várias tarefas num único pedido.
+        Espera {"task_ids": [...], "add": [...], "remove": [...]} e devolve
+        apenas um resumo, sem voltar a serializar as tarefas.
+        """
+        serializer = TaskBulkTagSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        task_ids = serializer.validated_data['task_ids']
+        visible = set(
+            Task.objects.filter(
+                pk__in=task_ids,
+                project_id__in=list(get_project_roles(request))
+            ).values_list('pk', flat=True)
+        )
+        if visible != task_ids:
+            return Response(
+                {'task_ids': f'Tarefas inexistentes ou sem permissão: {sorted(task_ids - visible)}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        summary = apply_tag_changes(
+            task_ids,
+            serializer.validated_data['add'],
+            serializer.validated_data['remove'],
+        )
+        return Response(summary, status=status.HTTP_200_OK)
+
     @action(detail=True, methods=['post'], url_path='manage-tags')
     def manage_tags(self, request, pk=None):
         """
@@ -173,10 +476,11 @@ class TaskViewSet(viewsets.ModelViewSet):
 
         if serializer.is_valid():
             # Associa os dados que não vêm do utilizador (autor e o objeto relacionado)
-            serializer.save(
-                author=request.user,
-                content_object=task
-            )
+            with transaction.atomic():
+                serializer.save(
+                    author=request.user,
+                    content_object=task
+                )
             # Retorna o comentário recém-criado para o frontend
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         
@@ -198,13 +502,199 @@ class TaskViewSet(viewsets.ModelViewSet):
         serializer = AttachmentCreateSerializer(data=request.data)
 
         if serializer.is_valid():
-            # Associa o utilizador que fez o upload e o objeto relacionado
-            attachment = serializer.save(
-                uploaded_by=request.user,
-                content_object=task
-            )
+            # O conteúdo é guardado por hash: ficheiros iguais partilham o mesmo Blob.
+            # Na mesma transação, para não ficar um Blob sem anexo se este falhar
+            uploaded_file = serializer.validated_data['file']
+            with transaction.atomic():
+                attachment = create_attachment(
+                    store_uploaded_file(uploaded_file),
+                    uploaded_by=request.user,
+                    content_object=task,
+                    original_name=uploaded_file.name,
+                    description=serializer.validated_data.get('description', ''),
+                )
             # Para retornar o anexo completo (com dados do utilizador), usamos o serializer de leitura
             response_serializer = AttachmentSerializer(attachment, context={'request': request})
             return Response(response_serializer.data, status=status.HTTP_201_CREATED)
             
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class UploadViewSet(viewsets.ViewSet):
+    """
+    Uploads de anexos em partes, retomáveis.
+    - Create: inicia o upload ({"task", "filename", "size", "description"}).
+    - Partial update (PATCH): envia a parte seguinte como corpo binário, com
+      o cabeçalho `Upload-Offset` igual ao número de bytes já recebidos.
+      Quando o último byte chega, o anexo é criado e devolvido (201). Uma
+      parte fora de ordem, ou enviada enquanto outra é escrita, recebe 409.
+    - Retrieve: devolve o offset atual, para retomar após uma falha.
+    - Destroy: cancela o upload.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    OFFSET_HEADER = 'Upload-Offset'
+
+    def get_session(self, pk):
+        try:
+            # As sessões expiradas já não são retomadas (ver prune_upload_sessions)
+            return UploadSession.objects.get(
+                pk=pk, uploaded_by=self.request.user, updated_at__gte=expiry_cutoff()
+            )
+        except (UploadSession.DoesNotExist, ValueError, ValidationError):
+            raise NotFound()
+
+    def create(self, request):
+        serializer = UploadStartSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        task = Task.objects.filter(
+            pk=data['task'],
+            project_id__in=list(get_project_roles(request))
+        ).first()
+        if task is None:
+            return Response(
+                {'task': 'Tarefa inexistente ou sem permissão.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        session = start_upload(
+            request.user, task, data['filename'], data['size'], data['description']
+        )
+        return Response(UploadSessionSerializer(session).data, status=status.HTTP_201_CREATED)
+
+    def retrieve(self, request, pk=None):
+        session = self.get_session(pk)
+        response = Response(UploadSessionSerializer(session).data)
+        response[self.OFFSET_HEADER] = str(session.received)
+        return response
+
+    def partial_update(self, request, pk=None):
+        session = self.get_session(pk)
+        try:
+            offset = int(request.headers[self.OFFSET_HEADER])
+        except (KeyError, ValueError):
+            return Response(
+                {'error': f'Cabeçalho {self.OFFSET_HEADER} em falta ou inválido.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # O corpo é lido em blocos diretamente do pedido, sem o carregar todo em memória
+        stream = request.stream or io.BytesIO()
+        try:
+            session, attachment = append_chunk(session.pk, offset, stream)
+        except UploadSession.DoesNotExist:
+            # Cancelado enquanto a parte era escrita
+            raise NotFound()
+        except UploadOffsetMismatch as error:
+            response = Response({'offset': error.expected}, status=status.HTTP_409_CONFLICT)
+            response[self.OFFSET_HEADER] = str(error.expected)
+            return response
+        except UploadTooLarge:
+            return Response(
+                {'error': 'A parte ultrapassa o tamanho declarado do ficheiro.'},
+                status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+            )
+
+        if attachment is not None:
+            serializer = AttachmentSerializer(attachment, context={'request': request})
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+        response = Response(UploadSessionSerializer(session).data)
+        response[self.OFFSET_HEADER] = str(session.received)
+        return response
+
+    def destroy(self, request, pk=None):
+        abort_upload(self.get_session(pk))
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class AttachmentViewSet(mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    """
+    Anexos de tarefas, projetos e feedbacks dos projetos do utilizador.
+    - Retrieve: metadados do anexo.
+    - Download: o conteúdo do ficheiro, com suporte a Range e ETag.
+    """
+    serializer_class = AttachmentSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        queryset = Attachment.objects.select_related('blob', 'uploaded_by')
+        if self.request.user.is_superuser:
+            return queryset
+
+        # A permissão é resolvida em SQL a partir do objeto a que o anexo pertence
+        project_ids = list(get_project_roles(self.request))
+        content_types = ContentType.objects.get_for_models(Task, Project, Feedback)
+        return queryset.filter(
+            Q(
+                content_type=content_types[Task],
+                object_id__in=Task.objects.filter(project_id__in=project_ids).values('pk')
+            )
+            | Q(content_type=content_types[Project], object_id__in=project_ids)
+            | Q(
+                content_type=content_types[Feedback],
+                object_id__in=Feedback.objects.filter(project_id__in=project_ids).values('pk')
+            )
+        )
+
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        return serve_attachment(request, self.get_object())
+
+
+class SearchView(APIView):
+    """
+    Pesquisa de texto integral em projetos, tarefas, feedbacks e ideias
+    visíveis para o utilizador, ordenada por relevância (ver search.py).
+    Os excertos vêm com o HTML escapado e os termos encontrados em <mark>.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        serializer = SearchQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+
+        results = search(
+            params['q'],
+            get_project_roles(request),
+            request.user,
+            kinds=params.get('types'),
+            limit=params['limit'],
+        )
+        return Response({'query': params['q'], 'results': results})
+
+
+class DashboardView(APIView):
+    """
+    Resumo de todos os projetos visíveis para o dashboard: tarefas por
+    estado e prioridade, em atraso e próxima entrega (ver dashboard.py).
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        if request.user.is_superuser:
+            projects = Project.objects.all()
+        else:
+            projects = Project.objects.filter(pk__in=list(get_project_roles(request)))
+        return Response(get_dashboard(request.user, projects))
+
+
+class ChangesView(APIView):
+    """
+    Alterações visíveis para o utilizador desde um cursor, para que os
+    clientes sincronizem apenas o que mudou (ver changes.py).
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        serializer = ChangesQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+        return Response(changes_since(
+            request.user,
+            list(get_project_roles(request)),
+            since=params.get('since'),
+            limit=params['limit'],
+        ))
@@ -0,0 +1,127 @@
+"""
+Leituras nas réplicas da base de dados, com "read-your-writes".
+
+Com réplicas configuradas (DB_REPLICA_HOSTS, ver settings.py), o
+ReplicaRouter envia as leituras dos pedidos GET/HEAD para uma réplica
+escolhida ao acaso; as escritas, as migrações e tudo o que corre fora de
+um pedido (comandos, threads, signals fora do pedido) ficam no primário.
+Dentro de uma transação, as leituras também ficam no primário.
+
+Como as réplicas podem estar atrasadas, um utilizador que acabou de
+escrever lê do primário durante REPLICA_STICKY_SECONDS, para que criar e
+logo a seguir listar mostre o que criou. O ReplicaRoutingMiddleware marca-o
+depois de qualquer pedido com um método de escrita, com o fim da janela:
+- num cookie (frontend no browser);
+- no cabeçalho de resposta REPLICA_STICKY_HEADER, que os clientes que não
+  enviam cookies devolvem nos pedidos seguintes.
+O prazo viaja com o cliente: não depende de uma cache partilhada entre
+workers, nem de ler o token JWT antes da autenticação da view.
+
+Para testar localmente, basta apontar uma réplica para o mesmo servidor
+(DB_REPLICA_HOSTS=localhost): nos testes, as réplicas espelham o default
+(TEST MIRROR).
+"""
+import random
+import time
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils.decorators import sync_and_async_middleware
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# True enquanto corre um pedido cujas leituras podem ir para as réplicas
+_replica_reads = ContextVar('replica_reads', default=False)
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if not replicas or not _replica_reads.get():
+            return None
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Os mesmos dados em todas as bases
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
+
+
+def _before_deadline(value):
+    """Se o prazo enviado pelo cliente (timestamp) ainda não passou."""
+    try:
+        return float(value or 0) > time.time()
+    except ValueError:
+        return False
+
+
+def reads_from_primary(request):
+    """Se o pedido deve ler do primário (escrita, ou escrita recente do cliente)."""
+    if request.method not in SAFE_METHODS:
+        return True
+    return (
+        _before_deadline(request.COOKIES.get(settings.REPLICA_STICKY_COOKIE))
+        or _before_deadline(request.headers.get(settings.REPLICA_STICKY_HEADER))
+    )
+
+
+def stick_to_primary(response):
+    """Depois de uma escrita, o cliente lê do primário durante a janela."""
+    window = settings.REPLICA_STICKY_SECONDS
+    if not window:
+        return
+    deadline = str(time.time() + window)
+    response.set_cookie(
+        settings.REPLICA_STICKY_COOKIE, deadline,
+        max_age=window, httponly=True, samesite='Lax',
+    )
+    response.headers[settings.REPLICA_STICKY_HEADER] = deadline
+
+
+@sync_and_async_middleware
+def ReplicaRoutingMiddleware(get_response):
+    """Decide, por pedido, se as leituras podem ir para as réplicas (ver ReplicaRouter)."""
+
+    def before(request):
+        if not settings.DATABASE_REPLICAS:
+            return None
+        return _replica_reads.set(not reads_from_primary(request))
+
+    def after(request, response):
+        if settings.DATABASE_REPLICAS and request.method not in SAFE_METHODS:
+            stick_to_primary(response)
+        return response
+
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            token = before(request)
+            try:
+                response = await get_response(request)
+            finally:
+                if token is not None:
+                    _replica_reads.reset(token)
+            return after(request, response)
+    else:
+        def middleware(request):
+            token = before(request)
+            try:
+                response = get_response(request)
+            finally:
+                if token is not None:
+                    _replica_reads.reset(token)
+            return after(request, response)
+    return middleware
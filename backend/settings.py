@@ -1,6 +1,6 @@
 import os
 from pathlib import Path
-from decouple import config
+from decouple import Csv, config
 from datetime import timedelta
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -42,6 +42,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'backend.instrumentation.RequestProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -51,6 +52,8 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'allauth.account.middleware.AccountMiddleware',
+    'backend.projects.middleware.AsyncReadViewsMiddleware',
+    'backend.replicas.ReplicaRoutingMiddleware',
 ]
 
 ROOT_URLCONF = 'backend.urls'
@@ -77,13 +80,14 @@ AUTHENTICATION_BACKENDS = [
 REST_AUTH = {
     'USE_JWT': True,
     'JWT_AUTH_HTTPONLY': False, # Permite que o JS do frontend aceda ao refresh token
+    'JWT_TOKEN_CLAIMS_SERIALIZER': 'backend.accounts.serializers.AccountTokenObtainPairSerializer',
 }
 
 
 # Django Rest Framework
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'backend.accounts.authentication.CachedJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -97,6 +101,80 @@ CORS_ALLOWED_ORIGINS = [
 
 CORS_ALLOW_CREDENTIALS = True
 
+# Cache do Django partilhada entre processos (Redis). As caches entre pedidos
+# que têm de ser invalidadas em todos os workers (catálogo de tags, papéis
+# nos projetos) só são usadas com uma cache partilhada: sem REDIS_URL, a
+# cache é local a cada processo e essas ficam desativadas (ver
+# backend/projects/cache_versions.py).
+REDIS_URL = config('REDIS_URL', default='')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+
+# Cache em memória (por processo) das contas autenticadas por JWT: número
+# máximo de contas e validade em segundos (0 desativa). Com
+# AUTH_USER_TOKEN_CLAIMS, os tokens levam os dados básicos da conta e
+# dispensam a leitura enquanto a conta não mudar (ver accounts/authentication.py).
+AUTH_USER_CACHE_SIZE = config('AUTH_USER_CACHE_SIZE', default=1024, cast=int)
+AUTH_USER_CACHE_TIMEOUT = config('AUTH_USER_CACHE_TIMEOUT', default=300, cast=int)
+AUTH_USER_TOKEN_CLAIMS = config('AUTH_USER_TOKEN_CLAIMS', default=False, cast=bool)
+
+# Tempo (em segundos) que o mapa de papéis do utilizador nos projetos fica
+# na cache entre pedidos. 0 desativa a cache (lido uma vez por pedido); sem
+# uma cache partilhada (REDIS_URL) fica sempre desativada.
+PROJECT_ROLES_CACHE_TIMEOUT = config('PROJECT_ROLES_CACHE_TIMEOUT', default=0, cast=int)
+
+# Validade, em segundos, das respostas em cache do catálogo de tags. A chave
+# é versionada e invalidada em qualquer alteração de Tag.
+TAG_CATALOGUE_CACHE_TIMEOUT = config('TAG_CATALOGUE_CACHE_TIMEOUT', default=3600, cast=int)
+
+# Listas de projetos e tarefas serializadas a partir de values_list, sem
+# instanciar modelos nem serializers (backend/projects/fast_lists.py).
+FAST_LIST_SERIALIZATION = config('FAST_LIST_SERIALIZATION', default=True, cast=bool)
+
+# Validade, em segundos, do resumo do dashboard em cache por utilizador
+# (/api/dashboard/). 0 calcula-o sempre.
+DASHBOARD_CACHE_TIMEOUT = config('DASHBOARD_CACHE_TIMEOUT', default=30, cast=int)
+
+# Dias durante os quais o registo de alterações (/api/changes/) é mantido.
+# O comando prune_change_log apaga as entradas mais antigas.
+CHANGE_LOG_RETENTION_DAYS = config('CHANGE_LOG_RETENTION_DAYS', default=30, cast=int)
+# Os ids do registo são atribuídos no INSERT, não no commit: os cursores
+# devolvidos só avançam até às entradas com mais do que estes segundos. No
+# PostgreSQL, esperam também pelo fim das transações abertas no INSERT (ver
+# backend/projects/changes.py); nas outras bases de dados, este prazo é a
+# única garantia.
+CHANGE_LOG_SETTLE_SECONDS = config('CHANGE_LOG_SETTLE_SECONDS', default=10, cast=int)
+
+# Eventos em tempo real (/api/events/, só em ASGI). O LocalBroker distribui
+# as alterações no processo onde acontecem; com vários workers, o
+# ChangeLogBroker lê-as do registo de alterações a cada EVENTS_POLL_INTERVAL
+# segundos (ver backend/projects/events.py).
+EVENTS_BROKER = config('EVENTS_BROKER', default='backend.projects.events.LocalBroker')
+EVENTS_POLL_INTERVAL = config('EVENTS_POLL_INTERVAL', default=1.0, cast=float)
+# Segundos entre comentários de keep-alive numa ligação sem eventos
+EVENTS_HEARTBEAT = config('EVENTS_HEARTBEAT', default=20, cast=int)
+# Eventos por entregar por ligação antes de esta ser fechada (cliente lento)
+EVENTS_QUEUE_SIZE = config('EVENTS_QUEUE_SIZE', default=100, cast=int)
+# Alterações reenviadas ao religar com Last-Event-ID; acima disto, resync
+EVENTS_REPLAY_LIMIT = config('EVENTS_REPLAY_LIMIT', default=500, cast=int)
+EVENTS_RETRY_MS = 5000
+
+# Em ASGI, serve os GET de projetos, tarefas, tags e perfil com views
+# assíncronas (backend/projects/async_views.py). Sem efeito em WSGI.
+ASYNC_READ_VIEWS = config('ASYNC_READ_VIEWS', default=True, cast=bool)
+
+# Fração dos pedidos medidos (queries, tempo na base de dados e nos
+# serializers, ver backend/instrumentation.py), com cabeçalho Server-Timing;
+# 0 desativa. Os medidos acima de REQUEST_PROFILING_SLOW_MS são registados
+# em JSON no logger backend.instrumentation.
+REQUEST_PROFILING_SAMPLE_RATE = config('REQUEST_PROFILING_SAMPLE_RATE', default=0.0, cast=float)
+REQUEST_PROFILING_SLOW_MS = config('REQUEST_PROFILING_SLOW_MS', default=500, cast=float)
+
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(days=7),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=7),
@@ -129,7 +207,7 @@ SIMPLE_JWT = {
     "SLIDING_TOKEN_LIFETIME": timedelta(minutes=5),
     "SLIDING_TOKEN_REFRESH_LIFETIME": timedelta(days=1),
 
-    "TOKEN_OBTAIN_SERIALIZER": "accounts.serializers.MyTokenObtainPairSerializer",
+    "TOKEN_OBTAIN_SERIALIZER": "backend.accounts.serializers.AccountTokenObtainPairSerializer",
 }
 
 # -------------
@@ -165,6 +243,22 @@ DATABASES = {
     }
 }
 
+# Réplicas de leitura (hosts separados por vírgulas, com as credenciais do
+# default): os GET leem de uma réplica, exceto durante REPLICA_STICKY_SECONDS
+# depois de uma escrita do mesmo cliente (ver backend/replicas.py). Para
+# testar localmente, uma réplica pode apontar para o mesmo servidor.
+DATABASE_REPLICAS = []
+for index, host in enumerate(config('DB_REPLICA_HOSTS', default='', cast=Csv()), start=1):
+    alias = f'replica_{index}'
+    DATABASES[alias] = {**DATABASES['default'], 'HOST': host, 'TEST': {'MIRROR': 'default'}}
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['backend.replicas.ReplicaRouter']
+REPLICA_STICKY_SECONDS = config('REPLICA_STICKY_SECONDS', default=10, cast=int)
+REPLICA_STICKY_COOKIE = 'primary_reads_until'
+# Cabeçalho com o mesmo prazo, devolvido pelos clientes sem cookies
+REPLICA_STICKY_HEADER = 'Primary-Reads-Until'
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -206,6 +300,29 @@ STATIC_URL = 'static/'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Uploads de anexos em partes (retomáveis). As partes ficam fora de
+# MEDIA_ROOT até o upload estar completo.
+CHUNKED_UPLOAD_TEMP_DIR = config('CHUNKED_UPLOAD_TEMP_DIR', default=os.path.join(BASE_DIR, 'tmp_uploads'))
+CHUNKED_UPLOAD_MAX_SIZE = config('CHUNKED_UPLOAD_MAX_SIZE', default=2 * 1024 ** 3, cast=int)
+# Segundos que uma parte pode demorar a ser escrita; depois disso a reserva
+# da sessão é dada como abandonada e outra parte pode tomar o seu lugar.
+CHUNKED_UPLOAD_CLAIM_TIMEOUT = config('CHUNKED_UPLOAD_CLAIM_TIMEOUT', default=600, cast=int)
+# Horas sem partes novas ao fim das quais um upload expira; o comando
+# prune_upload_sessions apaga as sessões expiradas e os ficheiros parciais.
+CHUNKED_UPLOAD_EXPIRY_HOURS = config('CHUNKED_UPLOAD_EXPIRY_HOURS', default=24, cast=int)
+
+# Downloads de anexos: '' (o Django serve o ficheiro), 'nginx' (X-Accel-Redirect)
+# ou 'sendfile' (X-Sendfile). No modo nginx, o prefixo deve corresponder a uma
+# `location` interna que aponte para MEDIA_ROOT.
+ATTACHMENT_SENDFILE_BACKEND = config('ATTACHMENT_SENDFILE_BACKEND', default='')
+ATTACHMENT_SENDFILE_PREFIX = config('ATTACHMENT_SENDFILE_PREFIX', default='/protected-media/')
+
+# Miniaturas de fotos de perfil e anexos de imagem (lado maior, em píxeis).
+# THUMBNAIL_WORKERS = 0 gera as miniaturas de forma síncrona.
+THUMBNAIL_SIZES = {'sm': 64, 'md': 256, 'lg': 1024}
+THUMBNAIL_QUALITY = 80
+THUMBNAIL_WORKERS = config('THUMBNAIL_WORKERS', default=2, cast=int)
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
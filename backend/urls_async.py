@@ -0,0 +1,26 @@
+"""
+URLconf dos pedidos ASGI com ASYNC_READ_VIEWS (ver
+backend/projects/middleware.py): os endpoints de leitura com versão
+assíncrona (backend/projects/async_views.py) à frente de todas as rotas
+de backend/urls.py, que servem os restantes métodos e endpoints.
+"""
+from django.urls import re_path
+from backend.accounts.async_views import AccountProfileReadView
+from backend.projects.async_views import (
+    ProjectDetailView, ProjectListView, TagView, TaskListView, with_fallback
+)
+from backend.urls import urlpatterns as sync_urlpatterns
+
+# Mesmo formato de `pk` que os routers do DRF
+LOOKUP = r'[^/.]+'
+
+urlpatterns = [
+    re_path(r'^api/projects/$', with_fallback(ProjectListView.as_view())),
+    re_path(rf'^api/projects/(?P<pk>{LOOKUP})/$', with_fallback(ProjectDetailView.as_view())),
+    re_path(rf'^api/projects/(?P<project_pk>{LOOKUP})/tasks/$', with_fallback(TaskListView.as_view())),
+    re_path(r'^api/tasks/$', with_fallback(TaskListView.as_view())),
+    re_path(r'^api/tags/$', with_fallback(TagView.as_view())),
+    re_path(rf'^api/tags/(?P<pk>{LOOKUP})/$', with_fallback(TagView.as_view())),
+    re_path(r'^api/profile/$', with_fallback(AccountProfileReadView.as_view())),
+    *sync_urlpatterns,
+]